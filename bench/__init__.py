@@ -0,0 +1,6 @@
+# =====================================================
+# 🏋️ bench — FruitBid Load Generator & Benchmarks
+# =====================================================
+#   python -m bench build   --db /tmp/bench.db --lots 10000 --users 100000 --bids 10000000
+#   python -m bench run     --db /tmp/bench.db --duration 30 --processes 2 --out before.json
+#   python -m bench compare before.json after.json
@@ -0,0 +1,58 @@
+import argparse
+import sys
+
+from bench.market import build_market
+from bench.runner import compare, format_report, run_benchmark, write_results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="FruitBid load generator")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="create a synthetic market database")
+    build.add_argument("--db", required=True)
+    build.add_argument("--lots", type=int, default=1000)
+    build.add_argument("--users", type=int, default=10_000)
+    build.add_argument("--bids", type=int, default=100_000)
+    build.add_argument("--seed", type=int, default=42)
+
+    run = sub.add_parser("run", help="drive concurrent bidders, browsers and admins")
+    run.add_argument("--db", required=True)
+    run.add_argument("--duration", type=float, default=30, help="seconds")
+    run.add_argument("--processes", type=int, default=1)
+    run.add_argument("--bidders", type=int, default=8, help="bidder threads per process")
+    run.add_argument("--browsers", type=int, default=8, help="browser threads per process")
+    run.add_argument("--admins", type=int, default=2, help="admin threads per process")
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("--label", help="free-form tag stored in the results")
+    run.add_argument("--out", default="bench_results.json")
+
+    cmp = sub.add_parser("compare", help="compare two result files")
+    cmp.add_argument("before")
+    cmp.add_argument("after")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        build_market(args.db, lots=args.lots, users=args.users, bids=args.bids, seed=args.seed)
+    elif args.command == "run":
+        result = run_benchmark(
+            args.db,
+            duration=args.duration,
+            processes=args.processes,
+            bidders=args.bidders,
+            browsers=args.browsers,
+            admins=args.admins,
+            seed=args.seed,
+            label=args.label,
+        )
+        write_results(result, args.out)
+        print(format_report(result))
+        print(f"\n📄 results written to {args.out}")
+    else:
+        print(compare(args.before, args.after))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# =====================================================
+# 🧺 bench/market.py — Synthetic Market Builder
+# =====================================================
+# Builds a fresh, fully migrated database filled with users, lots and
+# bids. Secondary indexes and every trigger on the loaded tables are
+# dropped during the bulk load and restored at the end, which is several
+# times faster than maintaining them row by row. What the triggers would
+# have done is redone in bulk: aggregates rebuilt, auction windows written
+# with the lots, change counters bumped once.
+
+import os
+import random
+import re
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from fruitbid.auctions import AUCTION_HOURS, AUCTION_HOURS_KEY
+from fruitbid.lot_summary import rebuild_lot_summary
+from fruitbid.migrations import HOT_PATH_INDEXES, VERSIONED_TABLES, migrate
+from fruitbid.user_stats import rebuild_user_stats
+
+CHUNK = 50_000
+LOADED_TABLES = ("users", "lots", "bids")
+
+FRUITS = [
+    ("Apple", 100.0), ("Mosambi", 40.0), ("Banana", 30.0), ("Papaya", 40.0),
+    ("Kiwi", 150.0), ("Dragon Fruit", 200.0), ("Pineapple", 50.0),
+    ("Custard Apple", 80.0), ("Sapota", 50.0), ("Mango", 120.0),
+]
+
+
+def _chunks(rows, size=CHUNK):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _names(statements):
+    return [re.search(r"IF NOT EXISTS (\w+)", sql).group(1) for sql in statements]
+
+
+def _drop_triggers(conn, tables=LOADED_TABLES):
+    """Drop every trigger on `tables`; returns their CREATE statements."""
+    marks = ",".join("?" * len(tables))
+    triggers = conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ({marks})", tables
+    ).fetchall()
+    for name, _ in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+    return [sql for _, sql in triggers]
+
+
+def build_market(path, lots=1000, users=10_000, bids=100_000, seed=42, log=print):
+    """Create `path` from scratch with a synthetic market; returns row counts."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    migrate(conn)
+    conn.execute("PRAGMA synchronous = OFF")
+    for name in _names(HOT_PATH_INDEXES):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.execute("DELETE FROM lots")  # drop the demo lots
+    triggers = _drop_triggers(conn)
+    conn.commit()
+
+    start = time.perf_counter()
+    user_rows = (
+        (f"user{i}", f"9{i:09d}", f"user{i}@example.com", f"{i} Market Road", 1)
+        for i in range(users)
+    )
+    for chunk in _chunks(user_rows):
+        conn.executemany(
+            "INSERT INTO users (name, phone, mobile_email, address, verified) VALUES (?, ?, ?, ?, ?)", chunk
+        )
+    conn.commit()
+    log(f"users: {users:,} in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    now = datetime.now()
+    epoch = now - timedelta(days=30)
+    # the window trg_lots_auction_window would give: open now, for auction_hours
+    row = conn.execute("SELECT value FROM settings WHERE key = ?", (AUCTION_HOURS_KEY,)).fetchone()
+    opens_at = now.strftime("%Y-%m-%d %H:%M:%S")
+    closes_at = (now + timedelta(hours=float(row[0]) if row else AUCTION_HOURS)).strftime("%Y-%m-%d %H:%M:%S")
+    base_prices = []
+    lot_rows = []
+    for i in range(lots):
+        fruit, price = rng.choice(FRUITS)
+        base = round(price * rng.uniform(0.8, 1.2), 2)
+        base_prices.append((fruit, base))
+        added = (epoch + timedelta(minutes=i)).strftime("%Y-%m-%d")
+        lot_rows.append((fruit, f"{rng.randint(50, 500)} kg", base, added, opens_at, closes_at))
+    conn.executemany(
+        "INSERT INTO lots (item_name, quantity, base_price, date_added, opens_at, closes_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        lot_rows,
+    )
+    conn.commit()
+    first_lot = conn.execute("SELECT MIN(id) FROM lots").fetchone()[0]
+    log(f"lots: {lots:,} in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    step = timedelta(days=30) / max(bids, 1)
+
+    def bid_rows():
+        for i in range(bids):
+            lot = rng.randrange(lots)
+            user = rng.randrange(users)
+            fruit, base = base_prices[lot]
+            yield (
+                first_lot + lot, fruit, user + 1, f"user{user}", f"9{user:09d}",
+                round(base * rng.uniform(1.0, 2.0), 2),
+                (epoch + step * i).strftime("%Y-%m-%d %H:%M:%S"),
+            )
+
+    for n, chunk in enumerate(_chunks(bid_rows()), start=1):
+        conn.executemany(
+            "INSERT INTO bids (lot_id, item_name, user_id, user_name, user_phone, bid_amount, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            chunk,
+        )
+        conn.commit()
+        if n % 20 == 0:
+            log(f"  bids: {n * CHUNK:,} / {bids:,}")
+    log(f"bids: {bids:,} in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    for create_sql in HOT_PATH_INDEXES + triggers:
+        conn.execute(create_sql)
+    rebuild_lot_summary(conn)
+    rebuild_user_stats(conn)
+    conn.executemany(
+        "UPDATE table_versions SET version = version + 1 WHERE name = ?",
+        [(table,) for table in LOADED_TABLES if table in VERSIONED_TABLES],
+    )
+    conn.commit()
+    log(f"indexes + aggregates in {time.perf_counter() - start:.1f}s")
+
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return {"lots": lots, "users": users, "bids": bids}
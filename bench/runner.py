@@ -0,0 +1,317 @@
+# =====================================================
+# 🏃 bench/runner.py — Concurrent Workload Driver
+# =====================================================
+# Each worker process imports the real data-access layer (fruitbid/db.py,
+# the marketplace helpers app_web.py uses, and the root db.py) against the
+# benchmark database, then runs bidder / browser / admin threads until the
+# deadline. Every call is timed; errors are split into SQLITE_BUSY
+# ("database is locked"/"busy", pool timeouts) and everything else.
+
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_DIR = ROOT / "fruitbid"
+
+# Operations each role picks from, with their relative weights
+ROLES = {
+    "bidder": [("place_bid", 6), ("lot_top_bids", 3), ("item_high_bid", 1)],
+    "browser": [("marketplace_page", 5), ("marketplace_deep_page", 2), ("lot_top_bids", 2), ("my_bids", 1)],
+    "admin": [("admin_overview", 3), ("item_min_bid", 3), ("item_high_bid", 2), ("user_phone_bids", 2)],
+}
+
+
+class HelperFailed(Exception):
+    """A root db.py helper swallowed an error and returned None."""
+
+
+def _is_busy(error):
+    text = str(error).lower()
+    return (
+        isinstance(error, sqlite3.OperationalError) and ("locked" in text or "busy" in text)
+    ) or type(error).__name__ == "PoolTimeout"
+
+
+# =====================================================
+# 🧰 WORKLOAD (one per process)
+# =====================================================
+class Workload:
+    """The app modules plus the id ranges operations draw from."""
+
+    def __init__(self):
+        sys.path[:0] = [str(APP_DIR), str(ROOT)]
+        import db as app_db
+        import marketplace
+        import streamlit.logger
+
+        spec = importlib.util.spec_from_file_location("fruitbid_root_db", ROOT / "db.py")
+        root_db = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(root_db)
+
+        # Cached helpers called outside a Streamlit run log a warning each time
+        streamlit.logger.set_log_level("error")
+
+        self.app_db, self.marketplace, self.root_db = app_db, marketplace, root_db
+        app_db.ensure_schema()
+        self.book = self._load_book()
+
+        with app_db.db_connection() as conn:
+            self.min_lot, self.max_lot = conn.execute("SELECT MIN(id), MAX(id) FROM lots").fetchone()
+            self.lots = dict(conn.execute("SELECT id, item_name FROM lots"))
+            self.users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] or 1
+            self.items = [row[0] for row in conn.execute("SELECT name FROM items")]
+        self.lot_ids = list(self.lots)
+
+    def _load_book(self):
+        """The API server's per-lot order book, fed by this process's bid writer."""
+        from order_book import OrderBook
+
+        book = OrderBook("lot_id")
+
+        def add_bids(bids):
+            for bid in bids:
+                book.add(bid["lot_id"], bid["id"], bid["user_name"], bid["bid_amount"], bid["timestamp"])
+
+        ingestor = self.app_db.get_bid_ingestor()
+        # No batch may commit between the initial load and subscribing
+        with ingestor.paused(), self.app_db.db_connection() as conn:
+            book.load(conn)
+            ingestor.add_listener(add_bids)
+        return book
+
+    def warm_up(self):
+        """Fill process-wide caches so the timed run measures steady state."""
+        self.root_db.get_highest_bid(self.items[0])
+        self.root_db.get_items()
+        self.marketplace.fetch_marketplace()
+
+    # ---------------- operations ----------------
+    def place_bid(self, rng):
+        lot_id = rng.choice(self.lot_ids)
+        user = rng.randrange(self.users)
+        self.app_db.submit_bid(
+            lot_id,
+            round(rng.uniform(50, 500), 2),
+            user_name=f"user{user}",
+            user_phone=f"9{user:09d}",
+            item_name=self.lots[lot_id],
+        ).result(timeout=30)
+
+    def lot_top_bids(self, rng):
+        self.book.top(rng.choice(self.lot_ids), 3)
+
+    def marketplace_page(self, rng):
+        self.marketplace.fetch_marketplace()
+
+    def marketplace_deep_page(self, rng):
+        self.marketplace.fetch_marketplace(before_id=rng.randint(self.min_lot, self.max_lot))
+
+    def my_bids(self, rng):
+        # app_web.py — My Bids
+        self.app_db.fetch_all(
+            """
+            SELECT lots.item_name, bids.bid_amount, bids.timestamp
+            FROM all_bids bids
+            JOIN all_lots lots ON bids.lot_id = lots.id
+            WHERE bids.user_name = ?
+            ORDER BY bids.timestamp DESC
+            """,
+            (f"user{rng.randrange(self.users)}",),
+        )
+
+    def user_phone_bids(self, rng):
+        # pages/3_💼_My_Bids.py
+        self.app_db.fetch_all(
+            "SELECT item_name, bid_amount, timestamp FROM bids WHERE user_phone = ? ORDER BY id DESC",
+            (f"9{rng.randrange(self.users):09d}",),
+        )
+
+    def admin_overview(self, rng):
+        # pages/5_Admin_Dashboard.py table summary
+        with self.app_db.db_connection() as conn:
+            for table in ("users", "items", "bids", "settings", "otps", "nutrition", "lucky_dip"):
+                conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+
+    def item_min_bid(self, rng):
+        if self.root_db.get_min_bid(rng.choice(self.items)) is None:
+            raise HelperFailed("get_min_bid returned None")
+
+    def item_high_bid(self, rng):
+        if self.root_db.get_highest_bid(rng.choice(self.items)) is None:
+            raise HelperFailed("get_highest_bid returned None")
+
+
+# =====================================================
+# 🧵 WORKERS
+# =====================================================
+def _worker_thread(workload, role, seed, deadline, samples, errors, lock):
+    rng = random.Random(seed)
+    ops, weights = zip(*ROLES[role])
+    local_samples, local_errors = defaultdict(list), defaultdict(lambda: [0, 0])
+    while time.monotonic() < deadline:
+        op = rng.choices(ops, weights)[0]
+        start = time.perf_counter()
+        try:
+            getattr(workload, op)(rng)
+        except Exception as e:
+            local_errors[op][0 if _is_busy(e) else 1] += 1
+            continue
+        local_samples[op].append((time.perf_counter() - start) * 1000)
+    with lock:
+        for op, values in local_samples.items():
+            samples[op].extend(values)
+        for op, (busy, other) in local_errors.items():
+            errors[op][0] += busy
+            errors[op][1] += other
+
+
+def _worker_process(db_path, roles, duration, seed):
+    """Run the role threads of one process; returns raw samples and stats."""
+    os.environ["FRUITBID_DB_PATH"] = db_path
+    workload = Workload()
+    workload.warm_up()
+
+    samples, errors, lock = defaultdict(list), defaultdict(lambda: [0, 0]), threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = []
+    for role, count in roles.items():
+        for i in range(count):
+            threads.append(threading.Thread(
+                target=_worker_thread,
+                args=(workload, role, f"{seed}-{role}-{i}", deadline, samples, errors, lock),
+                daemon=True,
+            ))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    import pool
+    return {
+        "samples": dict(samples),
+        "errors": {op: list(v) for op, v in errors.items()},
+        "pool": pool.get_pool().stats(),
+        "ingest": workload.app_db.get_bid_ingestor().stats(),
+    }
+
+
+# =====================================================
+# 📊 REPORT
+# =====================================================
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return round(sorted_values[index], 3)
+
+
+def summarize(samples, errors, duration):
+    report = {}
+    for op in sorted(set(samples) | set(errors)):
+        values = sorted(samples.get(op, []))
+        busy, other = errors.get(op, (0, 0))
+        attempts = len(values) + busy + other
+        report[op] = {
+            "count": len(values),
+            "errors": other,
+            "busy": busy,
+            "busy_rate": round(busy / attempts, 6) if attempts else 0.0,
+            "throughput_per_s": round(len(values) / duration, 2),
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "p99_ms": _percentile(values, 99),
+            "max_ms": round(values[-1], 3) if values else None,
+            "mean_ms": round(sum(values) / len(values), 3) if values else None,
+        }
+    return report
+
+
+def run_benchmark(db_path, duration=30, processes=1, bidders=8, browsers=8, admins=2, seed=1, label=None):
+    """Drive the workload across `processes` processes; returns the result dict."""
+    roles = {"bidder": bidders, "browser": browsers, "admin": admins}
+    ctx = multiprocessing.get_context("spawn")
+    started = datetime.now().isoformat(timespec="seconds")
+    wall = time.perf_counter()
+    with ctx.Pool(processes) as workers:
+        parts = workers.starmap(
+            _worker_process,
+            [(os.path.abspath(db_path), roles, duration, seed * 1000 + p) for p in range(processes)],
+        )
+    wall = time.perf_counter() - wall
+
+    samples, errors = defaultdict(list), defaultdict(lambda: [0, 0])
+    for part in parts:
+        for op, values in part["samples"].items():
+            samples[op].extend(values)
+        for op, (busy, other) in part["errors"].items():
+            errors[op][0] += busy
+            errors[op][1] += other
+
+    with sqlite3.connect(db_path) as conn:
+        dataset = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("lots", "users", "bids")
+        }
+
+    return {
+        "label": label,
+        "started_at": started,
+        "config": {
+            "db": os.path.abspath(db_path),
+            "duration_s": duration,
+            "processes": processes,
+            "threads_per_process": roles,
+            "seed": seed,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+        },
+        "dataset": dataset,
+        "wall_s": round(wall, 2),
+        "operations": summarize(samples, errors, duration),
+        "processes": [{"pool": part["pool"], "ingest": part["ingest"]} for part in parts],
+    }
+
+
+def write_results(result, out_path):
+    with open(out_path, "w") as f:
+        json.dump(result, f, indent=2)
+
+
+def compare(before_path, after_path):
+    """Per-operation p95 and throughput change between two result files."""
+    with open(before_path) as f:
+        before = json.load(f)["operations"]
+    with open(after_path) as f:
+        after = json.load(f)["operations"]
+
+    lines = [f"{'operation':<24}{'p95 before':>12}{'p95 after':>12}{'ops/s before':>14}{'ops/s after':>13}{'busy after':>12}"]
+    for op in sorted(set(before) | set(after)):
+        b, a = before.get(op, {}), after.get(op, {})
+        lines.append(
+            f"{op:<24}{b.get('p95_ms') or '-':>12}{a.get('p95_ms') or '-':>12}"
+            f"{b.get('throughput_per_s', '-'):>14}{a.get('throughput_per_s', '-'):>13}"
+            f"{a.get('busy_rate', '-'):>12}"
+        )
+    return "\n".join(lines)
+
+
+def format_report(result):
+    lines = [f"{'operation':<24}{'count':>9}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'busy %':>9}{'errors':>8}"]
+    for op, r in result["operations"].items():
+        lines.append(
+            f"{op:<24}{r['count']:>9}{r['throughput_per_s']:>10}{r['p50_ms'] or '-':>10}"
+            f"{r['p95_ms'] or '-':>10}{r['p99_ms'] or '-':>10}{r['busy_rate'] * 100:>9.2f}{r['errors']:>8}"
+        )
+    return "\n".join(lines)
+
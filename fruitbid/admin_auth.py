@@ -0,0 +1,132 @@
+# =====================================================
+# 🔐 admin_auth.py — Admin Password & Session Tokens
+# =====================================================
+# bcrypt is slow on purpose, so it runs once per login, not per action:
+#
+# * the admin hash is read from ADMIN_PASSWORD_HASH, or derived once per
+#   process from ADMIN_PASSWORD (default "admin123"), in the background
+#   as soon as this module is imported
+# * password checks run on a small worker pool; bcrypt releases the GIL,
+#   so other sessions keep rendering while one admin logs in
+# * a successful login returns an HMAC-signed token with an expiry;
+#   later checks verify the token in microseconds
+#
+# Set ADMIN_SESSION_SECRET to keep tokens valid across restarts and
+# processes; otherwise each process signs with a random key.
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import bcrypt
+import streamlit as st
+
+ADMIN_SESSION_TTL = int(os.getenv("ADMIN_SESSION_TTL", 8 * 3600))
+CHECK_TIMEOUT = 10
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="admin-auth")
+_secret = (os.getenv("ADMIN_SESSION_SECRET") or "").encode() or os.urandom(32)
+_hash = None
+_hash_lock = threading.Lock()
+
+
+# =====================================================
+# 🔑 PASSWORD HASH
+# =====================================================
+def admin_password_hash() -> bytes:
+    """The admin bcrypt hash, loaded or derived once per process."""
+    global _hash
+    if _hash is None:
+        with _hash_lock:
+            if _hash is None:
+                stored = os.getenv("ADMIN_PASSWORD_HASH")
+                if stored:
+                    _hash = stored.encode()
+                else:
+                    # Development fallback: hash the plain password once
+                    _hash = bcrypt.hashpw(os.getenv("ADMIN_PASSWORD", "admin123").encode(), bcrypt.gensalt())
+    return _hash
+
+
+def _checkpw(password: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode(), admin_password_hash())
+    except ValueError:  # malformed ADMIN_PASSWORD_HASH
+        return False
+
+
+def verify_password_async(password: str):
+    """Future resolving to whether `password` is the admin password."""
+    return _executor.submit(_checkpw, password or "")
+
+
+def check_admin_password(password: str) -> bool:
+    """Blocking admin password check, run on the auth worker pool."""
+    try:
+        return verify_password_async(password).result(timeout=CHECK_TIMEOUT)
+    except TimeoutError:
+        return False
+
+
+# =====================================================
+# 🎟️ SESSION TOKENS
+# =====================================================
+def _sign(payload: str) -> str:
+    digest = hmac.new(_secret, payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def issue_token(subject="admin", ttl=ADMIN_SESSION_TTL) -> str:
+    """Signed `subject.expires.signature` token."""
+    payload = f"{subject}.{int(time.time() + ttl)}"
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_token(token, subject="admin") -> bool:
+    """True for an unexpired token issued by `issue_token` for `subject`."""
+    try:
+        token_subject, expires, signature = (token or "").rsplit(".", 2)
+        expires = int(expires)
+    except ValueError:
+        return False
+    if token_subject != subject or expires < time.time():
+        return False
+    return hmac.compare_digest(signature, _sign(f"{token_subject}.{expires}"))
+
+
+def login(password: str):
+    """Session token when `password` is correct, else None."""
+    return issue_token() if check_admin_password(password) else None
+
+
+# =====================================================
+# 🚪 STREAMLIT GATE
+# =====================================================
+def require_admin():
+    """Stop the page unless this session holds a valid admin token."""
+    if verify_token(st.session_state.get("admin_token")):
+        return
+    st.subheader("🔐 Admin Login")
+    with st.form("admin_login"):
+        password = st.text_input("Admin password", type="password")
+        submitted = st.form_submit_button("🔓 Unlock")
+    if submitted:
+        with st.spinner("Checking password..."):
+            token = login(password)
+        if token:
+            st.session_state.admin_token = token
+            st.rerun()
+        st.error("❌ Wrong admin password")
+    st.stop()
+
+
+def logout():
+    st.session_state.pop("admin_token", None)
+
+
+# Derive the hash now, so the first login only pays for one bcrypt check
+_executor.submit(admin_password_hash)
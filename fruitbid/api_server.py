@@ -0,0 +1,362 @@
+# =====================================================
+# 🛰️ api_server.py — Headless JSON API (Tornado)
+# =====================================================
+# Lots and bids over plain HTTP, without a Streamlit script rerun per
+# request. Runs next to the Streamlit app on the same database and the same
+# data-access layer (pool, marketplace query, order book, bid ingestor).
+#
+#   python fruitbid/api_server.py --port 8600
+#
+#   GET  /api/lots?limit=20&before_id=123    one marketplace page
+#   GET  /api/lots/<lot_id>/bids?k=3         top bids for a lot
+#   POST /api/bids                           place a bid or auto-bid maximum (JSON body)
+#   GET  /api/users/<user_name>/bids         one user's bids
+#   GET  /api/export/<table>?format=csv&start=2025-01-01
+#                                            admin export (see export.py),
+#                                            with "Authorization: Bearer <token>"
+#   WS   /ws/bids?lots=1,2,3                 live top bids for those lots
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+import tornado.ioloop
+import tornado.web
+import tornado.websocket
+
+from admin_auth import verify_token
+from archive import start_archiver
+from auctions import LotClosed, start_auction_scheduler
+from bid_feed import BidTail
+from bid_ingest import IngestQueueFull
+from db import ensure_schema, fetch_all, submit_bid, submit_proxy_bid
+from export import EXPORT_FORMATS, EXPORT_TABLES, export_to_tempfile
+from marketplace import MARKET_PAGE_SIZE, fetch_marketplace
+from order_book import BOOK_DEPTH, OrderBook
+from rate_limit import RateLimited
+
+MAX_PAGE_SIZE = 100
+USER_BIDS_LIMIT = 200
+BID_TIMEOUT = 10
+TICKER_TOP_BIDS = 3
+EXPORT_STREAM_BYTES = 1 << 20
+
+# How often the bid tail is polled; bounds push latency for bids placed in
+# other processes (the Streamlit app). Idle polls do not query `bids`.
+FEED_INTERVAL_MS = int(os.getenv("FRUITBID_FEED_INTERVAL_MS", 250))
+
+# Origins allowed to open the WebSocket ("*" = any, else comma-separated)
+ALLOWED_ORIGINS = os.getenv("FRUITBID_API_ALLOWED_ORIGINS", "*")
+
+log = logging.getLogger("fruitbid.api")
+
+
+# =====================================================
+# 🧰 BASE HANDLER
+# =====================================================
+class JSONHandler(tornado.web.RequestHandler):
+    """Sends dicts as JSON and reports errors as {"error": ...}."""
+
+    def set_default_headers(self):
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+
+    def write_json(self, payload, status=200):
+        self.set_status(status)
+        self.finish(json.dumps(payload, default=str))
+
+    def write_error(self, status_code, **kwargs):
+        message = self._reason
+        exc = kwargs.get("exc_info", (None, None))[1]
+        if isinstance(exc, tornado.web.HTTPError) and exc.log_message:
+            message = exc.log_message
+        self.finish(json.dumps({"error": message}))
+
+    def int_argument(self, name, default, minimum=1, maximum=None):
+        raw = self.get_query_argument(name, None)
+        if raw is None:
+            return default
+        try:
+            value = int(raw)
+        except ValueError:
+            raise tornado.web.HTTPError(400, f"'{name}' must be an integer")
+        if value < minimum or (maximum is not None and value > maximum):
+            raise tornado.web.HTTPError(400, f"'{name}' is out of range")
+        return value
+
+    @property
+    def book(self):
+        return self.application.settings["feed"].book
+
+
+# =====================================================
+# 🍎 LOTS
+# =====================================================
+class LotsHandler(JSONHandler):
+    def get(self):
+        limit = self.int_argument("limit", MARKET_PAGE_SIZE, maximum=MAX_PAGE_SIZE)
+        before_id = self.int_argument("before_id", None)
+        top_k = self.int_argument("top_k", 3, maximum=BOOK_DEPTH)
+        lots, next_before_id = fetch_marketplace(limit, before_id=before_id, top_k=top_k)
+        # the page is shared with the cache (see marketplace.py); build new dicts
+        lots = [{**lot, "top_bids": [_bid_json(*bid) for bid in lot["top_bids"]]} for lot in lots]
+        self.write_json({"lots": lots, "next_before_id": next_before_id})
+
+
+class LotBidsHandler(JSONHandler):
+    def get(self, lot_id):
+        lot_id = int(lot_id)
+        k = self.int_argument("k", 3, maximum=BOOK_DEPTH)
+        if not _fetch_lot(lot_id):
+            raise tornado.web.HTTPError(404, f"Lot {lot_id} not found")
+        self.write_json({
+            "lot_id": lot_id,
+            "bid_count": self.book.count(lot_id),
+            "high_bid": self.book.highest(lot_id),
+            "top_bids": [_bid_json(*bid) for bid in self.book.top(lot_id, k)],
+        })
+
+
+# =====================================================
+# 💰 BIDS
+# =====================================================
+class BidsHandler(JSONHandler):
+    async def post(self):
+        try:
+            body = json.loads(self.request.body or b"{}")
+            lot_id = int(body["lot_id"])
+            # A `max_amount` instead of `bid_amount` sets an auto-bid up to it
+            proxy = body.get("max_amount") is not None
+            amount = float(body["max_amount"] if proxy else body["bid_amount"])
+        except (ValueError, TypeError, KeyError):
+            raise tornado.web.HTTPError(400, "Body must be JSON with 'lot_id' and 'bid_amount' or 'max_amount'")
+        user_name = (body.get("user_name") or "").strip() or "Guest"
+
+        lot = _fetch_lot(lot_id)
+        if not lot:
+            raise tornado.web.HTTPError(404, f"Lot {lot_id} not found")
+        if amount < lot["base_price"]:
+            raise tornado.web.HTTPError(422, f"Bid must be at least ₹{lot['base_price']}")
+
+        try:
+            future = (submit_proxy_bid if proxy else submit_bid)(
+                lot_id,
+                amount,
+                item_name=lot["item_name"],
+                user_name=user_name,
+                user_phone=body.get("user_phone"),
+                client=f"ip:{self.request.remote_ip}",
+            )
+        except LotClosed as e:
+            raise tornado.web.HTTPError(409, str(e))
+        except ValueError as e:
+            raise tornado.web.HTTPError(422, str(e))
+        except RateLimited as e:
+            # send_error() would drop the Retry-After header
+            self.set_header("Retry-After", str(max(1, round(e.retry_after))))
+            return self.write_json({"error": str(e)}, status=429)
+        except IngestQueueFull as e:
+            raise tornado.web.HTTPError(503, str(e))
+        # Wait for the group commit without blocking the event loop
+        try:
+            bid = await asyncio.wait_for(asyncio.wrap_future(future), BID_TIMEOUT)
+        except LotClosed as e:
+            # closed by another process after the in-memory window check
+            raise tornado.web.HTTPError(409, str(e))
+        self.application.settings["feed"].poll()  # push it now, not on the next tick
+        self.write_json(bid, status=201)
+
+
+class UserBidsHandler(JSONHandler):
+    def get(self, user_name):
+        limit = self.int_argument("limit", USER_BIDS_LIMIT, maximum=USER_BIDS_LIMIT)
+        rows = fetch_all(
+            """
+            SELECT bids.id, bids.lot_id, lots.item_name, bids.bid_amount, bids.timestamp
+            FROM all_bids bids
+            JOIN all_lots lots ON bids.lot_id = lots.id
+            WHERE bids.user_name = ?
+            ORDER BY bids.timestamp DESC
+            LIMIT ?
+            """,
+            (user_name, limit),
+        )
+        self.write_json({
+            "user_name": user_name,
+            "bids": [
+                {"id": bid_id, "lot_id": lot_id, "item_name": item_name,
+                 "bid_amount": amount, "timestamp": ts}
+                for bid_id, lot_id, item_name, amount, ts in rows
+            ],
+        })
+
+
+# =====================================================
+# 📤 ADMIN EXPORT
+# =====================================================
+class ExportHandler(JSONHandler):
+    async def get(self, table):
+        # Same signed token as the Streamlit admin session (needs a shared
+        # ADMIN_SESSION_SECRET between the two processes). Only taken from a
+        # header: a token in the URL ends up in access logs and history.
+        scheme, _, token = self.request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not verify_token(token.strip()):
+            self.set_header("WWW-Authenticate", "Bearer")
+            raise tornado.web.HTTPError(401, "Admin token required")
+        fmt = self.get_query_argument("format", "csv")
+        if table not in EXPORT_TABLES or fmt not in EXPORT_FORMATS:
+            raise tornado.web.HTTPError(404, f"No {fmt} export for {table!r}")
+        start = self.get_query_argument("start", None)
+        end = self.get_query_argument("end", None)
+
+        # Export to a temp file off the event loop, then stream it out in
+        # fixed-size pieces: memory stays flat for any table size
+        loop = asyncio.get_running_loop()
+        path, _ = await loop.run_in_executor(None, export_to_tempfile, table, fmt, start, end)
+        try:
+            self.set_header("Content-Type", EXPORT_FORMATS[fmt])
+            self.set_header("Content-Disposition", f'attachment; filename="{table}.{fmt}"')
+            with open(path, "rb") as f:
+                while chunk := f.read(EXPORT_STREAM_BYTES):
+                    self.write(chunk)
+                    await self.flush()
+            self.finish()
+        finally:
+            os.remove(path)
+
+
+# =====================================================
+# 📡 LIVE BID TICKER
+# =====================================================
+class BidFeed:
+    """
+    Tails committed bids into the order book and pushes each changed lot's
+    new top bids to the WebSockets watching it. One poller serves every
+    client, so an idle connection costs nothing but its socket.
+    """
+
+    def __init__(self, tail=None, book=None):
+        self.book = book or OrderBook("lot_id")
+        self.tail = (tail or BidTail()).open(self.book)
+        self._watchers = {}  # lot_id -> set of BidTickerSocket
+
+    def watch(self, socket, lot_ids):
+        for lot_id in lot_ids:
+            self._watchers.setdefault(lot_id, set()).add(socket)
+
+    def unwatch(self, socket, lot_ids):
+        for lot_id in lot_ids:
+            sockets = self._watchers.get(lot_id)
+            if sockets:
+                sockets.discard(socket)
+                if not sockets:
+                    del self._watchers[lot_id]
+
+    def lot_state(self, lot_id):
+        return {
+            "type": "lot",
+            "lot_id": lot_id,
+            "bid_count": self.book.count(lot_id),
+            "high_bid": self.book.highest(lot_id),
+            "top_bids": [_bid_json(*bid) for bid in self.book.top(lot_id, TICKER_TOP_BIDS)],
+        }
+
+    def poll(self):
+        changed = set()
+        for bid in self.tail.poll():
+            self.book.add(bid["lot_id"], bid["id"], bid["user_name"], bid["bid_amount"], bid["timestamp"])
+            changed.add(bid["lot_id"])
+        for lot_id in changed & self._watchers.keys():
+            message = json.dumps(self.lot_state(lot_id), default=str)
+            for socket in list(self._watchers.get(lot_id, ())):
+                socket.send(message)
+
+
+class BidTickerSocket(tornado.websocket.WebSocketHandler):
+    """Sends the current state of each watched lot, then every change."""
+
+    def check_origin(self, origin):
+        if ALLOWED_ORIGINS == "*":
+            return True
+        return origin in {o.strip() for o in ALLOWED_ORIGINS.split(",")}
+
+    def open(self):
+        feed = self.application.settings["feed"]
+        try:
+            self.lot_ids = {int(x) for x in self.get_query_argument("lots", "").split(",") if x}
+        except ValueError:
+            self.lot_ids = set()
+            self.close(code=1003, reason="'lots' must be comma-separated lot ids")
+            return
+        feed.watch(self, self.lot_ids)
+        for lot_id in self.lot_ids:
+            self.send(json.dumps(feed.lot_state(lot_id), default=str))
+
+    def on_message(self, message):
+        pass  # push only
+
+    def on_close(self):
+        self.application.settings["feed"].unwatch(self, getattr(self, "lot_ids", ()))
+
+    def send(self, message):
+        try:
+            self.write_message(message)
+        except tornado.websocket.WebSocketClosedError:
+            self.on_close()
+
+
+# =====================================================
+# 🔧 HELPERS
+# =====================================================
+def _bid_json(user_name, bid_amount, timestamp):
+    return {"user_name": user_name, "bid_amount": bid_amount, "timestamp": timestamp}
+
+
+def _fetch_lot(lot_id):
+    rows = fetch_all("SELECT id, item_name, base_price FROM lots WHERE id = ?", (lot_id,))
+    if not rows:
+        return None
+    lot_id, item_name, base_price = rows[0]
+    return {"id": lot_id, "item_name": item_name, "base_price": base_price}
+
+
+# =====================================================
+# 🚀 APP
+# =====================================================
+def make_app(feed=None, **settings):
+    """Build the Tornado application (migrates the schema on first use)."""
+    ensure_schema()
+    settings.setdefault("websocket_ping_interval", 30)
+    return tornado.web.Application(
+        [
+            (r"/api/lots", LotsHandler),
+            (r"/api/lots/(\d+)/bids", LotBidsHandler),
+            (r"/api/bids", BidsHandler),
+            (r"/api/users/([^/]+)/bids", UserBidsHandler),
+            (r"/api/export/(\w+)", ExportHandler),
+            (r"/ws/bids", BidTickerSocket),
+        ],
+        feed=feed or BidFeed(),
+        **settings,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FruitBid JSON API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    app = make_app()
+    app.listen(args.port, address=args.host)
+    tornado.ioloop.PeriodicCallback(app.settings["feed"].poll, FEED_INTERVAL_MS).start()
+    start_archiver().add_listener(app.settings["feed"].book.discard)
+    start_auction_scheduler()
+    log.info("FruitBid API listening on http://%s:%s", args.host, args.port)
+    tornado.ioloop.IOLoop.current().start()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,19 @@
 # 🍎 app_web.py — Main FruitBid App Entry Point (fixed)
 # =====================================================
 
-import os
-import sqlite3
 from datetime import datetime
 import streamlit as st
 import streamlit.components.v1 as components
 
+from auctions import time_left
+from components.bid_ticker import bid_ticker, bid_ticker_feed
+from db import (ensure_schema, execute_query, fetch_all, get_archiver, get_auction_scheduler, session_client,
+                submit_bid, submit_proxy_bid)
+from marketplace import MARKET_PAGE_SIZE, fetch_marketplace
+
+# Seconds to wait for a queued bid to be committed
+BID_TIMEOUT = 10
+
 # =====================================================
 # ✅ PAGE CONFIG
 # =====================================================
@@ -160,112 +167,13 @@ except ModuleNotFoundError:
     st.warning("⚠️ Sidebar missing — using fallback menu.")
 
 
-# =====================================================
-# 🗄️ DATABASE HELPERS
-# =====================================================
-DB_PATH = os.path.join("/app", "fruitbid.db")
-
-def get_connection():
-    """Return a sqlite3 connection (threads allowed)."""
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
-
-def init_db():
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            phone TEXT,
-            verified INTEGER DEFAULT 0
-        )
-    """)
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS lots (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            item_name TEXT,
-            quantity TEXT,
-            base_price REAL,
-            date_added TEXT
-        )
-    """)
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS bids (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_name TEXT,
-            lot_id INTEGER,
-            bid_amount REAL,
-            timestamp TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def seed_data():
-    """Seed demo lots only when table is empty."""
-    conn = get_connection()
-    c = conn.cursor()
-    try:
-        c.execute("SELECT COUNT(*) FROM lots")
-        count = c.fetchone()[0]
-    except sqlite3.OperationalError:
-        # If schema not present, create it and treat as empty
-        count = 0
-
-    if count == 0:
-        st.info("🌱 Seeding sample fruit lots...")
-        sample_lots = [
-            ("Apples", "100 kg", 120.0, datetime.now().strftime("%Y-%m-%d")),
-            ("Bananas", "200 kg", 60.0, datetime.now().strftime("%Y-%m-%d")),
-            ("Mangoes", "150 kg", 180.0, datetime.now().strftime("%Y-%m-%d")),
-            ("Oranges", "180 kg", 90.0, datetime.now().strftime("%Y-%m-%d")),
-        ]
-        try:
-            c.executemany(
-                "INSERT INTO lots (item_name, quantity, base_price, date_added) VALUES (?, ?, ?, ?)",
-                sample_lots
-            )
-            conn.commit()
-        except sqlite3.OperationalError as e:
-            st.error(f"❌ Database insert failed: {e}")
-    conn.close()
-
-def execute_query(query, params=()):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(query, params)
-    conn.commit()
-    conn.close()
-
-def fetch_all(query, params=()):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(query, params)
-    rows = c.fetchall()
-    conn.close()
-    return rows
-import os
-import sqlite3
-
-# =====================================================
-# 🗄️ DATABASE PATH (Works on both local + Streamlit Cloud)
-# =====================================================
-if os.environ.get("STREAMLIT_RUNTIME") == "true":
-    # Streamlit Cloud environment
-    DB_PATH = os.path.join("/app", "fruitbid.db")
-else:
-    # Local environment (Mac / Windows / Linux)
-    DB_PATH = os.path.join(os.path.dirname(__file__), "fruitbid.db")
-
-def get_connection():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
-
 # =====================================================
 # 🌐 MAIN APP FUNCTION
 # =====================================================
 def main():
-    init_db()
-    seed_data()
+    ensure_schema()
+    get_archiver()  # moves settled lots to the archive file on a schedule
+    get_auction_scheduler()  # closes lots as their auction ends
 
     st.title("🍎 FruitBid — Fresh Produce, Fast Deals")
     selected_page = render_sidebar()
@@ -293,38 +201,87 @@ def main():
     # --------------------------
     elif selected_page == "🏪 Marketplace":
         st.subheader("🏪 Marketplace — Active Lots")
-        lots = fetch_all(
-            "SELECT id, item_name, quantity, base_price, date_added FROM lots ORDER BY id DESC"
-        )
+
+        flash = st.session_state.pop("market_flash", None)
+        if flash:
+            st.success(flash)
+
+        # Keyset cursors of the pages visited so far (None = first page)
+        cursors = st.session_state.setdefault("market_cursors", [None])
+        lots, next_cursor = fetch_marketplace(MARKET_PAGE_SIZE, before_id=cursors[-1])
 
         if not lots:
             st.warning("No lots available yet.")
         else:
-            for lot_id, item_name, quantity, base_price, date_added in lots:
-                with st.expander(f"{item_name} ({quantity}) — Base ₹{base_price}"):
-                    st.write(f"📅 Added: {date_added}")
+            # One socket for the page; every card below listens to it
+            bid_ticker_feed([lot["id"] for lot in lots])
+            for lot in lots:
+                lot_id, item_name = lot["id"], lot["item_name"]
+                with st.expander(f"{item_name} ({lot['quantity']}) — Base ₹{lot['base_price']}"):
+                    st.write(f"📅 Added: {lot['date_added']}")
+                    if lot["status"] != "open":
+                        st.write("🔒 Auction closed")
+                    elif lot["closes_at"]:
+                        st.write(f"⏳ Closes {lot['closes_at']} ({time_left(lot['closes_at'])} left)")
+                    # Current high and top bids, kept live by the page's ticker feed
+                    bid_ticker(lot)
                     bid_amount = st.number_input(
                         f"Enter your bid for {item_name} (₹)",
-                        min_value=float(base_price),
+                        min_value=float(lot["base_price"]),
                         key=f"bid_{lot_id}"
                     )
                     if st.button(f"💰 Submit Bid for {item_name}", key=f"submit_{lot_id}"):
-                        user_name = st.session_state.get("user_name", "Guest")
-                        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        execute_query(
-                            "INSERT INTO bids (user_name, lot_id, bid_amount, timestamp) VALUES (?, ?, ?, ?)",
-                            (user_name, lot_id, bid_amount, timestamp)
-                        )
-                        st.success(f"✅ ₹{bid_amount} bid placed on {item_name}!")
-
-                    top_bids = fetch_all(
-                        "SELECT user_name, bid_amount, timestamp FROM bids WHERE lot_id = ? ORDER BY bid_amount DESC LIMIT 3",
-                        (lot_id,)
+                        try:
+                            submit_bid(
+                                lot_id,
+                                bid_amount,
+                                user_name=st.session_state.get("user_name", "Guest"),
+                                user_phone=st.session_state.get("phone"),
+                                item_name=item_name,
+                                client=session_client(),
+                            ).result(timeout=BID_TIMEOUT)
+                        except Exception as e:
+                            st.error(f"❌ Could not place bid: {e}")
+                        else:
+                            st.session_state["market_flash"] = f"✅ ₹{bid_amount} bid placed on {item_name}!"
+                            st.rerun()
+                    # Private maximum: the app bids one step over rivals up to it
+                    max_amount = st.number_input(
+                        "🤖 Auto-bid up to (₹)",
+                        min_value=float(lot["base_price"]),
+                        key=f"max_{lot_id}"
                     )
-                    if top_bids:
-                        st.write("📊 Top Bids:")
-                        for user, amount, ts in top_bids:
-                            st.write(f"• {user} — ₹{amount} ({ts})")
+                    if st.button(f"🤖 Set Auto-Bid for {item_name}", key=f"proxy_{lot_id}"):
+                        try:
+                            proxy = submit_proxy_bid(
+                                lot_id,
+                                max_amount,
+                                user_name=st.session_state.get("user_name", "Guest"),
+                                user_phone=st.session_state.get("phone"),
+                                item_name=item_name,
+                                client=session_client(),
+                            ).result(timeout=BID_TIMEOUT)
+                        except Exception as e:
+                            st.error(f"❌ Could not set auto-bid: {e}")
+                        else:
+                            standing = "you lead" if proxy["leading"] else "you are out-bid"
+                            st.session_state["market_flash"] = (
+                                f"✅ Auto-bid up to ₹{proxy['max_amount']} set on {item_name} "
+                                f"(high bid ₹{proxy['high_bid']}, {standing})"
+                            )
+                            st.rerun()
+
+        # --------------------------
+        # Pagination
+        # --------------------------
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        if prev_col.button("⬅️ Previous", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+        page_col.caption(f"Page {len(cursors)}")
+        if next_col.button("Next ➡️", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
 
     # --------------------------
     # 💼 MY BIDS
@@ -338,8 +295,8 @@ def main():
             my_bids = fetch_all(
                 """
                 SELECT lots.item_name, bids.bid_amount, bids.timestamp
-                FROM bids
-                JOIN lots ON bids.lot_id = lots.id
+                FROM all_bids bids
+                JOIN all_lots lots ON bids.lot_id = lots.id
                 WHERE bids.user_name = ?
                 ORDER BY bids.timestamp DESC
                 """,
@@ -0,0 +1,375 @@
+# =====================================================
+# 🧊 archive.py — Hot/Cold Split for Settled Lots
+# =====================================================
+# Lots closed more than FRUITBID_ARCHIVE_AFTER_DAYS ago move, with their
+# bids, from fruitbid.db into fruitbid_archive.db, so the tables the app
+# works on every rerun (and their indexes) only hold the live market.
+#
+# Every pooled connection ATTACHes the archive as `archive` and gets two
+# TEMP views that read both files:
+#
+#   all_lots = main.lots UNION ALL archive.lots
+#   all_bids = main.bids UNION ALL archive.bids
+#
+# History screens (My Bids, the user bids API) query the views; everything
+# else keeps using the hot tables.
+#
+# A move copies a batch of lots and bids into the archive and commits,
+# then deletes them from the hot file in a second transaction (WAL commits
+# each attached file on its own, so copy-then-delete is the order that can
+# never lose rows). Archive rows whose lot is still hot are hidden from
+# the views, so a batch never shows twice.
+#
+#   FRUITBID_ARCHIVE_PATH        (default: fruitbid_archive.db beside the DB)
+#   FRUITBID_ARCHIVE_AFTER_DAYS  (default: 90)
+#   FRUITBID_ARCHIVE_INTERVAL    (seconds between runs, default 3600; 0 = off)
+#
+#   python fruitbid/archive.py --days 30 --dry-run
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta
+
+try:
+    from pool import get_pool
+except ModuleNotFoundError:
+    from fruitbid.pool import get_pool
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = 90
+ARCHIVE_INTERVAL = 3600
+ARCHIVE_BATCH = 200  # lots per transaction
+ARCHIVE_PAUSE = 0.05  # seconds between batches, so bid writers get the lock
+
+# Set inside the delete transaction; the user_stats delete triggers skip
+# their work while it exists, so lifetime counters survive the move.
+ARCHIVING_KEY = "archiving"
+
+# Column layout of the archived tables (and of the views over both files)
+ARCHIVE_COLUMNS = {
+    "lots": {
+        "id": "INTEGER PRIMARY KEY",
+        "item_name": "TEXT",
+        "quantity": "TEXT",
+        "base_price": "REAL",
+        "date_added": "TEXT",
+        "status": "TEXT",
+        "winner_name": "TEXT",
+        "winning_bid": "REAL",
+        "closed_at": "TEXT",
+        "opens_at": "TEXT",
+        "closes_at": "TEXT",
+    },
+    "bids": {
+        "id": "INTEGER PRIMARY KEY",
+        "lot_id": "INTEGER",
+        "item_name": "TEXT",
+        "user_id": "INTEGER",
+        "user_name": "TEXT",
+        "user_phone": "TEXT",
+        "bid_amount": "REAL",
+        "timestamp": "TEXT",
+    },
+}
+
+# The history queries search the archive the same way as the hot file
+ARCHIVE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS archive.idx_archive_bids_lot ON bids (lot_id)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_archive_bids_user_name_ts ON bids (user_name, timestamp)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_archive_bids_user_phone ON bids (user_phone)",
+]
+
+# view -> (table, column naming the lot)
+HISTORY_VIEWS = {"all_lots": ("lots", "id"), "all_bids": ("bids", "lot_id")}
+
+
+def archive_path(db_path=None):
+    """The archive file: FRUITBID_ARCHIVE_PATH, else beside `db_path` (default: the app database)."""
+    path = os.getenv("FRUITBID_ARCHIVE_PATH")
+    if path:
+        return path
+    return os.path.join(os.path.dirname(os.path.abspath(db_path or get_pool().config.path)), "fruitbid_archive.db")
+
+
+# =====================================================
+# 🔗 ATTACH + HISTORY VIEWS (pool connect hook)
+# =====================================================
+def _ensure_archive_tables(conn):
+    for table, columns in ARCHIVE_COLUMNS.items():
+        definition = ", ".join(f"{name} {kind}" for name, kind in columns.items())
+        conn.execute(f"CREATE TABLE IF NOT EXISTS archive.{table} ({definition})")
+        existing = {row[1] for row in conn.execute(f"PRAGMA archive.table_info({table})")}
+        for name, kind in columns.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE archive.{table} ADD COLUMN {name} {kind}")
+    for create_sql in ARCHIVE_INDEXES:
+        conn.execute(create_sql)
+
+
+def _create_views(conn, attached):
+    for view, (table, lot_column) in HISTORY_VIEWS.items():
+        columns = ", ".join(ARCHIVE_COLUMNS[table])
+        sql = f"CREATE TEMP VIEW IF NOT EXISTS {view} AS SELECT {columns} FROM main.{table}"
+        if attached:
+            sql += f"""
+                UNION ALL
+                SELECT {columns} FROM archive.{table}
+                WHERE NOT EXISTS (SELECT 1 FROM main.lots WHERE main.lots.id = archive.{table}.{lot_column})
+            """
+        conn.execute(sql)
+
+
+def attach_archive(conn, path=None):
+    """Attach the archive file to `conn` and create the all_lots/all_bids views."""
+    attached = False
+    try:
+        conn.execute("ATTACH DATABASE ? AS archive", (path or archive_path(),))
+        attached = True
+        conn.execute("PRAGMA archive.journal_mode = WAL")
+        _ensure_archive_tables(conn)
+    except sqlite3.Error as e:
+        # History then shows hot rows only; the app itself keeps working
+        log.warning("archive unavailable, history views read the hot file only: %s", e)
+        if attached:
+            conn.execute("DETACH DATABASE archive")
+            attached = False
+    _create_views(conn, attached)
+    return attached
+
+
+_installed = weakref.WeakSet()  # not ids: a replaced pool's id can be reused
+_install_lock = threading.Lock()
+
+
+def install_archive(pool=None):
+    """Attach the archive on every connection `pool` opens (once per pool)."""
+    pool = pool or get_pool()
+    with _install_lock:
+        if pool not in _installed:
+            _installed.add(pool)
+            pool.add_connect_hook(attach_archive)
+    return pool
+
+
+def is_attached(conn) -> bool:
+    return any(row[1] == "archive" for row in conn.execute("PRAGMA database_list"))
+
+
+# =====================================================
+# 🚚 MOVE SETTLED LOTS
+# =====================================================
+_LOT_COLUMNS = ", ".join(ARCHIVE_COLUMNS["lots"])
+_BID_COLUMNS = ", ".join(ARCHIVE_COLUMNS["bids"])
+_BATCH = "(SELECT value FROM json_each(:ids))"
+
+# A won lot waits until settlement.py has invoiced it: settlement reads only
+# the hot lots, so an unbilled lot moved to the archive would never be billed
+SELECT_BATCH_SQL = """
+    SELECT id FROM main.lots
+    WHERE status = 'closed' AND closed_at < :cutoff
+      AND (winner_name IS NULL OR EXISTS (SELECT 1 FROM main.settlement_lots s WHERE s.lot_id = lots.id))
+    ORDER BY closed_at, id
+    LIMIT :limit
+"""
+
+# Phase 1: copy (re-running a batch just overwrites the same rows)
+COPY_SQL = [
+    f"INSERT OR REPLACE INTO archive.lots ({_LOT_COLUMNS}) SELECT {_LOT_COLUMNS} FROM main.lots WHERE id IN {_BATCH}",
+    f"INSERT OR REPLACE INTO archive.bids ({_BID_COLUMNS}) SELECT {_BID_COLUMNS} FROM main.bids WHERE lot_id IN {_BATCH}",
+]
+
+# Phase 2: delete only what the archive holds; a bid that arrived after the
+# copy keeps its lot hot until the next run
+DELETE_SQL = [
+    f"""DELETE FROM main.bids WHERE lot_id IN {_BATCH}
+        AND EXISTS (SELECT 1 FROM archive.bids WHERE archive.bids.id = main.bids.id)""",
+    f"""DELETE FROM main.lots WHERE id IN {_BATCH}
+        AND NOT EXISTS (SELECT 1 FROM main.bids WHERE main.bids.lot_id = main.lots.id)
+        AND EXISTS (SELECT 1 FROM archive.lots WHERE archive.lots.id = main.lots.id)""",
+    f"""DELETE FROM main.user_lots WHERE lot_id IN {_BATCH}
+        AND NOT EXISTS (SELECT 1 FROM main.lots WHERE main.lots.id = user_lots.lot_id)""",
+]
+
+
+def archive_cutoff(days=None):
+    days = ARCHIVE_AFTER_DAYS if days is None else days
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def due_lots(conn, cutoff, limit=ARCHIVE_BATCH):
+    return [row[0] for row in conn.execute(SELECT_BATCH_SQL, {"cutoff": cutoff, "limit": limit})]
+
+
+def archive_batch(conn, lot_ids) -> int:
+    """Move `lot_ids` and their bids to the archive; returns lots moved."""
+    params = {"ids": json.dumps(list(lot_ids))}
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql in COPY_SQL:
+                conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, '1')", (ARCHIVING_KEY,))
+            conn.execute(DELETE_SQL[0], params)
+            moved = conn.execute(DELETE_SQL[1], params).rowcount
+            conn.execute(DELETE_SQL[2], params)
+            conn.execute("DELETE FROM meta WHERE key = ?", (ARCHIVING_KEY,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return moved
+    finally:
+        conn.isolation_level = previous_isolation
+
+
+def archive_settled_lots(days=None, batch_size=ARCHIVE_BATCH, pause=ARCHIVE_PAUSE, conn=None, on_batch=None):
+    """
+    Move every lot closed before `days` ago, `batch_size` lots per
+    transaction; returns lots moved. `on_batch(lot_ids)` is called after
+    each committed batch.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_pool().connect()
+    try:
+        if not is_attached(conn):
+            raise RuntimeError("archive database is not attached")
+        cutoff = archive_cutoff(days)
+        moved = 0
+        while True:
+            lot_ids = due_lots(conn, cutoff, batch_size)
+            if not lot_ids:
+                return moved
+            moved += archive_batch(conn, lot_ids)
+            if on_batch:
+                on_batch(lot_ids)
+            if len(lot_ids) < batch_size:
+                return moved
+            time.sleep(pause)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def archive_stats(conn) -> dict:
+    """Row counts in the hot and archive files."""
+    stats = {}
+    for table in ARCHIVE_COLUMNS:
+        stats[f"hot_{table}"] = conn.execute(f"SELECT COUNT(*) FROM main.{table}").fetchone()[0]
+        if is_attached(conn):
+            stats[f"archived_{table}"] = conn.execute(f"SELECT COUNT(*) FROM archive.{table}").fetchone()[0]
+    return stats
+
+
+# =====================================================
+# ⏰ SCHEDULER
+# =====================================================
+class Archiver:
+    """Daemon thread that archives settled lots every `interval` seconds."""
+
+    def __init__(self, days=None, interval=None, batch_size=ARCHIVE_BATCH):
+        self.days = int(os.getenv("FRUITBID_ARCHIVE_AFTER_DAYS", ARCHIVE_AFTER_DAYS)) if days is None else days
+        self.interval = float(os.getenv("FRUITBID_ARCHIVE_INTERVAL", ARCHIVE_INTERVAL)) if interval is None else interval
+        self.batch_size = batch_size
+        self.last_run = None
+        self.last_moved = 0
+        self.last_error = None
+        self._listeners = []
+        self._thread = None
+        self._stop = threading.Event()
+
+    def add_listener(self, callback):
+        """Call `callback(lot_ids)` after each batch this archiver moves."""
+        self._listeners.append(callback)
+
+    def _notify(self, lot_ids):
+        for callback in self._listeners:
+            try:
+                callback(lot_ids)
+            except Exception:
+                log.exception("archive listener failed")
+
+    def run_once(self) -> int:
+        try:
+            self.last_moved = archive_settled_lots(self.days, self.batch_size, on_batch=self._notify)
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            log.exception("archiving settled lots failed")
+        self.last_run = time.time()
+        return self.last_moved
+
+    def start(self):
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="lot-archiver", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+
+_archiver = None
+_archiver_lock = threading.Lock()
+
+
+def start_archiver() -> Archiver:
+    """The process-wide archiver, started on first use."""
+    global _archiver
+    if _archiver is None:
+        with _archiver_lock:
+            if _archiver is None:
+                install_archive()
+                _archiver = Archiver().start()
+    return _archiver
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move settled lots and their bids to the archive file.")
+    parser.add_argument("--days", type=int, default=int(os.getenv("FRUITBID_ARCHIVE_AFTER_DAYS", ARCHIVE_AFTER_DAYS)),
+                        help="archive lots closed more than this many days ago")
+    parser.add_argument("--batch", type=int, default=ARCHIVE_BATCH, help="lots per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="only count the lots that would move")
+    args = parser.parse_args(argv)
+
+    install_archive()
+    conn = get_pool().connect()
+    try:
+        if args.dry_run:
+            # Same condition as a real run (LIMIT -1: every due lot, not one batch)
+            due = len(due_lots(conn, archive_cutoff(args.days), limit=-1))
+            print(f"🔍 {due} lots would move (closed more than {args.days} days ago, invoiced if won)")
+            return 0
+        moved = archive_settled_lots(args.days, args.batch, conn=conn)
+        stats = archive_stats(conn)
+        print(f"✅ {moved} lots archived → {archive_path()} "
+              f"(hot: {stats['hot_lots']} lots / {stats['hot_bids']} bids, "
+              f"archived: {stats['archived_lots']} lots / {stats['archived_bids']} bids)")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
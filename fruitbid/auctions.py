@@ -0,0 +1,259 @@
+# =====================================================
+# ⏳ auctions.py — Timed Auctions
+# =====================================================
+# Every lot bids between `opens_at` and `closes_at` (local time, migration
+# 9). Lots inserted without a window get one from the `auction_hours`
+# setting (default 24 h); lots created before auctions were timed have no
+# `closes_at` and stay open until an admin closes them.
+#
+# AuctionScheduler keeps the windows of the open lots in memory:
+#
+# * is_open(lot_id) is a dict lookup, so placing a bid never queries `lots`
+# * one thread sleeps on a min-heap of deadlines until the next lot is due,
+#   then closes every expired lot with a single UPDATE; the settle trigger
+#   records each lot's winner and high bid
+# * the open windows are reloaded with one query every RESYNC_INTERVAL
+#   seconds, which picks up lots added or closed by other processes
+#
+#   FRUITBID_AUCTION_RESYNC   (seconds, default 5)
+
+import heapq
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+try:
+    from pool import get_pool
+except ModuleNotFoundError:
+    from fruitbid.pool import get_pool
+
+log = logging.getLogger(__name__)
+
+AUCTION_HOURS = 24
+AUCTION_HOURS_KEY = "auction_hours"
+RESYNC_INTERVAL = 5.0
+# Bids accepted just before a deadline are still in the ingest queue; the
+# lot is closed this many seconds later so they are counted
+CLOSE_GRACE = 1.0
+# A bid for an unknown lot reloads the windows at most this often
+MISS_RESYNC_INTERVAL = 0.5
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+OPEN_WINDOWS_SQL = "SELECT id, opens_at, closes_at FROM lots WHERE status = 'open'"
+
+# The settle trigger (migration 6) fills in winner_name and winning_bid
+CLOSE_DUE_SQL = """
+    UPDATE lots SET status = 'closed', closed_at = closes_at
+    WHERE status = 'open' AND closes_at <= ?
+    RETURNING id
+"""
+
+
+class LotClosed(Exception):
+    """Raised when a bid arrives for a lot outside its auction window."""
+
+    def __init__(self, lot_id, opens_at=None):
+        self.lot_id = lot_id
+        if opens_at is not None:
+            message = f"Bidding on lot {lot_id} opens at {datetime.fromtimestamp(opens_at):%Y-%m-%d %H:%M}"
+        else:
+            message = f"Lot {lot_id} is closed for bidding"
+        super().__init__(message)
+
+
+def parse_time(value):
+    """Epoch seconds for a stored local time ('YYYY-MM-DD HH:MM[:SS]'), or None."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def format_time(epoch):
+    return datetime.fromtimestamp(epoch).strftime(TIME_FORMAT)
+
+
+def time_left(closes_at, now=None) -> str:
+    """'2d 4h', '3h 05m', '4m 10s' until `closes_at`; '—' when there is no deadline."""
+    closes = parse_time(closes_at)
+    if closes is None:
+        return "—"
+    seconds = int(closes - (time.time() if now is None else now))
+    if seconds <= 0:
+        return "Ended"
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if days:
+        return f"{days}d {hours}h"
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    return f"{minutes}m {seconds:02d}s"
+
+
+# =====================================================
+# ⏰ SCHEDULER
+# =====================================================
+class AuctionScheduler:
+    """Open-lot windows in memory plus a thread that closes lots on time."""
+
+    def __init__(self, pool=None, resync_interval=None, grace=CLOSE_GRACE):
+        self.pool = pool or get_pool()
+        self.resync_interval = (
+            float(os.getenv("FRUITBID_AUCTION_RESYNC", RESYNC_INTERVAL)) if resync_interval is None else resync_interval
+        )
+        self.grace = grace
+        self._windows = {}  # lot_id -> (opens_at, closes_at) in epoch seconds; None = unbounded
+        self._heap = []  # (closes_at, lot_id); entries of lots no longer open are skipped
+        self._max_id = 0
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._metrics = {"closed": 0, "close_batches": 0, "resyncs": 0, "rejected": 0}
+
+    # ---------------- bid-time check ----------------
+    def is_open(self, lot_id, now=None) -> bool:
+        """True while `lot_id` is inside its auction window. O(1)."""
+        return self._check(lot_id, now) is None
+
+    def check(self, lot_id, now=None):
+        """Raise LotClosed unless `lot_id` is open for bidding."""
+        opens_at = self._check(lot_id, now)
+        if opens_at is not None:
+            with self._lock:
+                self._metrics["rejected"] += 1
+            raise LotClosed(lot_id, opens_at or None)
+
+    def _check(self, lot_id, now):
+        """None when open, else the opening time (0 for a closed lot)."""
+        window = self._windows.get(lot_id)
+        if window is None and lot_id > self._max_id and time.monotonic() - self._synced_at > MISS_RESYNC_INTERVAL:
+            self.resync()  # a lot added since the last reload
+            window = self._windows.get(lot_id)
+        if window is None:
+            return 0
+        opens_at, closes_at = window
+        now = time.time() if now is None else now
+        if closes_at is not None and now >= closes_at:
+            return 0
+        if opens_at is not None and now < opens_at:
+            return opens_at
+        return None
+
+    # ---------------- state ----------------
+    def resync(self):
+        """Reload the windows of every open lot (one query)."""
+        with self.pool.connection() as conn:
+            rows = conn.execute(OPEN_WINDOWS_SQL).fetchall()
+            max_id = conn.execute("SELECT MAX(id) FROM lots").fetchone()[0] or 0
+        windows = {lot_id: (parse_time(opens_at), parse_time(closes_at)) for lot_id, opens_at, closes_at in rows}
+        heap = [(closes_at, lot_id) for lot_id, (_, closes_at) in windows.items() if closes_at is not None]
+        heapq.heapify(heap)
+        with self._lock:
+            # Readers see either the old or the new dict, never a half-built one
+            self._windows, self._heap, self._max_id = windows, heap, max_id
+            self._synced_at = time.monotonic()
+            self._metrics["resyncs"] += 1
+        self._wake.set()
+
+    def forget(self, lot_ids):
+        """Stop accepting bids for `lot_ids` (closed elsewhere in this process)."""
+        with self._lock:
+            for lot_id in lot_ids:
+                self._windows.pop(lot_id, None)
+
+    def next_deadline(self):
+        """Earliest closes_at among open lots, or None."""
+        with self._lock:
+            heap = self._heap
+            while heap:
+                closes_at, lot_id = heap[0]
+                window = self._windows.get(lot_id)
+                if window is not None and window[1] == closes_at:
+                    return closes_at
+                heapq.heappop(heap)
+            return None
+
+    def _drop_due(self, cutoff):
+        """Forget every window that ended by `cutoff`."""
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= cutoff:
+                closes_at, lot_id = heapq.heappop(heap)
+                window = self._windows.get(lot_id)
+                if window is not None and window[1] == closes_at:
+                    del self._windows[lot_id]
+
+    def close_due(self, now=None) -> list:
+        """Close every open lot whose deadline (plus grace) has passed, in one transaction."""
+        now = time.time() if now is None else now
+        cutoff = now - self.grace
+        with self.pool.transaction() as conn:
+            closed = [row[0] for row in conn.execute(CLOSE_DUE_SQL, (format_time(cutoff),))]
+        # Due lots this UPDATE did not close were closed by another process
+        # (or got a later deadline, which the next resync brings back); either
+        # way their heap entries must go, or the thread would spin on them
+        self._drop_due(cutoff)
+        self.forget(closed)
+        with self._lock:
+            self._metrics["closed"] += len(closed)
+            self._metrics["close_batches"] += 1 if closed else 0
+        if closed:
+            log.info("closed %d lots at their deadline", len(closed))
+        return closed
+
+    def stats(self) -> dict:
+        with self._lock:
+            m = dict(self._metrics)
+            m["open_lots"] = len(self._windows)
+        deadline = self.next_deadline()
+        m["next_close"] = format_time(deadline) if deadline is not None else None
+        return m
+
+    # ---------------- thread ----------------
+    def start(self):
+        if self._thread is None:
+            self.resync()
+            self._thread = threading.Thread(target=self._run, name="auction-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            deadline = self.next_deadline()
+            timeout = self.resync_interval
+            if deadline is not None:
+                timeout = min(timeout, max(0.0, deadline + self.grace - time.time()))
+            self._wake.wait(timeout)
+            self._wake.clear()
+            try:
+                deadline = self.next_deadline()
+                if deadline is not None and deadline + self.grace <= time.time():
+                    self.close_due()
+                if time.monotonic() - self._synced_at >= self.resync_interval:
+                    self.resync()
+            except Exception:
+                log.exception("auction scheduler tick failed")
+                time.sleep(1)
+
+
+# =====================================================
+# 🌐 PROCESS-WIDE SCHEDULER
+# =====================================================
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_auction_scheduler() -> AuctionScheduler:
+    """The process-wide scheduler, started on first use."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = AuctionScheduler().start()
+    return _scheduler
@@ -0,0 +1,70 @@
+# =====================================================
+# 📡 bid_feed.py — Committed-Bid Tail
+# =====================================================
+# Follows the `bids` table from any process: every commit (Streamlit app,
+# API server, scripts) shows up here in id order. Idle polls cost one
+# `PRAGMA data_version` read — the bids query only runs after another
+# connection has committed something.
+
+try:
+    from pool import get_pool
+except ModuleNotFoundError:
+    from fruitbid.pool import get_pool
+
+TAIL_SQL = """
+    SELECT id, lot_id, item_name, user_name, bid_amount, timestamp
+    FROM bids
+    WHERE id > ?
+    ORDER BY id
+    LIMIT ?
+"""
+
+TAIL_COLUMNS = ("id", "lot_id", "item_name", "user_name", "bid_amount", "timestamp")
+
+
+class BidTail:
+    """Returns the bids committed since the last poll, oldest first."""
+
+    def __init__(self, pool=None, batch_size: int = 1000):
+        self.pool = pool or get_pool()
+        self.batch_size = batch_size
+        self.last_id = 0
+        self._conn = None
+        self._data_version = None
+
+    def open(self, order_book=None):
+        """
+        Start tailing from the current end of `bids`. An `order_book` is
+        loaded in the same read transaction, so no bid is missed or counted twice.
+        """
+        self._conn = self.pool.connect()
+        self._conn.execute("BEGIN")
+        try:
+            if order_book is not None:
+                order_book.load(self._conn)
+            self.last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM bids").fetchone()[0]
+        finally:
+            self._conn.commit()
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return self
+
+    def poll(self):
+        """New bids as dicts; [] without touching `bids` if nothing committed."""
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return []
+        self._data_version = data_version
+
+        bids = []
+        while True:
+            rows = self._conn.execute(TAIL_SQL, (self.last_id, self.batch_size)).fetchall()
+            bids += [dict(zip(TAIL_COLUMNS, row)) for row in rows]
+            if rows:
+                self.last_id = rows[-1][0]
+            if len(rows) < self.batch_size:
+                return bids
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,282 @@
+# =====================================================
+# 📥 bid_ingest.py — Write-behind Bid Queue (group commit)
+# =====================================================
+# Bids are pushed onto a bounded in-process queue and written by a single
+# writer thread. The writer drains whatever arrived within a few
+# milliseconds and inserts it in ONE transaction, so a burst of hundreds of
+# bids pays for one fsync instead of hundreds (and never fights itself for
+# the SQLite write lock). Callers get a Future that resolves with the saved
+# bid once its batch has committed.
+#
+# A bid submitted with `max_amount` is a proxy: the buyer's private maximum.
+# It is not written to `bids` itself; resolvers (proxy_bids.py) run inside
+# the same transaction and write whatever auto-bids it implies.
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime
+
+from auctions import LotClosed, start_auction_scheduler
+from pool import get_pool
+from proxy_bids import proxy_key, resolve_proxies
+from rate_limit import check_rate
+
+log = logging.getLogger(__name__)
+
+# The scheduler's windows in memory can be seconds old; the insert itself
+# refuses a bid on a lot that is closed or past its deadline
+INSERT_BID_SQL = """
+    INSERT INTO bids (lot_id, item_name, user_id, user_name, user_phone, bid_amount, timestamp)
+    SELECT :lot_id, :item_name, :user_id, :user_name, :user_phone, :bid_amount, :timestamp
+    WHERE :lot_id IS NULL OR EXISTS (
+        SELECT 1 FROM lots
+        WHERE id = :lot_id AND status = 'open' AND (closes_at IS NULL OR closes_at > :timestamp)
+    )
+"""
+
+
+class IngestQueueFull(Exception):
+    """Raised when the bid queue stays full for longer than `enqueue_timeout`."""
+
+
+# =====================================================
+# ✍️ INGESTOR
+# =====================================================
+class BidIngestor:
+    """Bounded bid queue drained by one group-committing writer thread."""
+
+    def __init__(
+        self,
+        pool=None,
+        max_queue=int(os.getenv("FRUITBID_INGEST_MAX_QUEUE", 10000)),
+        max_batch=int(os.getenv("FRUITBID_INGEST_MAX_BATCH", 500)),
+        flush_interval=float(os.getenv("FRUITBID_INGEST_FLUSH_MS", 5)) / 1000,
+        enqueue_timeout=1.0,
+        synchronous=os.getenv("FRUITBID_INGEST_SYNCHRONOUS", "FULL"),
+    ):
+        self.pool = pool or get_pool()
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.synchronous = synchronous
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._listeners = []
+        self._resolvers = []
+        self._commit_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._metrics = {
+            "submitted": 0,
+            "written": 0,
+            "failed": 0,
+            "rejected": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "flush_ms_total": 0.0,
+            "flush_ms_max": 0.0,
+        }
+
+    # ---------------- producer side ----------------
+    def submit(self, lot_id, bid_amount, user_name=None, user_phone=None,
+               item_name=None, user_id=None, timestamp=None, max_amount=None) -> Future:
+        """Queue a bid (or, with `max_amount`, a proxy); the Future resolves to the saved dict."""
+        bid = {
+            "lot_id": lot_id,
+            "item_name": item_name,
+            "user_id": user_id,
+            "user_name": user_name,
+            "user_phone": user_phone,
+            "bid_amount": float(bid_amount),
+            "timestamp": timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "max_amount": None if max_amount is None else float(max_amount),
+        }
+        future = Future()
+        self._ensure_started()
+        try:
+            self._queue.put((bid, future), timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._lock:
+                self._metrics["rejected"] += 1
+            raise IngestQueueFull("Too many bids in flight — please retry in a moment.")
+        with self._lock:
+            self._metrics["submitted"] += 1
+        return future
+
+    def add_listener(self, listener):
+        """Call `listener(bids)` with every committed batch (writer thread)."""
+        self._listeners.append(listener)
+
+    def add_resolver(self, resolver):
+        """
+        Call `resolver(conn, bids)` inside every batch transaction, after its
+        bids are inserted; it returns any further bids it wrote.
+        """
+        self._resolvers.append(resolver)
+
+    @contextmanager
+    def paused(self):
+        """Hold off commits, e.g. while a cache is loaded from `bids`."""
+        with self._commit_lock:
+            yield
+
+    # ---------------- writer side ----------------
+    def _ensure_started(self):
+        # also restarts a writer that died, so the queue is never left undrained
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="bid-writer", daemon=True)
+                    self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        conn = None
+        while True:
+            batch = self._next_batch()
+            try:
+                if conn is None:
+                    conn = self.pool.connect()
+                    conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+                self._flush(conn, batch)
+            except Exception as e:
+                # fail this batch's callers, then reconnect for the next one
+                log.exception("bid writer failed a batch of %d", len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                with self._lock:
+                    self._metrics["failed"] += len(batch)
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except sqlite3.Error:
+                        pass
+                    conn = None
+
+    def _flush(self, conn, batch):
+        """Write one batch, notify the listeners and resolve its futures."""
+        start = time.perf_counter()
+        with self._commit_lock:
+            saved, failed = self._write(conn, batch)
+            written = [bid for bid, _ in saved if bid.get("max_amount") is None]
+            for listener in self._listeners:
+                try:
+                    listener(written)
+                except Exception:
+                    pass  # a broken cache must not stop ingestion
+        elapsed = (time.perf_counter() - start) * 1000
+
+        for bid, future in saved:
+            if future is not None and not future.done():  # auto-bids have no caller waiting
+                future.set_result(bid)
+        for (bid, future), error in failed:
+            if not future.done():
+                future.set_exception(error)
+
+        with self._lock:
+            m = self._metrics
+            m["batches"] += 1
+            m["written"] += len(written)
+            m["failed"] += len(failed)
+            m["last_batch_size"] = len(batch)
+            m["max_batch_size"] = max(m["max_batch_size"], len(batch))
+            m["flush_ms_total"] += elapsed
+            m["flush_ms_max"] = max(m["flush_ms_max"], elapsed)
+
+    def _write(self, conn, batch):
+        """Insert a batch in one transaction; on error, isolate the bad bids."""
+        try:
+            with conn:
+                for bid, _ in batch:
+                    if bid["max_amount"] is None:
+                        cur = conn.execute(INSERT_BID_SQL, bid)
+                        if cur.rowcount == 0:
+                            raise LotClosed(bid["lot_id"])
+                        bid["id"] = cur.lastrowid
+                bids = [bid for bid, _ in batch]
+                extra = [(auto, None) for resolver in self._resolvers for auto in resolver(conn, bids)]
+            return batch + extra, []
+        except (sqlite3.Error, ValueError, LotClosed) as e:
+            if len(batch) == 1:
+                return [], [(batch[0], e)]
+
+        # Replay one by one so a single bad bid does not fail its neighbours
+        saved, failed = [], []
+        for item in batch:
+            ok, bad = self._write(conn, [item])
+            saved += ok
+            failed += bad
+        return saved, failed
+
+    # ---------------- metrics ----------------
+    def stats(self) -> dict:
+        """Queue depth, batch sizes and flush timings."""
+        with self._lock:
+            m = dict(self._metrics)
+        m["queue_depth"] = self._queue.qsize()
+        m["max_queue"] = self._queue.maxsize
+        m["avg_batch_size"] = m["written"] / m["batches"] if m["batches"] else 0.0
+        m["flush_ms_avg"] = m["flush_ms_total"] / m["batches"] if m["batches"] else 0.0
+        return m
+
+
+# =====================================================
+# 🌐 PROCESS-WIDE INGESTOR
+# =====================================================
+_ingestor = None
+_ingestor_lock = threading.Lock()
+
+
+def get_bid_ingestor() -> BidIngestor:
+    """The process-wide ingestor, created on first use."""
+    global _ingestor
+    if _ingestor is None:
+        with _ingestor_lock:
+            if _ingestor is None:
+                _ingestor = BidIngestor()
+                _ingestor.add_resolver(resolve_proxies)
+    return _ingestor
+
+
+def submit_bid(lot_id, bid_amount, client=None, **fields) -> Future:
+    """
+    Queue a bid on the process-wide ingestor. Raises LotClosed outside the
+    lot's auction window and RateLimited for a flooding bidder.
+
+    Bidders are limited by phone; without one, by `client` (the caller's
+    browser session or remote address), so anonymous "Guest" bidders do
+    not share one bucket. The user name is only the last resort.
+    """
+    if lot_id is not None:
+        start_auction_scheduler().check(lot_id)
+    check_rate("bid", fields.get("user_phone") or client or fields.get("user_name"))
+    return get_bid_ingestor().submit(lot_id, bid_amount, **fields)
+
+
+def submit_proxy_bid(lot_id, max_amount, **fields) -> Future:
+    """
+    Queue a private maximum for `lot_id`; the app bids for the buyer up to
+    it. The Future resolves with `max_amount`, `high_bid` and `leading`.
+    Raises ValueError for a buyer with neither phone nor user id.
+    """
+    if proxy_key(fields.get("user_phone"), fields.get("user_id")) is None:
+        raise ValueError("An auto-bid needs a phone number or user id")
+    return submit_bid(lot_id, max_amount, max_amount=max_amount, **fields)
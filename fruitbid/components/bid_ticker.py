@@ -0,0 +1,153 @@
+# =====================================================
+# 📡 components/bid_ticker.py — Live Top Bids for Lot Cards
+# =====================================================
+# Renders a lot's current high and top bids in a small iframe that keeps
+# itself up to date from the API server's WebSocket (`/ws/bids`). New bids
+# appear in place within a fraction of a second — no Streamlit rerun. If
+# the API server is not running, the card simply shows the values it was
+# rendered with.
+#
+# A page opens ONE socket, not one per card: `bid_ticker_feed(lot_ids)`
+# renders an invisible frame subscribed to every visible lot, which
+# re-broadcasts each update to the cards over a same-origin
+# BroadcastChannel.
+#
+#   bid_ticker_feed([lot["id"] for lot in lots])
+#   for lot in lots:
+#       bid_ticker(lot)
+
+import json
+import os
+
+import streamlit.components.v1 as components
+
+# Full WebSocket URL, e.g. wss://bids.example.com/ws/bids. When unset the
+# browser connects to the page's own host on FRUITBID_API_PORT.
+TICKER_URL = os.getenv("FRUITBID_TICKER_URL", "")
+API_PORT = os.getenv("FRUITBID_API_PORT", "8600")
+
+TICKER_HEIGHT = 120
+
+CHANNEL = "fruitbid-bids"
+
+_FEED_TEMPLATE = """
+<!doctype html>
+<html>
+  <body>
+    <script>
+      (function() {
+        const lotIds = __LOTS__;
+        const configured = __URL__;
+        const port = __PORT__;
+        const channel = new BroadcastChannel(__CHANNEL__);
+
+        function url() {
+          const query = "?lots=" + lotIds.join(",");
+          if (configured) return configured + query;
+          let host = "localhost", secure = false;
+          try {
+            host = window.parent.location.hostname || host;
+            secure = window.parent.location.protocol === "https:";
+          } catch (e) {}
+          return (secure ? "wss://" : "ws://") + host + ":" + port + "/ws/bids" + query;
+        }
+
+        let delay = 1000;
+        function connect() {
+          let ws;
+          try { ws = new WebSocket(url()); } catch (e) { return; }
+          ws.onopen = function() { delay = 1000; };
+          ws.onmessage = function(event) { channel.postMessage(JSON.parse(event.data)); };
+          ws.onclose = function() {
+            setTimeout(connect, delay);
+            delay = Math.min(delay * 2, 30000);
+          };
+        }
+
+        if (lotIds.length) connect();
+      })();
+    </script>
+  </body>
+</html>
+"""
+
+_CARD_TEMPLATE = """
+<!doctype html>
+<html>
+  <head>
+    <meta charset="utf-8" />
+    <style>
+      body { margin:0; font-family: "Source Sans Pro", sans-serif; color: #004d40; font-size: 0.95rem; }
+      .high { font-weight: 600; margin-bottom: 0.3rem; }
+      .flash { animation: flash 1s ease-out; }
+      @keyframes flash { from { background: #c8f7c5; } to { background: transparent; } }
+      ul { margin: 0; padding-left: 1.1rem; }
+    </style>
+  </head>
+  <body>
+    <div id="high" class="high"></div>
+    <ul id="top"></ul>
+    <script>
+      (function() {
+        const state = __STATE__;
+        const high = document.getElementById("high");
+        const top = document.getElementById("top");
+
+        function render(lot, flash) {
+          high.textContent = lot.bid_count
+            ? "🔥 Current high: ₹" + lot.high_bid + " (" + lot.bid_count + " bids)"
+            : "No bids yet — be the first!";
+          top.replaceChildren(...lot.top_bids.map(function(b) {
+            const li = document.createElement("li");
+            li.textContent = b.user_name + " — ₹" + b.bid_amount + " (" + b.timestamp + ")";
+            return li;
+          }));
+          if (flash) {
+            high.classList.remove("flash");
+            void high.offsetWidth;
+            high.classList.add("flash");
+          }
+        }
+
+        // Updates come from the page's feed frame (bid_ticker_feed)
+        new BroadcastChannel(__CHANNEL__).onmessage = function(event) {
+          const lot = event.data;
+          if (lot.lot_id !== state.lot_id) return;
+          const changed = lot.bid_count !== state.bid_count;
+          Object.assign(state, lot);
+          render(state, changed);
+        };
+
+        render(state, false);
+      })();
+    </script>
+  </body>
+</html>
+"""
+
+
+def _fill(template, **values):
+    for name, value in values.items():
+        template = template.replace(f"__{name}__", json.dumps(value, default=str).replace("</", "<\\/"))
+    return template
+
+
+def bid_ticker_feed(lot_ids):
+    """One WebSocket for the page, feeding the bid_ticker cards of `lot_ids`."""
+    html = _fill(_FEED_TEMPLATE, LOTS=[int(lot_id) for lot_id in lot_ids], URL=TICKER_URL,
+                 PORT=API_PORT, CHANNEL=CHANNEL)
+    components.html(html, height=0)
+
+
+def bid_ticker(lot, height: int = TICKER_HEIGHT):
+    """Live 'current high' and top bids for a marketplace lot dict (needs bid_ticker_feed on the page)."""
+    state = {
+        "lot_id": lot["id"],
+        "bid_count": lot["bid_count"],
+        "high_bid": lot["high_bid"],
+        "top_bids": [
+            {"user_name": user, "bid_amount": amount, "timestamp": ts}
+            for user, amount, ts in lot["top_bids"]
+        ],
+    }
+    components.html(_fill(_CARD_TEMPLATE, STATE=state, CHANNEL=CHANNEL), height=height)
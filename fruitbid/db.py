@@ -1,87 +1,64 @@
 # db.py
-import sqlite3
 from datetime import datetime
-import time
 
-DB_PATH = "fruitbid.db"
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from archive import archive_stats, install_archive, start_archiver
+from auctions import start_auction_scheduler
+from bid_ingest import get_bid_ingestor, submit_bid, submit_proxy_bid
+from lot_summary import check_lot_summary, rebuild_lot_summary
+from lucky_dip import draw_lucky_dip
+from migrations import ensure_schema, migrate
+from pool import get_pool
+from proxy_bids import get_proxies
+from settlement import settle
+from user_stats import check_user_stats, get_user_stats, rebuild_user_stats
+from versioned_cache import cache_stats, cached
+
+# The pages' data-access API, including what it re-exports from bid_ingest
+# and migrations
+__all__ = [
+    "DB_PATH", "db_connection", "get_db_connection", "init_db", "ensure_schema", "initialize_items",
+    "fetch_all", "execute_query", "get_setting", "set_setting", "session_client",
+    "submit_bid", "submit_proxy_bid", "get_bid_ingestor", "get_auction_scheduler", "close_lot",
+    "get_archiver", "archive_now", "archive_overview", "run_lucky_dip", "lucky_dip_results",
+    "settle_now", "recent_settlements", "cache_overview", "rebuild_aggregates", "check_aggregates",
+    "user_dashboard_stats", "user_proxies",
+]
+
+DB_PATH = get_pool().config.path
+
+# Every connection sees the archive file and the all_lots / all_bids views
+install_archive()
 
 # --------------------------
-# Safe Connection Handler
+# Pooled Connection Handling
 # --------------------------
-def get_db_connection(retries=3, delay=0.2):
-    """Get SQLite connection with retry for busy DB."""
-    for _ in range(retries):
-        try:
-            conn = sqlite3.connect(DB_PATH, timeout=5, check_same_thread=False)
-            conn.execute("PRAGMA foreign_keys = ON")
-            return conn
-        except sqlite3.OperationalError as e:
-            if "database is locked" in str(e):
-                time.sleep(delay)
-            else:
-                raise
-    raise Exception("Database connection failed after retries")
+def db_connection():
+    """Borrow a pooled connection: `with db_connection() as conn: ...`."""
+    return get_pool().connection()
+
+def get_db_connection():
+    """Open a standalone connection with the pool's settings (caller closes it)."""
+    return get_pool().connect()
 
 # --------------------------
 # Schema Initialization
 # --------------------------
 def init_db():
-    """Create all required tables if they don't exist."""
-    conn = get_db_connection()
-    c = conn.cursor()
-
-    try:
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                phone TEXT UNIQUE
-            )
-        """)
-
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS lots (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                item_name TEXT NOT NULL,
-                quantity TEXT,
-                base_price REAL NOT NULL,
-                date_added TEXT
-            )
-        """)
-
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS bids (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                lot_id INTEGER NOT NULL,
-                bid_amount REAL NOT NULL,
-                timestamp TEXT,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-                FOREIGN KEY (lot_id) REFERENCES lots(id) ON DELETE CASCADE
-            )
-        """)
-
-        # Optional meta table for version tracking
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS meta (
-                key TEXT PRIMARY KEY,
-                value TEXT
-            )
-        """)
-
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise Exception(f"Error creating tables: {str(e)}")
-    finally:
-        conn.close()
+    """Apply any pending schema migrations (always checks the database)."""
+    return migrate()
 
 # --------------------------
 # Insert Sample Lots
 # --------------------------
 def initialize_items():
     """Insert sample lots if table is empty."""
-    conn = get_db_connection()
+    with db_connection() as conn:
+        _insert_sample_lots(conn)
+
+def _insert_sample_lots(conn):
     c = conn.cursor()
 
     try:
@@ -106,25 +83,132 @@ def initialize_items():
     except Exception as e:
         conn.rollback()
         raise Exception(f"Error inserting items: {str(e)}")
-    finally:
-        conn.close()
 
 # --------------------------
 # Utility for Clean Queries
 # --------------------------
 def fetch_all(query, params=()):
     """Fetch multiple rows safely."""
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute(query, params)
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    with db_connection() as conn:
+        return conn.execute(query, params).fetchall()
 
 def execute_query(query, params=()):
-    """Execute INSERT/UPDATE safely."""
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute(query, params)
-    conn.commit()
-    conn.close()
+    """Execute INSERT/UPDATE safely; returns the new row id."""
+    with get_pool().transaction() as conn:
+        return conn.execute(query, params).lastrowid
+
+# --------------------------
+# App Settings
+# --------------------------
+@cached("settings")
+def _load_settings():
+    return dict(fetch_all("SELECT key, value FROM settings"))
+
+def get_setting(key, default=None):
+    """Fetch an app setting value (`default` when unset); cached until `settings` changes."""
+    return _load_settings().get(key, default)
+
+def set_setting(key, value):
+    """Insert or update an app setting."""
+    execute_query("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+# --------------------------
+# Bid Rate-Limit Identity
+# --------------------------
+def session_client():
+    """This browser session, the bid rate-limit key for a bidder without a phone."""
+    ctx = get_script_run_ctx()
+    return f"session:{ctx.session_id}" if ctx else None
+
+# --------------------------
+# Timed Auctions
+# --------------------------
+@st.cache_resource
+def get_auction_scheduler():
+    """Process-wide auction clock; its thread closes lots as their deadlines pass."""
+    return start_auction_scheduler()
+
+# --------------------------
+# Hot / Cold Archive
+# --------------------------
+@st.cache_resource
+def get_archiver():
+    """Process-wide scheduler moving settled lots to the archive file."""
+    return start_archiver()
+
+def archive_now():
+    """Archive every lot past the cut-off right away; returns lots moved."""
+    return get_archiver().run_once()
+
+def archive_overview():
+    """Row counts in the hot and archive files."""
+    with db_connection() as conn:
+        return archive_stats(conn)
+
+# --------------------------
+# Lucky Dip
+# --------------------------
+def run_lucky_dip(seed=None, since=None):
+    """Draw and save a winner for every item; returns the draw (see lucky_dip.py)."""
+    return draw_lucky_dip(seed, since)
+
+def lucky_dip_results():
+    """The latest winner per item."""
+    return fetch_all("""
+        SELECT item_name, user_name, user_phone, bid_amount, entries, pool_amount, seed, drawn_at
+        FROM lucky_dip ORDER BY item_name
+    """)
+
+# --------------------------
+# Settlement
+# --------------------------
+def settle_now(until=None):
+    """Invoice every closed, unbilled lot (see settlement.py); returns the run summary."""
+    return settle(until)
+
+def recent_settlements(limit=50):
+    """The latest invoices, newest first."""
+    return fetch_all("""
+        SELECT run_at, bidder, lots, kg, gross, discount, fee, total
+        FROM settlements ORDER BY id DESC LIMIT ?
+    """, (limit,))
+
+# --------------------------
+# Query Cache
+# --------------------------
+def cache_overview():
+    """Hit/miss counts of every version-cached function (see versioned_cache.py)."""
+    return cache_stats()
+
+# --------------------------
+# Incremental Aggregates
+# --------------------------
+def rebuild_aggregates():
+    """Recompute `lot_summary` and `user_stats` (recovery); returns rows written per table."""
+    with get_pool().transaction() as conn:
+        return {"lot_summary": rebuild_lot_summary(conn), "user_stats": rebuild_user_stats(conn)}
+
+def check_aggregates():
+    """Lot ids / bidders whose aggregates drifted from bids and lots."""
+    with db_connection() as conn:
+        return {"lot_summary": check_lot_summary(conn), "user_stats": check_user_stats(conn)}
+
+def user_dashboard_stats(*bidders):
+    """Counters for a user known by any of `bidders` (name, phone)."""
+    with db_connection() as conn:
+        return get_user_stats(conn, *bidders)
+
+def user_proxies(*bidders):
+    """Auto-bid maxima of a user known by any of `bidders` (phone, user id)."""
+    with db_connection() as conn:
+        return get_proxies(conn, *bidders)
+
+def close_lot(lot_id):
+    """Close an open lot; triggers record the winner and settle user counters."""
+    with get_pool().transaction() as conn:
+        cur = conn.execute(
+            "UPDATE lots SET status = 'closed' WHERE id = ? AND status = 'open'", (lot_id,)
+        )
+        closed = cur.rowcount == 1
+    get_auction_scheduler().forget([lot_id])
+    return closed
@@ -0,0 +1,185 @@
+# =====================================================
+# 📤 export.py — Streaming Table Export (CSV / Parquet)
+# =====================================================
+# Reads a table (or a date range of `bids`) with fetchmany() in fixed-size
+# chunks and writes each chunk before reading the next, so memory stays
+# at one chunk however large the table is. Parquet gets one record batch
+# per chunk, typed from the table's declared column types.
+#
+#   python fruitbid/export.py bids --format parquet --start 2025-01-01 -o bids.parquet
+#
+# The admin dashboard offers the same export as a download, and the API
+# server streams it over HTTP (GET /api/export/<table>).
+
+import argparse
+import csv
+import io
+import os
+import sys
+import tempfile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    from pool import get_pool
+except ModuleNotFoundError:
+    from fruitbid.pool import get_pool
+
+EXPORT_CHUNK_ROWS = 50_000
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+# Tables admins may export; a date range applies to the column given
+EXPORT_TABLES = {
+    "bids": "timestamp",
+    "lots": "date_added",
+    "users": None,
+    "items": None,
+    "settings": None,
+    "lot_summary": "last_bid_at",
+    "user_stats": None,
+}
+
+
+def _arrow_type(declared):
+    """Arrow type for an SQLite declared type, by SQLite's affinity rules."""
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return pa.int64()
+    if any(t in declared for t in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    return pa.string()
+
+
+def export_schema(conn, table) -> pa.Schema:
+    return pa.schema(
+        (name, _arrow_type(declared))
+        for _, name, declared, *_ in conn.execute(f"PRAGMA table_info({table})")
+    )
+
+
+def export_query(table, start=None, end=None):
+    """(sql, params) selecting `table`, limited to [start, end] where it has a date column."""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Table {table!r} cannot be exported")
+    date_column = EXPORT_TABLES[table]
+    clauses, params = [], []
+    if date_column and start:
+        clauses.append(f"{date_column} >= ?")
+        params.append(str(start))
+    if date_column and end:
+        # Dates without a time cover the whole end day
+        clauses.append(f"{date_column} < ?" if len(str(end)) > 10 else f"{date_column} < date(?, '+1 day')")
+        params.append(str(end))
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return f"SELECT * FROM {table}{where}", params
+
+
+def iter_chunks(conn, sql, params=(), chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield lists of up to `chunk_rows` rows from one cursor."""
+    cur = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cur.close()
+
+
+def _record_batch(rows, schema):
+    columns = list(zip(*rows))
+    return pa.record_batch(
+        [
+            pa.array(
+                # SQLite may store a value of another type than declared
+                [v if v is None or field.type != pa.string() else str(v) for v in column],
+                type=field.type,
+            )
+            for field, column in zip(schema, columns)
+        ],
+        schema=schema,
+    )
+
+
+def write_csv_chunks(out, chunks, header):
+    """Write CSV to the binary stream `out`, one chunk at a time; returns rows written."""
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+    try:
+        writer = csv.writer(text)
+        writer.writerow(header)
+        written = 0
+        for rows in chunks:
+            writer.writerows(rows)
+            written += len(rows)
+        return written
+    finally:
+        text.detach()  # leave `out` open for the caller
+
+
+def write_parquet_chunks(out, chunks, schema):
+    """Write one Parquet record batch per chunk to `out`; returns rows written."""
+    written = 0
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        for rows in chunks:
+            writer.write_batch(_record_batch(rows, schema))
+            written += len(rows)
+    return written
+
+
+def export_table(out, table, fmt="csv", start=None, end=None, chunk_rows=EXPORT_CHUNK_ROWS, conn=None):
+    """Stream `table` (optionally a date range) to the binary stream `out`; returns rows written."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    sql, params = export_query(table, start, end)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_pool().connect()
+    try:
+        schema = export_schema(conn, table)
+        chunks = iter_chunks(conn, sql, params, chunk_rows)
+        try:
+            if fmt == "csv":
+                return write_csv_chunks(out, chunks, schema.names)
+            return write_parquet_chunks(out, chunks, schema)
+        finally:
+            chunks.close()  # release the cursor before the connection goes
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def export_to_tempfile(table, fmt="csv", start=None, end=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Export into a new temporary file; returns (path, rows). The caller deletes it."""
+    fd, path = tempfile.mkstemp(prefix=f"fruitbid-{table}-", suffix=f".{fmt}")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            rows = export_table(out, table, fmt, start, end, chunk_rows)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a table to CSV or Parquet.")
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES))
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--start", help="first date (inclusive), e.g. 2025-01-01")
+    parser.add_argument("--end", help="last date (inclusive)")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    if args.output:
+        with open(args.output, "wb") as out:
+            rows = export_table(out, args.table, args.format, args.start, args.end, args.chunk_rows)
+        print(f"✅ {rows:,} rows → {args.output}", file=sys.stderr)
+    else:
+        export_table(sys.stdout.buffer, args.table, args.format, args.start, args.end, args.chunk_rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# =====================================================
+# 📥 lot_import.py — Bulk Lot Import from CSV / Excel
+# =====================================================
+# Reads the wholesaler's sheet with pandas, checks and normalises every
+# column at once (no per-row Python loop), and inserts all valid lots
+# with one executemany() in one transaction. Invalid rows are reported
+# with their sheet row number and are not imported.
+#
+# Expected columns (header case and spacing do not matter):
+#   item_name  (or fruit / item / name)
+#   quantity   (or qty)      e.g. "100 kg", "1.5 t", "500 g", "12 crates"
+#   base_price (or price)    e.g. 120, "₹1,200.50"
+#
+#   python fruitbid/lot_import.py lots.csv --dry-run
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    from pool import get_pool
+except ModuleNotFoundError:
+    from fruitbid.pool import get_pool
+
+LOT_COLUMNS = ("item_name", "quantity", "base_price")
+COLUMN_ALIASES = {
+    "fruit": "item_name", "item": "item_name", "name": "item_name", "fruit_name": "item_name",
+    "qty": "quantity",
+    "price": "base_price", "base_price_(₹/kg)": "base_price",
+}
+# Weight units normalised to kg; any other unit word (crate, box) is kept
+KG_PER_UNIT = {
+    "": 1.0, "kg": 1.0, "kgs": 1.0, "kilo": 1.0, "kilos": 1.0, "kilogram": 1.0, "kilograms": 1.0,
+    "g": 0.001, "gm": 0.001, "gms": 0.001, "gram": 0.001, "grams": 0.001,
+    "t": 1000.0, "ton": 1000.0, "tons": 1000.0, "tonne": 1000.0, "tonnes": 1000.0, "quintal": 100.0,
+}
+MAX_BASE_PRICE = 100_000
+
+INSERT_LOT_SQL = "INSERT INTO lots (item_name, quantity, base_price, date_added) VALUES (?, ?, ?, ?)"
+
+
+def read_lot_file(file, filename=None) -> pd.DataFrame:
+    """Load a CSV or Excel sheet (path or uploaded file) as strings."""
+    name = (filename or getattr(file, "name", None) or str(file)).lower()
+    if name.endswith((".xlsx", ".xls")):
+        try:
+            return pd.read_excel(file, dtype=str)
+        except ImportError as e:
+            raise ValueError(f"Excel import needs an extra package ({e}); save the sheet as CSV instead") from e
+    return pd.read_csv(file, dtype=str, skipinitialspace=True)
+
+
+def _normalise_headers(df):
+    columns = df.columns.str.strip().str.lower().str.replace(r"\s+", "_", regex=True)
+    return df.set_axis([COLUMN_ALIASES.get(c, c) for c in columns], axis=1)
+
+
+def validate_lots(df):
+    """
+    Split a raw sheet into (valid, errors). `valid` has the normalised
+    item_name, quantity and base_price columns; `errors` has the sheet
+    row number and every problem found on that row.
+    """
+    df = _normalise_headers(df)
+    missing = [c for c in LOT_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    df = df.dropna(how="all", subset=list(LOT_COLUMNS))
+
+    item = df["item_name"].fillna("").str.strip().str.replace(r"\s+", " ", regex=True)
+
+    parts = df["quantity"].fillna("").str.strip().str.lower().str.extract(
+        r"^(?P<amount>\d+(?:\.\d+)?)\s*(?P<unit>[a-z]*)$"
+    )
+    amount = pd.to_numeric(parts["amount"], errors="coerce")
+    unit = parts["unit"].fillna("")
+    factor = unit.map(KG_PER_UNIT)
+    kg = amount * factor
+    quantity = (kg.map("{:g} kg".format, na_action="ignore")
+                .fillna(amount.map("{:g}".format, na_action="ignore") + " " + unit))
+
+    price = pd.to_numeric(
+        df["base_price"].fillna("").str.replace(r"[₹,\s]|/kg$", "", regex=True), errors="coerce"
+    ).round(2)
+
+    problems = pd.DataFrame({
+        "item_name is empty": item.eq(""),
+        "quantity must look like '100 kg'": amount.isna(),
+        "quantity must be positive": amount.le(0),
+        "base_price is not a number": price.isna(),
+        "base_price must be positive": price.le(0),
+        f"base_price above ₹{MAX_BASE_PRICE:,}": price.gt(MAX_BASE_PRICE),
+    }, index=df.index)
+    bad = problems.any(axis=1)
+
+    errors = pd.DataFrame({
+        # header is row 1, so data row i (0-based) is sheet row i + 2
+        "row": df.index[bad] + 2,
+        "errors": problems[bad].apply(lambda r: "; ".join(r.index[r]), axis=1),
+    }).reset_index(drop=True) if bad.any() else pd.DataFrame(columns=["row", "errors"])
+    valid = pd.DataFrame({"item_name": item, "quantity": quantity, "base_price": price})[~bad]
+    return valid.reset_index(drop=True), errors
+
+
+def import_lots(valid, date_added=None, pool=None) -> int:
+    """Insert validated lots in one transaction; returns lots added."""
+    if valid.empty:
+        return 0
+    date_added = date_added or datetime.now().strftime("%Y-%m-%d %H:%M")
+    rows = [(item, qty, float(price), date_added) for item, qty, price in valid[list(LOT_COLUMNS)].itertuples(index=False)]
+    with (pool or get_pool()).transaction() as conn:
+        conn.executemany(INSERT_LOT_SQL, rows)
+    return len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import lots from a CSV or Excel sheet.")
+    parser.add_argument("path")
+    parser.add_argument("--dry-run", action="store_true", help="validate only")
+    args = parser.parse_args(argv)
+
+    valid, errors = validate_lots(read_lot_file(args.path, os.path.basename(args.path)))
+    for row, problem in errors.itertuples(index=False):
+        print(f"❌ row {row}: {problem}")
+    if args.dry_run:
+        print(f"🔍 {len(valid)} valid lots, {len(errors)} rows with errors")
+        return 1 if len(errors) else 0
+    added = import_lots(valid)
+    print(f"✅ {added} lots imported, {len(errors)} rows skipped")
+    return 1 if len(errors) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
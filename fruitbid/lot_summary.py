@@ -0,0 +1,106 @@
+# =====================================================
+# 📋 lot_summary.py — Denormalized Per-Lot Bid Summary
+# =====================================================
+# `lot_summary` holds one row per lot with bids: count, running sum,
+# first/last bid time and the current high bid and bidder. Triggers on
+# `bids` (migration 5) keep it current, so readers never aggregate `bids`.
+#
+#   python fruitbid/lot_summary.py            # report drifted lots
+#   python fruitbid/lot_summary.py --rebuild  # recompute from `bids`
+
+import argparse
+import sqlite3
+import sys
+
+try:
+    from pool import get_pool
+except ModuleNotFoundError:
+    from fruitbid.pool import get_pool
+
+SUMMARY_COLUMNS = (
+    "lot_id", "bid_count", "bid_sum", "first_bid_at", "last_bid_at",
+    "high_bid", "high_bidder", "high_bid_id",
+)
+
+# Same bidder label as the order book: user_name, then phone, then id
+BIDDER_SQL = "COALESCE({t}.user_name, {t}.user_phone, CAST({t}.user_id AS TEXT))"
+
+# Summary rows recomputed from `bids` for the lots matching {where}. Ties
+# on the high bid go to the earliest bid, as in the order book.
+AGGREGATE_SQL = f"""
+    SELECT s.lot_id, s.bid_count, s.bid_sum, s.first_bid_at, s.last_bid_at,
+           h.bid_amount AS high_bid, {BIDDER_SQL.format(t="h")} AS high_bidder, h.id AS high_bid_id
+    FROM (
+        SELECT lot_id, COUNT(*) AS bid_count, SUM(bid_amount) AS bid_sum,
+               MIN(timestamp) AS first_bid_at, MAX(timestamp) AS last_bid_at
+        FROM bids
+        WHERE {{where}}
+        GROUP BY lot_id
+    ) s
+    JOIN bids h ON h.id = (
+        SELECT id FROM bids WHERE lot_id = s.lot_id ORDER BY bid_amount DESC, id LIMIT 1
+    )
+"""
+
+# Only lots that still exist, so a rebuild never adds dangling references
+ALL_LOTS = "lot_id IN (SELECT id FROM lots)"
+
+
+def rebuild_lot_summary(conn, lot_ids=None) -> int:
+    """Recompute the summary of `lot_ids` (default: every lot); returns rows written."""
+    if lot_ids is None:
+        where, params = ALL_LOTS, ()
+        conn.execute("DELETE FROM lot_summary")
+    else:
+        lot_ids = list(lot_ids)
+        if not lot_ids:
+            return 0
+        marks = ",".join("?" * len(lot_ids))
+        where, params = f"lot_id IN ({marks}) AND {ALL_LOTS}", lot_ids
+        conn.execute(f"DELETE FROM lot_summary WHERE lot_id IN ({marks})", lot_ids)
+    cur = conn.execute(
+        f"INSERT INTO lot_summary ({', '.join(SUMMARY_COLUMNS)}) {AGGREGATE_SQL.format(where=where)}",
+        params,
+    )
+    return cur.rowcount
+
+
+def check_lot_summary(conn):
+    """Lot ids whose stored summary differs from a fresh aggregate of `bids`."""
+    # The running sum may differ from a fresh SUM() in the last float digits
+    columns = ", ".join("ROUND(bid_sum, 4)" if c == "bid_sum" else c for c in SUMMARY_COLUMNS)
+    stored = f"SELECT {columns} FROM lot_summary WHERE bid_count > 0"
+    fresh = f"SELECT {columns} FROM ({AGGREGATE_SQL.format(where=ALL_LOTS)})"
+    rows = conn.execute(f"""
+        SELECT lot_id FROM ({stored} EXCEPT {fresh})
+        UNION
+        SELECT lot_id FROM ({fresh} EXCEPT {stored})
+    """).fetchall()
+    return sorted(row[0] for row in rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check or rebuild the lot_summary table.")
+    parser.add_argument("--db", help="database path (default: the app database)")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every lot from `bids`")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db) if args.db else get_pool().connect()
+    try:
+        if args.rebuild:
+            with conn:
+                written = rebuild_lot_summary(conn)
+            print(f"✅ lot_summary rebuilt: {written} lots")
+            return 0
+        drifted = check_lot_summary(conn)
+        if drifted:
+            print(f"❌ {len(drifted)} lots drifted: {drifted[:20]}{' …' if len(drifted) > 20 else ''}")
+            return 1
+        print("✅ lot_summary matches bids")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+# =====================================================
+# 🎁 lucky_dip.py — Lucky Dip Draw
+# =====================================================
+# Picks one winning bid per item, at random, with each bid's chance
+# proportional to its amount, and records the winners in `lucky_dip`.
+#
+# Every item is drawn in one pass. Only the amounts are loaded: they come
+# back from the covering index idx_bids_item_top already grouped by item,
+# straight into one NumPy array. One cumulative sum, one uniform number per
+# item and one searchsorted() then pick every winner at once, with no
+# per-bid Python loop. Each pick is a position in its item's index order,
+# so the winning bid id is read back with one OFFSET lookup per item, in
+# the same snapshot. The winners are upserted with one executemany().
+#
+# The draw is reproducible: the same seed over the same bids picks the
+# same winners, and the seed is stored with each result.
+#
+#   python fruitbid/lucky_dip.py --seed 42 --since 2025-01-01 --dry-run
+
+import argparse
+import itertools
+import json
+import secrets
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+try:
+    from pool import get_pool
+except ModuleNotFoundError:
+    from fruitbid.pool import get_pool
+
+# Live (not archived) bids with an item and a positive amount
+ELIGIBLE_SQL = "FROM bids WHERE item_name IS NOT NULL AND bid_amount > 0 AND timestamp >= ?"
+
+# All read idx_bids_item_top (item_name, bid_amount DESC, id, ...) in index
+# order, so the amounts line up with the groups and a position within an
+# item is an OFFSET
+GROUPS_SQL = f"SELECT item_name, COUNT(*) {ELIGIBLE_SQL} GROUP BY item_name ORDER BY item_name"
+AMOUNTS_SQL = f"SELECT bid_amount {ELIGIBLE_SQL} ORDER BY item_name, bid_amount DESC, id"
+PICK_SQL = f"SELECT id {ELIGIBLE_SQL} AND item_name = ? ORDER BY bid_amount DESC, id LIMIT 1 OFFSET ?"
+
+WINNERS_SQL = """
+    SELECT id, user_id, user_name, user_phone
+    FROM bids WHERE id IN (SELECT value FROM json_each(?))
+"""
+
+SAVE_SQL = """
+    INSERT INTO lucky_dip
+        (item_name, user_id, bid_amount, bid_id, user_name, user_phone, entries, pool_amount, seed, drawn_at)
+    VALUES
+        (:item_name, :user_id, :bid_amount, :bid_id, :user_name, :user_phone, :entries, :pool_amount, :seed, :drawn_at)
+    ON CONFLICT (item_name) DO UPDATE SET
+        user_id = excluded.user_id,
+        bid_amount = excluded.bid_amount,
+        bid_id = excluded.bid_id,
+        user_name = excluded.user_name,
+        user_phone = excluded.user_phone,
+        entries = excluded.entries,
+        pool_amount = excluded.pool_amount,
+        seed = excluded.seed,
+        drawn_at = excluded.drawn_at
+"""
+
+def new_seed() -> int:
+    """A random seed that fits in an SQLite INTEGER."""
+    return secrets.randbits(63)
+
+
+def draw_winners(amounts, counts, rng):
+    """
+    Weighted pick per group. `amounts` holds every entry, grouped; group g
+    is the next `counts[g]` entries. Returns the index of each group's winner.
+    """
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    cum = np.cumsum(amounts)
+    low = cum[starts] - amounts[starts]
+    high = cum[ends - 1]
+    targets = low + rng.random(len(counts)) * (high - low)
+    picks = np.searchsorted(cum, targets, side="right")
+    # rounding in the running total may land one entry outside the group
+    return np.clip(picks, starts, ends - 1)
+
+
+def load_amounts(conn, since=""):
+    """(item names, entries per item, amounts grouped by item) for the eligible bids."""
+    groups = conn.execute(GROUPS_SQL, (since,)).fetchall()
+    total = sum(count for _, count in groups)
+    rows = conn.execute(AMOUNTS_SQL, (since,))
+    amounts = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.float64, count=total)
+    items = [item for item, _ in groups]
+    counts = np.array([count for _, count in groups], dtype=np.int64)
+    return items, counts, amounts
+
+
+def pick_bid_ids(conn, items, offsets, since=""):
+    """The id of the bid at each item's offset in index order."""
+    return [
+        conn.execute(PICK_SQL, (since, item, offset)).fetchone()[0]
+        for item, offset in zip(items, offsets)
+    ]
+
+
+def draw_lucky_dip(seed=None, since=None, save=True, pool=None) -> dict:
+    """
+    Draw a winner for every item from the bids placed since `since`
+    (a 'YYYY-MM-DD[ HH:MM:SS]' string; None = all live bids) and, unless
+    `save` is False, store them in `lucky_dip`.
+    """
+    seed = new_seed() if seed is None else int(seed)
+    started = time.perf_counter()
+    with (pool or get_pool()).connection() as conn:
+        # one snapshot: the picks are positions in what was loaded
+        conn.execute("BEGIN")
+        try:
+            items, counts, amounts = load_amounts(conn, since or "")
+            loaded = time.perf_counter()
+
+            rng = np.random.default_rng(seed)
+            starts = counts.cumsum() - counts
+            picks = draw_winners(amounts, counts, rng) if len(items) else np.empty(0, dtype=np.int64)
+            pool_amounts = np.add.reduceat(amounts, starts) if len(items) else []
+            drawn = time.perf_counter()
+
+            bid_ids = pick_bid_ids(conn, items, (picks - starts).tolist(), since or "")
+            bidders = {
+                bid_id: (user_id, user_name, user_phone)
+                for bid_id, user_id, user_name, user_phone in conn.execute(WINNERS_SQL, (json.dumps(bid_ids),))
+            }
+        finally:
+            conn.rollback()
+        drawn_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        winners = []
+        for item, bid_id, amount, count, pool_amount in zip(
+            items, bid_ids, amounts[picks].tolist(), counts.tolist(), list(pool_amounts)
+        ):
+            user_id, user_name, user_phone = bidders[bid_id]
+            winners.append({
+                "item_name": item, "bid_id": bid_id, "bid_amount": amount,
+                "user_id": user_id, "user_name": user_name, "user_phone": user_phone,
+                "entries": count, "pool_amount": round(float(pool_amount), 2),
+                "seed": seed, "drawn_at": drawn_at,
+            })
+        if save and winners:
+            with conn:
+                conn.executemany(SAVE_SQL, winners)
+
+    return {
+        "seed": seed,
+        "entries": len(amounts),
+        "winners": winners,
+        "load_ms": (loaded - started) * 1000,
+        "draw_ms": (drawn - loaded) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Draw a Lucky Dip winner for every item.")
+    parser.add_argument("--seed", type=int, help="replay a draw (default: a new random seed)")
+    parser.add_argument("--since", help="only bids placed at or after this time, e.g. 2025-01-01")
+    parser.add_argument("--dry-run", action="store_true", help="show the winners without saving them")
+    args = parser.parse_args(argv)
+
+    result = draw_lucky_dip(args.seed, args.since, save=not args.dry_run)
+    for w in result["winners"]:
+        print(f"🎁 {w['item_name']}: bid #{w['bid_id']} by {w['user_name'] or w['user_phone'] or '?'} "
+              f"(₹{w['bid_amount']}, 1 of {w['entries']})")
+    print(f"✅ seed {result['seed']}: {len(result['winners'])} items, {result['entries']} entries "
+          f"(load {result['load_ms']:.0f} ms, draw {result['draw_ms']:.1f} ms)"
+          + (" — not saved" if args.dry_run else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
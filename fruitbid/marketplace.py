@@ -0,0 +1,82 @@
+# =====================================================
+# 🏪 marketplace.py — Marketplace Read API
+# =====================================================
+
+from db import db_connection
+from versioned_cache import cached
+
+MARKET_PAGE_SIZE = 20
+TOP_BIDS = 3
+
+
+# =====================================================
+# 🧾 ONE-QUERY LISTING
+# =====================================================
+# One statement returns a page of lots, each lot's top-K bids, its bid count
+# and current high. Pages are keyset-paginated on lots.id so page N costs
+# the same as page 1 however large the catalogue gets; counts and highs come
+# from `lot_summary` and the top-K from an index probe per lot, so a lot
+# with a long bid history costs no more than a new one.
+MARKETPLACE_SQL = """
+    WITH page AS (
+        SELECT id, item_name, quantity, base_price, date_added, status, closes_at
+        FROM lots
+        {where}
+        ORDER BY id DESC
+        LIMIT :limit
+    )
+    SELECT p.id, p.item_name, p.quantity, p.base_price, p.date_added, p.status, p.closes_at,
+           s.bid_count, s.high_bid, b.user_name, b.bid_amount, b.timestamp,
+           EXISTS (SELECT 1 FROM lots WHERE id < (SELECT MIN(id) FROM page)) AS has_more
+    FROM page p
+    LEFT JOIN lot_summary s ON s.lot_id = p.id
+    LEFT JOIN bids b ON b.id IN (
+        SELECT id FROM bids WHERE lot_id = p.id ORDER BY bid_amount DESC, id LIMIT :top_k
+    )
+    ORDER BY p.id DESC, b.bid_amount DESC, b.id
+"""
+
+
+@cached("lots", "bids")
+def fetch_marketplace(limit: int = MARKET_PAGE_SIZE, before_id=None, top_k: int = TOP_BIDS):
+    """
+    Return (lots, next_before_id) for one page of the marketplace. Pages are
+    cached until a lot or bid changes; callers must not modify them.
+
+    Each lot is a dict with its columns plus `bid_count`, `high_bid` and
+    `top_bids` — a list of (user_name, bid_amount, timestamp), best first.
+    `next_before_id` is the cursor for the following page, or None.
+    """
+    params = {"limit": limit, "top_k": top_k}
+    where = ""
+    if before_id is not None:
+        where = "WHERE id < :before_id"
+        params["before_id"] = before_id
+
+    with db_connection() as conn:
+        rows = conn.execute(MARKETPLACE_SQL.format(where=where), params).fetchall()
+
+    lots, by_id, has_more = [], {}, False
+    for (lot_id, item_name, quantity, base_price, date_added, status, closes_at,
+         bid_count, high_bid, user_name, bid_amount, ts, more) in rows:
+        has_more = bool(more)
+        lot = by_id.get(lot_id)
+        if lot is None:
+            lot = by_id[lot_id] = {
+                "id": lot_id,
+                "item_name": item_name,
+                "quantity": quantity,
+                "base_price": base_price,
+                "date_added": date_added,
+                "status": status,
+                "closes_at": closes_at,
+                "bid_count": bid_count or 0,
+                "high_bid": high_bid,
+                "top_bids": [],
+            }
+            lots.append(lot)
+        if bid_amount is not None:
+            lot["top_bids"].append((user_name, bid_amount, ts))
+
+    next_before_id = lots[-1]["id"] if lots and has_more else None
+    return lots, next_before_id
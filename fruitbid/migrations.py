@@ -0,0 +1,799 @@
+# =====================================================
+# 🧱 migrations.py — Versioned Schema Migrations
+# =====================================================
+# The schema version lives in `meta` (key = 'schema_version'). Each
+# migration runs in its own BEGIN IMMEDIATE transaction together with the
+# version bump, so a crash never leaves a half-applied step behind.
+#
+# `ensure_schema()` is what app code calls on every rerun: the first call
+# in a process migrates, every later call only returns the cached version.
+
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+try:
+    from lot_summary import AGGREGATE_SQL, ALL_LOTS, BIDDER_SQL, SUMMARY_COLUMNS, rebuild_lot_summary
+    from pool import get_pool
+    from user_stats import KG_SQL, rebuild_user_stats
+except ModuleNotFoundError:
+    # Imported from the repository root as `fruitbid.migrations`
+    from fruitbid.lot_summary import AGGREGATE_SQL, ALL_LOTS, BIDDER_SQL, SUMMARY_COLUMNS, rebuild_lot_summary
+    from fruitbid.pool import get_pool
+    from fruitbid.user_stats import KG_SQL, rebuild_user_stats
+
+VERSION_KEY = "schema_version"
+
+
+# =====================================================
+# 📐 BASELINE SCHEMA (version 1 — never edit, add a migration)
+# =====================================================
+BASELINE_TABLES = {
+    "meta": """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """,
+    "users": """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            phone TEXT,
+            mobile_email TEXT UNIQUE,
+            address TEXT,
+            verified INTEGER NOT NULL DEFAULT 0
+        )
+    """,
+    "items": """
+        CREATE TABLE IF NOT EXISTS items (
+            name TEXT PRIMARY KEY,
+            min_bid REAL NOT NULL,
+            market_cap REAL NOT NULL,
+            billing_rate REAL DEFAULT 0.05
+        )
+    """,
+    "lots": """
+        CREATE TABLE IF NOT EXISTS lots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_name TEXT NOT NULL,
+            quantity TEXT,
+            base_price REAL NOT NULL,
+            date_added TEXT
+        )
+    """,
+    "bids": """
+        CREATE TABLE IF NOT EXISTS bids (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lot_id INTEGER,
+            item_name TEXT,
+            user_id INTEGER,
+            user_name TEXT,
+            user_phone TEXT,
+            bid_amount REAL NOT NULL,
+            timestamp TEXT NOT NULL,
+            FOREIGN KEY (lot_id) REFERENCES lots(id) ON DELETE CASCADE
+        )
+    """,
+    "lucky_dip": """
+        CREATE TABLE IF NOT EXISTS lucky_dip (
+            item_name TEXT PRIMARY KEY,
+            user_id INTEGER,
+            bid_amount REAL
+        )
+    """,
+    "settings": """
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """,
+    "otps": """
+        CREATE TABLE IF NOT EXISTS otps (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            mobile_email TEXT NOT NULL,
+            otp TEXT NOT NULL,
+            expiration TEXT NOT NULL
+        )
+    """,
+    "nutrition": """
+        CREATE TABLE IF NOT EXISTS nutrition (
+            item_name TEXT PRIMARY KEY,
+            calories REAL,
+            fiber REAL,
+            vit_c REAL,
+            potassium REAL,
+            notes TEXT
+        )
+    """,
+}
+
+# Where each baseline column may be found in databases created by older
+# versions of the app (first match wins, NULLs fall through to the next).
+LEGACY_COLUMNS = {
+    "users": {"phone": ["phone", "mobile_email"]},
+    "lots": {"item_name": ["item_name", "fruit_name"]},
+    "bids": {
+        "bid_amount": ["bid_amount", "bid_price"],
+        "timestamp": ["timestamp", "bid_time"],
+    },
+}
+
+# Fallbacks for NOT NULL baseline columns that older rows may lack.
+LEGACY_DEFAULTS = {
+    ("users", "verified"): "0",
+    ("lots", "base_price"): "0",
+    ("bids", "timestamp"): "datetime('now', 'localtime')",
+}
+
+
+# =====================================================
+# 🔧 HELPERS
+# =====================================================
+def table_columns(conn, table):
+    """Column names of `table` in declaration order ([] if missing)."""
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _legacy_expr(table, column, old_columns, with_default=True):
+    """SQL expression reading `column` from an older layout of `table`."""
+    candidates = LEGACY_COLUMNS.get(table, {}).get(column, [column])
+    present = [c for c in candidates if c in old_columns]
+    default = LEGACY_DEFAULTS.get((table, column))
+    if with_default and default is not None:
+        present.append(default)
+    if not present:
+        return "NULL"
+    if len(present) == 1:
+        return present[0]
+    return f"COALESCE({', '.join(present)})"
+
+
+def _rebuild_table(conn, table, create_sql, required=()):
+    """
+    Recreate `table` from `create_sql`, copying rows from the old layout.
+    Rows where any of the `required` columns has no value are dropped.
+    """
+    old_columns = set(table_columns(conn, table))
+    tmp = f"{table}__new"
+    conn.execute(create_sql.replace(f"IF NOT EXISTS {table}", tmp, 1))
+    new_columns = table_columns(conn, tmp)
+
+    select = [_legacy_expr(table, c, old_columns) for c in new_columns]
+    where = " AND ".join(
+        f"{_legacy_expr(table, c, old_columns, with_default=False)} IS NOT NULL" for c in required
+    )
+    conn.execute(
+        f"INSERT INTO {tmp} ({', '.join(new_columns)}) "
+        f"SELECT {', '.join(select)} FROM {table} {'WHERE ' + where if where else ''}"
+    )
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {tmp} RENAME TO {table}")
+
+
+# =====================================================
+# 🪜 MIGRATIONS
+# =====================================================
+def _baseline(conn):
+    """Create every table the app uses."""
+    for create_sql in BASELINE_TABLES.values():
+        conn.execute(create_sql)
+
+
+def _reconcile_legacy_tables(conn):
+    """Rebuild tables whose columns drifted from the baseline layout."""
+    for table, create_sql in BASELINE_TABLES.items():
+        tmp = f"{table}__probe"
+        conn.execute(create_sql.replace(f"TABLE IF NOT EXISTS {table}", f"TEMP TABLE {tmp}", 1))
+        expected = table_columns(conn, tmp)
+        conn.execute(f"DROP TABLE temp.{tmp}")
+        if table_columns(conn, table) == expected:
+            continue
+        # Bids without any amount are unusable
+        required = ("bid_amount",) if table == "bids" else ()
+        _rebuild_table(conn, table, create_sql, required)
+
+
+def _seed_demo_data(conn):
+    """Seed catalogue items and demo lots into empty tables."""
+    if conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0:
+        conn.executemany(
+            "INSERT INTO items (name, min_bid, market_cap, billing_rate) VALUES (?, ?, ?, ?)",
+            [
+                ("Apple", 100.0, 200.0, 0.05),
+                ("Mosambi", 40.0, 60.0, 0.05),
+                ("Banana", 30.0, 50.0, 0.05),
+                ("Papaya", 40.0, 60.0, 0.05),
+                ("Kiwi", 150.0, 250.0, 0.05),
+                ("Dragon Fruit", 200.0, 300.0, 0.05),
+                ("Pineapple", 50.0, 80.0, 0.05),
+                ("Custard Apple", 80.0, 120.0, 0.05),
+                ("Sapota", 50.0, 70.0, 0.05),
+            ],
+        )
+    if conn.execute("SELECT COUNT(*) FROM lots").fetchone()[0] == 0:
+        today = datetime.now().strftime("%Y-%m-%d")
+        conn.executemany(
+            "INSERT INTO lots (item_name, quantity, base_price, date_added) VALUES (?, ?, ?, ?)",
+            [
+                ("Apples", "100 kg", 120.0, today),
+                ("Bananas", "200 kg", 60.0, today),
+                ("Mangoes", "150 kg", 180.0, today),
+                ("Oranges", "180 kg", 90.0, today),
+            ],
+        )
+
+
+# Secondary indexes for the bidding hot paths. The lot index covers every
+# column the leaderboard, marketplace and order-book queries read.
+HOT_PATH_INDEXES = [
+    # top bids per lot: WHERE lot_id = ? ORDER BY bid_amount DESC, id
+    "CREATE INDEX IF NOT EXISTS idx_bids_lot_top ON bids (lot_id, bid_amount DESC, id, user_name, timestamp)",
+    # every item's bids in bid order (lucky_dip.py draw)
+    "CREATE INDEX IF NOT EXISTS idx_bids_item_top ON bids (item_name, bid_amount DESC, id, user_name, timestamp)",
+    # My Bids page: WHERE user_phone = ? ORDER BY id DESC (rowid order is implied)
+    "CREATE INDEX IF NOT EXISTS idx_bids_user_phone ON bids (user_phone)",
+    # app_web My Bids: WHERE user_name = ? ORDER BY timestamp
+    "CREATE INDEX IF NOT EXISTS idx_bids_user_name_ts ON bids (user_name, timestamp)",
+]
+
+
+def _hot_path_indexes(conn):
+    """Index the bids access paths so none of them scans its table."""
+    for create_sql in HOT_PATH_INDEXES:
+        conn.execute(create_sql)
+
+
+LOT_SUMMARY_TABLE = """
+    CREATE TABLE IF NOT EXISTS lot_summary (
+        lot_id INTEGER PRIMARY KEY,
+        bid_count INTEGER NOT NULL DEFAULT 0,
+        bid_sum REAL NOT NULL DEFAULT 0,
+        first_bid_at TEXT,
+        last_bid_at TEXT,
+        high_bid REAL,
+        high_bidder TEXT,
+        high_bid_id INTEGER,
+        FOREIGN KEY (lot_id) REFERENCES lots(id) ON DELETE CASCADE
+    )
+"""
+
+_NEW_IS_HIGHER = "high_bid IS NULL OR excluded.high_bid > high_bid"
+
+LOT_SUMMARY_TRIGGERS = [
+    # A new bid only ever moves the high up: O(1) upsert
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_bids_summary_insert
+    AFTER INSERT ON bids WHEN NEW.lot_id IS NOT NULL
+    BEGIN
+        INSERT INTO lot_summary ({', '.join(SUMMARY_COLUMNS)})
+        VALUES (NEW.lot_id, 1, NEW.bid_amount, NEW.timestamp, NEW.timestamp,
+                NEW.bid_amount, {BIDDER_SQL.format(t="NEW")}, NEW.id)
+        ON CONFLICT (lot_id) DO UPDATE SET
+            bid_count = bid_count + 1,
+            bid_sum = bid_sum + excluded.bid_sum,
+            first_bid_at = COALESCE(MIN(first_bid_at, excluded.first_bid_at), excluded.first_bid_at),
+            last_bid_at = COALESCE(MAX(last_bid_at, excluded.last_bid_at), excluded.last_bid_at),
+            high_bidder = CASE WHEN {_NEW_IS_HIGHER} THEN excluded.high_bidder ELSE high_bidder END,
+            high_bid_id = CASE WHEN {_NEW_IS_HIGHER} THEN excluded.high_bid_id ELSE high_bid_id END,
+            high_bid = CASE WHEN {_NEW_IS_HIGHER} THEN excluded.high_bid ELSE high_bid END;
+    END
+    """,
+    # Only look back at `bids` when the deleted bid was the high or an endpoint
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_bids_summary_delete
+    AFTER DELETE ON bids WHEN OLD.lot_id IS NOT NULL
+    BEGIN
+        UPDATE lot_summary SET
+            bid_count = bid_count - 1,
+            bid_sum = CASE WHEN bid_count <= 1 THEN 0 ELSE bid_sum - OLD.bid_amount END,
+            first_bid_at = CASE WHEN OLD.timestamp <= first_bid_at
+                THEN (SELECT MIN(timestamp) FROM bids WHERE lot_id = OLD.lot_id) ELSE first_bid_at END,
+            last_bid_at = CASE WHEN OLD.timestamp >= last_bid_at
+                THEN (SELECT MAX(timestamp) FROM bids WHERE lot_id = OLD.lot_id) ELSE last_bid_at END
+        WHERE lot_id = OLD.lot_id;
+        UPDATE lot_summary SET (high_bid, high_bidder, high_bid_id) = (
+            SELECT b.bid_amount, {BIDDER_SQL.format(t="b")}, b.id
+            FROM bids b WHERE b.lot_id = OLD.lot_id
+            ORDER BY b.bid_amount DESC, b.id LIMIT 1
+        )
+        WHERE lot_id = OLD.lot_id AND high_bid_id = OLD.id;
+    END
+    """,
+    # Edits to a bid are rare: recompute the lots it left and joined
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_bids_summary_update
+    AFTER UPDATE OF lot_id, bid_amount, timestamp, user_name, user_phone, user_id ON bids
+    BEGIN
+        DELETE FROM lot_summary WHERE lot_id IN (OLD.lot_id, NEW.lot_id);
+        INSERT INTO lot_summary ({', '.join(SUMMARY_COLUMNS)})
+        {AGGREGATE_SQL.format(where="lot_id IN (OLD.lot_id, NEW.lot_id) AND " + ALL_LOTS)};
+    END
+    """,
+]
+
+
+def _lot_summary(conn):
+    """Per-lot bid summary kept current by triggers on `bids`."""
+    conn.execute(LOT_SUMMARY_TABLE)
+    for create_sql in LOT_SUMMARY_TRIGGERS:
+        conn.execute(create_sql)
+    # root db.py: highest bid per catalogue item reads summaries by lot name
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lots_item_name ON lots (item_name)")
+    rebuild_lot_summary(conn)
+
+
+LOT_STATUS_COLUMNS = {
+    "status": "TEXT NOT NULL DEFAULT 'open' CHECK (status IN ('open', 'closed'))",
+    "winner_name": "TEXT",
+    "winning_bid": "REAL",
+    "closed_at": "TEXT",
+}
+
+USER_STATS_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS user_stats (
+        bidder TEXT PRIMARY KEY,
+        bid_count INTEGER NOT NULL DEFAULT 0,
+        active_lots INTEGER NOT NULL DEFAULT 0,
+        lots_won INTEGER NOT NULL DEFAULT 0,
+        kg_won REAL NOT NULL DEFAULT 0,
+        spent REAL NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_lots (
+        bidder TEXT NOT NULL,
+        lot_id INTEGER NOT NULL,
+        bid_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (bidder, lot_id)
+    )
+    """,
+    # settling a lot walks its bidders
+    "CREATE INDEX IF NOT EXISTS idx_user_lots_lot ON user_lots (lot_id)",
+]
+
+_NEW_BIDDER = BIDDER_SQL.format(t="NEW")
+_OLD_BIDDER = BIDDER_SQL.format(t="OLD")
+_LOT_IS_OPEN = "EXISTS (SELECT 1 FROM lots WHERE id = {t}.lot_id AND status = 'open')"
+# archive.py sets this meta row while it deletes moved lots: counters are lifetime totals
+_NOT_ARCHIVING = "NOT EXISTS (SELECT 1 FROM meta WHERE key = 'archiving')"
+
+USER_STATS_TRIGGERS = [
+    # First bid on an open lot makes it one of the bidder's active lots
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_bids_user_insert
+    AFTER INSERT ON bids WHEN NEW.lot_id IS NOT NULL AND {_NEW_BIDDER} IS NOT NULL
+    BEGIN
+        INSERT INTO user_stats (bidder, bid_count, active_lots)
+        VALUES ({_NEW_BIDDER}, 1,
+                NOT EXISTS (SELECT 1 FROM user_lots WHERE bidder = {_NEW_BIDDER} AND lot_id = NEW.lot_id)
+                AND {_LOT_IS_OPEN.format(t="NEW")})
+        ON CONFLICT (bidder) DO UPDATE SET
+            bid_count = bid_count + 1,
+            active_lots = active_lots + excluded.active_lots;
+        INSERT INTO user_lots (bidder, lot_id, bid_count) VALUES ({_NEW_BIDDER}, NEW.lot_id, 1)
+        ON CONFLICT (bidder, lot_id) DO UPDATE SET bid_count = bid_count + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_bids_user_delete
+    AFTER DELETE ON bids WHEN OLD.lot_id IS NOT NULL AND {_OLD_BIDDER} IS NOT NULL AND {_NOT_ARCHIVING}
+    BEGIN
+        UPDATE user_stats SET
+            bid_count = bid_count - 1,
+            active_lots = active_lots - (
+                EXISTS (SELECT 1 FROM user_lots WHERE bidder = {_OLD_BIDDER} AND lot_id = OLD.lot_id AND bid_count = 1)
+                AND {_LOT_IS_OPEN.format(t="OLD")}
+            )
+        WHERE bidder = {_OLD_BIDDER};
+        UPDATE user_lots SET bid_count = bid_count - 1 WHERE bidder = {_OLD_BIDDER} AND lot_id = OLD.lot_id;
+        DELETE FROM user_lots WHERE bidder = {_OLD_BIDDER} AND lot_id = OLD.lot_id AND bid_count <= 0;
+    END
+    """,
+    # A bid moved to another lot or bidder: leave the old pair, join the new
+    # one (the delete and insert triggers above, in one step)
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_bids_user_update
+    AFTER UPDATE OF lot_id, user_name, user_phone, user_id ON bids
+    WHEN OLD.lot_id IS NOT NEW.lot_id OR {_OLD_BIDDER} IS NOT {_NEW_BIDDER}
+    BEGIN
+        UPDATE user_stats SET
+            bid_count = bid_count - 1,
+            active_lots = active_lots - (
+                EXISTS (SELECT 1 FROM user_lots WHERE bidder = {_OLD_BIDDER} AND lot_id = OLD.lot_id AND bid_count = 1)
+                AND {_LOT_IS_OPEN.format(t="OLD")}
+            )
+        WHERE OLD.lot_id IS NOT NULL AND bidder = {_OLD_BIDDER};
+        UPDATE user_lots SET bid_count = bid_count - 1 WHERE bidder = {_OLD_BIDDER} AND lot_id = OLD.lot_id;
+        DELETE FROM user_lots WHERE bidder = {_OLD_BIDDER} AND lot_id = OLD.lot_id AND bid_count <= 0;
+        INSERT INTO user_stats (bidder, bid_count, active_lots)
+        SELECT {_NEW_BIDDER}, 1,
+               NOT EXISTS (SELECT 1 FROM user_lots WHERE bidder = {_NEW_BIDDER} AND lot_id = NEW.lot_id)
+               AND {_LOT_IS_OPEN.format(t="NEW")}
+        WHERE NEW.lot_id IS NOT NULL AND {_NEW_BIDDER} IS NOT NULL
+        ON CONFLICT (bidder) DO UPDATE SET
+            bid_count = bid_count + 1,
+            active_lots = active_lots + excluded.active_lots;
+        INSERT INTO user_lots (bidder, lot_id, bid_count)
+        SELECT {_NEW_BIDDER}, NEW.lot_id, 1
+        WHERE NEW.lot_id IS NOT NULL AND {_NEW_BIDDER} IS NOT NULL
+        ON CONFLICT (bidder, lot_id) DO UPDATE SET bid_count = bid_count + 1;
+    END
+    """,
+    # Runs before the cascade removes the lot's bids, while the lot is still visible
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_lots_user_delete
+    BEFORE DELETE ON lots WHEN {_NOT_ARCHIVING}
+    BEGIN
+        UPDATE user_stats SET active_lots = active_lots - 1
+        WHERE OLD.status = 'open' AND bidder IN (SELECT bidder FROM user_lots WHERE lot_id = OLD.id);
+        UPDATE user_stats SET
+            lots_won = lots_won - 1,
+            kg_won = kg_won - {KG_SQL.format(t="OLD")},
+            spent = spent - OLD.winning_bid * {KG_SQL.format(t="OLD")}
+        WHERE OLD.status = 'closed' AND bidder = OLD.winner_name;
+        DELETE FROM user_lots WHERE lot_id = OLD.id;
+    END
+    """,
+    # Settle: record the winner from lot_summary and move the lot out of
+    # every bidder's active count
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_lots_settle
+    AFTER UPDATE OF status ON lots WHEN OLD.status = 'open' AND NEW.status = 'closed'
+    BEGIN
+        UPDATE lots SET
+            winner_name = (SELECT high_bidder FROM lot_summary WHERE lot_id = NEW.id),
+            winning_bid = (SELECT high_bid FROM lot_summary WHERE lot_id = NEW.id),
+            closed_at = COALESCE(NEW.closed_at, datetime('now', 'localtime'))
+        WHERE id = NEW.id;
+        UPDATE user_stats SET active_lots = active_lots - 1
+        WHERE bidder IN (SELECT bidder FROM user_lots WHERE lot_id = NEW.id);
+        UPDATE user_stats SET
+            lots_won = lots_won + 1,
+            kg_won = kg_won + {KG_SQL.format(t="NEW")},
+            spent = spent + (SELECT winning_bid FROM lots WHERE id = NEW.id) * {KG_SQL.format(t="NEW")}
+        WHERE bidder = (SELECT winner_name FROM lots WHERE id = NEW.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_lots_reopen
+    AFTER UPDATE OF status ON lots WHEN OLD.status = 'closed' AND NEW.status = 'open'
+    BEGIN
+        UPDATE user_stats SET active_lots = active_lots + 1
+        WHERE bidder IN (SELECT bidder FROM user_lots WHERE lot_id = NEW.id);
+        UPDATE user_stats SET
+            lots_won = lots_won - 1,
+            kg_won = kg_won - {KG_SQL.format(t="OLD")},
+            spent = spent - OLD.winning_bid * {KG_SQL.format(t="OLD")}
+        WHERE bidder = OLD.winner_name;
+        UPDATE lots SET winner_name = NULL, winning_bid = NULL, closed_at = NULL WHERE id = NEW.id;
+    END
+    """,
+]
+
+
+def _user_stats(conn):
+    """Lot status/winner columns and per-user counters kept by triggers."""
+    existing = set(table_columns(conn, "lots"))
+    for column, definition in LOT_STATUS_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE lots ADD COLUMN {column} {definition}")
+    for create_sql in USER_STATS_TABLES + USER_STATS_TRIGGERS:
+        conn.execute(create_sql)
+    rebuild_user_stats(conn)
+
+
+# One row per recipient: the table holds active codes only (otp_store.py)
+OTP_TABLE = """
+    CREATE TABLE otps (
+        mobile_email TEXT PRIMARY KEY,
+        otp TEXT NOT NULL,
+        expires_at INTEGER NOT NULL
+    )
+"""
+
+
+def _otp_store(conn):
+    """Replace the append-only `otps` log with one expiring code per recipient."""
+    # Outstanding codes live five minutes; users simply request a new one
+    conn.execute("DROP TABLE IF EXISTS otps")
+    conn.execute(OTP_TABLE)
+    # the sweeper deletes WHERE expires_at <= now
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_otps_expires_at ON otps (expires_at)")
+
+
+def _archive_guard(conn):
+    """Let archive.py delete moved lots without undoing the user_stats counters."""
+    for create_sql in USER_STATS_TRIGGERS:
+        name = re.search(r"IF NOT EXISTS (\w+)", create_sql).group(1)
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(create_sql)
+    # the archiver picks lots by closing time
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lots_closed_at ON lots (closed_at)")
+
+
+AUCTION_COLUMNS = {"opens_at": "TEXT", "closes_at": "TEXT"}
+
+AUCTION_TRIGGERS = [
+    # A lot inserted without a window opens now (or at its opens_at) and runs
+    # for the `auction_hours` setting
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_lots_auction_window
+    AFTER INSERT ON lots WHEN NEW.closes_at IS NULL
+    BEGIN
+        UPDATE lots SET
+            opens_at = COALESCE(NEW.opens_at, datetime('now', 'localtime')),
+            closes_at = datetime(
+                COALESCE(NEW.opens_at, datetime('now', 'localtime')),
+                '+' || COALESCE((SELECT value FROM settings WHERE key = 'auction_hours'), 24) || ' hours'
+            )
+        WHERE id = NEW.id;
+    END
+    """,
+]
+
+
+def _auction_windows(conn):
+    """Auction windows on lots; existing lots keep no deadline."""
+    existing = set(table_columns(conn, "lots"))
+    for column, definition in AUCTION_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE lots ADD COLUMN {column} {definition}")
+    for create_sql in AUCTION_TRIGGERS:
+        conn.execute(create_sql)
+    # the scheduler closes WHERE status = 'open' AND closes_at <= now
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lots_closes_at ON lots (closes_at)")
+
+
+# One private maximum per buyer and lot (proxy_bids.py)
+PROXY_BIDS_TABLE = """
+    CREATE TABLE IF NOT EXISTS proxy_bids (
+        lot_id INTEGER NOT NULL,
+        bidder TEXT NOT NULL,
+        user_name TEXT,
+        user_phone TEXT,
+        max_amount REAL NOT NULL,
+        placed_at REAL NOT NULL,
+        PRIMARY KEY (lot_id, bidder),
+        FOREIGN KEY (lot_id) REFERENCES lots(id) ON DELETE CASCADE
+    )
+"""
+
+
+def _proxy_bids(conn):
+    """Private maxima for proxy (auto) bidding."""
+    conn.execute(PROXY_BIDS_TABLE)
+    # the two strongest proxies on a lot: WHERE lot_id = ? ORDER BY max_amount DESC, placed_at
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_proxy_bids_top ON proxy_bids (lot_id, max_amount DESC, placed_at)")
+    # My Bids: a buyer's maxima
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_proxy_bids_bidder ON proxy_bids (bidder)")
+
+
+# Winner details stored by a Lucky Dip draw (lucky_dip.py), beside the
+# baseline user_id and bid_amount
+LUCKY_DIP_COLUMNS = {
+    "bid_id": "INTEGER",
+    "user_name": "TEXT",
+    "user_phone": "TEXT",
+    "entries": "INTEGER",
+    "pool_amount": "REAL",
+    "seed": "INTEGER",
+    "drawn_at": "TEXT",
+}
+
+
+def _lucky_dip_draws(conn):
+    """Record the winning bid, entry count and seed of each Lucky Dip draw."""
+    conn.execute(BASELINE_TABLES["lucky_dip"])
+    existing = set(table_columns(conn, "lucky_dip"))
+    for column, definition in LUCKY_DIP_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE lucky_dip ADD COLUMN {column} {definition}")
+
+
+# End-of-day invoices (settlement.py): one per buyer per run, one line per
+# won lot. No foreign key to lots, so invoices outlive archiving.
+SETTLEMENT_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS settlements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        run_at TEXT NOT NULL,
+        bidder TEXT NOT NULL,
+        lots INTEGER NOT NULL,
+        kg REAL NOT NULL,
+        gross REAL NOT NULL,
+        discount REAL NOT NULL,
+        fee REAL NOT NULL,
+        total REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS settlement_lots (
+        lot_id INTEGER PRIMARY KEY,
+        settlement_id INTEGER NOT NULL REFERENCES settlements(id) ON DELETE CASCADE,
+        item_name TEXT,
+        kg REAL NOT NULL,
+        price REAL NOT NULL,
+        gross REAL NOT NULL,
+        discount REAL NOT NULL,
+        fee_rate REAL NOT NULL,
+        fee REAL NOT NULL,
+        total REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_settlements_bidder ON settlements (bidder, run_at)",
+    "CREATE INDEX IF NOT EXISTS idx_settlements_run_at ON settlements (run_at)",
+    "CREATE INDEX IF NOT EXISTS idx_settlement_lots_settlement ON settlement_lots (settlement_id)",
+]
+
+
+def _settlements(conn):
+    """Invoice tables for the end-of-day settlement job."""
+    for create_sql in SETTLEMENT_TABLES:
+        conn.execute(create_sql)
+
+
+# Change counters read by versioned_cache.py: every write to a versioned
+# table bumps its row, in the writer's own transaction
+VERSIONED_TABLES = ("items", "lots", "bids", "settings", "nutrition")
+
+TABLE_VERSIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS table_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+VERSION_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{op.lower()}
+    AFTER {op} ON {table}
+    BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+    END
+    """
+    for table in VERSIONED_TABLES
+    for op in ("INSERT", "UPDATE", "DELETE")
+]
+
+
+def _table_versions(conn):
+    """Per-table change counters for the version-keyed query cache."""
+    conn.execute(TABLE_VERSIONS_TABLE)
+    conn.executemany(
+        "INSERT OR IGNORE INTO table_versions (name, version) VALUES (?, 0)", [(t,) for t in VERSIONED_TABLES]
+    )
+    for create_sql in VERSION_TRIGGERS:
+        conn.execute(create_sql)
+
+
+def _user_stats_update_trigger(conn):
+    """Keep user_stats right when a bid changes lot or bidder."""
+    # No rebuild here: migrate() runs without the all_bids/all_lots views, so
+    # a rebuild would drop every archived lot from the lifetime counters.
+    # Drift from earlier updates: python fruitbid/user_stats.py --rebuild
+    for create_sql in USER_STATS_TRIGGERS:
+        conn.execute(create_sql)
+
+
+def _proxy_bid_keys(conn):
+    """Key proxy maxima by buyer (phone, else user id) instead of display name."""
+    if "user_id" not in table_columns(conn, "proxy_bids"):
+        conn.execute("ALTER TABLE proxy_bids ADD COLUMN user_id INTEGER")
+    # A name-keyed row without a phone may merge several buyers ("Guest"): drop it
+    conn.execute("DELETE FROM proxy_bids WHERE NULLIF(user_phone, '') IS NULL")
+    # Two names on one phone are one buyer: keep the higher (then earlier) maximum
+    conn.execute("""
+        DELETE FROM proxy_bids WHERE EXISTS (
+            SELECT 1 FROM proxy_bids p
+            WHERE p.lot_id = proxy_bids.lot_id AND p.user_phone = proxy_bids.user_phone
+              AND (p.max_amount > proxy_bids.max_amount
+                   OR (p.max_amount = proxy_bids.max_amount AND p.rowid < proxy_bids.rowid))
+        )
+    """)
+    conn.execute("UPDATE proxy_bids SET bidder = user_phone")
+
+
+# (version, description, function) — append only, never reorder
+MIGRATIONS = [
+    (1, "baseline schema", _baseline),
+    (2, "reconcile legacy table layouts", _reconcile_legacy_tables),
+    (3, "seed demo data", _seed_demo_data),
+    (4, "hot path indexes", _hot_path_indexes),
+    (5, "lot summary table and triggers", _lot_summary),
+    (6, "lot status and per-user counters", _user_stats),
+    (7, "expiring otp codes", _otp_store),
+    (8, "archive-aware user_stats triggers", _archive_guard),
+    (9, "timed auction windows", _auction_windows),
+    (10, "proxy bid maxima", _proxy_bids),
+    (11, "lucky dip draw results", _lucky_dip_draws),
+    (12, "settlement invoices", _settlements),
+    (13, "table change counters", _table_versions),
+    (14, "user_stats bid update trigger", _user_stats_update_trigger),
+    (15, "proxy bids keyed by buyer", _proxy_bid_keys),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# =====================================================
+# 🚀 RUNNER
+# =====================================================
+def schema_version(conn) -> int:
+    """Version recorded in `meta`, or 0 for a database never migrated."""
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (VERSION_KEY,)).fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return int(row[0]) if row else 0
+
+
+def _count_fk_violations(conn) -> int:
+    # Legacy databases may already contain dangling references; a migration
+    # only fails if it adds new ones.
+    return len(conn.execute("PRAGMA foreign_key_check").fetchall())
+
+
+def migrate(conn=None) -> int:
+    """Apply every pending migration, one transaction each; returns the version."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_pool().connect()
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None  # manage BEGIN/COMMIT ourselves so DDL is transactional
+    # TEMP views (archive.py) name main tables, which blocks rebuilding them
+    temp_views = conn.execute("SELECT name, sql FROM temp.sqlite_master WHERE type = 'view'").fetchall()
+    for name, _ in temp_views:
+        conn.execute(f"DROP VIEW temp.{name}")
+    try:
+        # Table rebuilds must not trip FK actions; this pragma is a no-op inside a transaction
+        conn.execute("PRAGMA foreign_keys = OFF")
+        version = schema_version(conn)
+        for target, description, step in MIGRATIONS:
+            if target <= version:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have migrated while we waited for the lock
+                if schema_version(conn) >= target:
+                    conn.execute("COMMIT")
+                    continue
+                dangling = _count_fk_violations(conn)
+                step(conn)
+                if _count_fk_violations(conn) > dangling:
+                    raise sqlite3.IntegrityError(
+                        f"Migration {target} ({description}) broke foreign keys"
+                    )
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    (VERSION_KEY, str(target)),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            version = target
+        conn.execute("PRAGMA foreign_keys = ON")
+        return version
+    finally:
+        for _, create_sql in temp_views:
+            conn.execute(create_sql.replace("CREATE VIEW", "CREATE TEMP VIEW", 1))
+        conn.isolation_level = previous_isolation
+        if own_conn:
+            conn.close()
+
+
+_checked_version = None
+_migrate_lock = threading.Lock()
+
+
+def ensure_schema() -> int:
+    """Migrate once per process; later calls return the cached version."""
+    global _checked_version
+    if _checked_version is None:
+        with _migrate_lock:
+            if _checked_version is None:
+                _checked_version = migrate()
+    return _checked_version
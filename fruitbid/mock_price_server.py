@@ -0,0 +1,84 @@
+# =====================================================
+# 🧪 mock_price_server.py — Local Market Price API
+# =====================================================
+# Serves the price_feed.py protocol from the built-in catalogue, with
+# optional latency and failure injection:
+#
+#   python fruitbid/mock_price_server.py --port 8700 --latency-ms 200 --fail-rate 0.2
+#   FRUITBID_PRICE_API_URL=http://localhost:8700 streamlit run fruitbid/app_web.py
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+try:
+    from price_feed import MARKET_PRICES
+except ModuleNotFoundError:
+    from fruitbid.price_feed import MARKET_PRICES
+
+
+class MockPriceHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    fail_rate = 0.0
+    jitter = 0.05
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/prices":
+            return self._send(404, {"error": "not found"})
+        time.sleep(self.latency)
+        if random.random() < self.fail_rate:
+            return self._send(503, {"error": "injected failure"})
+
+        items = [i for i in parse_qs(url.query).get("items", [""])[0].split(",") if i]
+        prices = {
+            item: round(MARKET_PRICES[item] * random.uniform(1 - self.jitter, 1 + self.jitter), 2)
+            for item in items
+            if item in MARKET_PRICES
+        }
+        self.server.requests_served += 1
+        self._send(200, {"prices": prices})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_mock_price_server(port=0, latency_ms=0, fail_rate=0.0):
+    """Start the server on a daemon thread; returns (server, base_url)."""
+    handler = type("Handler", (MockPriceHandler,), {"latency": latency_ms / 1000, "fail_rate": fail_rate})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.requests_served = 0
+    threading.Thread(target=server.serve_forever, name="mock-price-server", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock market price API")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    server, url = start_mock_price_server(args.port, args.latency_ms, args.fail_rate)
+    print(f"🧪 Mock price API on {url}/prices?items=Apple,Banana")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
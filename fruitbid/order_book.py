@@ -0,0 +1,170 @@
+# =====================================================
+# 📈 order_book.py — In-memory Top-Bid Book per Lot
+# =====================================================
+
+import heapq
+import threading
+
+# How many bids are kept per lot. Leaderboards show 3, so 10 leaves headroom.
+BOOK_DEPTH = 10
+
+# Only these columns may be used to group bids into books.
+KEY_COLUMNS = ("lot_id", "item_name")
+
+# Columns used for the bidder label, in order of preference.
+BIDDER_COLUMNS = ("user_name", "user_phone", "user_id")
+
+
+# =====================================================
+# 🧺 SINGLE LOT
+# =====================================================
+class LotBook:
+    """Bounded min-heap holding the best bids of one lot."""
+
+    __slots__ = ("heap", "count", "best", "_ranked")
+
+    def __init__(self):
+        # Entries are (amount, -bid_id, bidder, timestamp): the heap root is
+        # the weakest bid, and on equal amounts the later bid loses.
+        self.heap = []
+        self.count = 0
+        self.best = None
+        self._ranked = None
+
+    def add(self, bid_id, bidder, amount, timestamp, depth=BOOK_DEPTH):
+        entry = (float(amount), -int(bid_id), bidder, timestamp)
+        self.count += 1
+        if self.best is None or entry > self.best:
+            self.best = entry
+        if len(self.heap) < depth:
+            heapq.heappush(self.heap, entry)
+        elif entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+        else:
+            return
+        self._ranked = None
+
+    def top(self, k):
+        if self._ranked is None:
+            self._ranked = sorted(self.heap, reverse=True)
+        return [(bidder, amount, ts) for amount, _, bidder, ts in self._ranked[:k]]
+
+
+# =====================================================
+# 📚 ORDER BOOK
+# =====================================================
+class OrderBook:
+    """
+    Process-wide book of the top bids for every lot.
+    Loaded once from `bids`, then fed each committed insert via `add()`.
+    """
+
+    def __init__(self, key_column: str = "lot_id", depth: int = BOOK_DEPTH):
+        if key_column not in KEY_COLUMNS:
+            raise ValueError(f"Unsupported order book key: {key_column}")
+        self.key_column = key_column
+        self.depth = depth
+        self._books = {}
+        self._lock = threading.Lock()
+
+    # ---------------- loading ----------------
+    def top_bids_sql(self, conn, where=""):
+        """Window query returning the top `depth` bids (and bid count) per key."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(bids)")}
+        bidder = next((c for c in BIDDER_COLUMNS if c in columns), "NULL")
+        key = self.key_column
+        return f"""
+            SELECT key, id, bidder, bid_amount, timestamp, n FROM (
+                SELECT {key} AS key, id, {bidder} AS bidder, bid_amount, timestamp,
+                       ROW_NUMBER() OVER (PARTITION BY {key} ORDER BY bid_amount DESC, id) AS rn,
+                       COUNT(*) OVER (PARTITION BY {key}) AS n
+                FROM bids
+                WHERE {key} IS NOT NULL {where}
+            )
+            WHERE rn <= ?
+            ORDER BY key, rn
+        """
+
+    def _read_books(self, conn, keys=None):
+        where, params = "", []
+        if keys is not None:
+            keys = list(keys)
+            where = f"AND {self.key_column} IN ({','.join('?' * len(keys))})"
+            params = keys
+        rows = conn.execute(self.top_bids_sql(conn, where), (*params, self.depth)).fetchall()
+
+        books = {}
+        for key, bid_id, bidder, amount, ts, n in rows:
+            book = books.get(key)
+            if book is None:
+                book = books[key] = LotBook()
+            book.add(bid_id, bidder, amount, ts, self.depth)
+            book.count = n
+        return books
+
+    def load(self, conn):
+        """(Re)build every book from the `bids` table in one query."""
+        books = self._read_books(conn)
+        with self._lock:
+            self._books = books
+        return self
+
+    # ---------------- writes ----------------
+    def add(self, key, bid_id, bidder, amount, timestamp):
+        """Record a bid that has already been committed to the database."""
+        with self._lock:
+            book = self._books.get(key)
+            if book is None:
+                book = self._books[key] = LotBook()
+            book.add(bid_id, bidder, amount, timestamp, self.depth)
+
+    def discard(self, keys):
+        """Forget the books for `keys` (lots moved to the archive)."""
+        with self._lock:
+            for key in keys:
+                self._books.pop(key, None)
+
+    # ---------------- reads ----------------
+    def highest(self, key):
+        """Highest bid amount for a lot, or None when it has no bids. O(1)."""
+        with self._lock:
+            book = self._books.get(key)
+            if book is None or book.best is None:
+                return None
+            return book.best[0]
+
+    def top(self, key, k: int = 3):
+        """Top `k` bids as (bidder, amount, timestamp), best first. O(k)."""
+        with self._lock:
+            book = self._books.get(key)
+            return book.top(min(k, self.depth)) if book else []
+
+    def count(self, key) -> int:
+        """Number of bids seen for a lot."""
+        with self._lock:
+            book = self._books.get(key)
+            return book.count if book else 0
+
+    # ---------------- consistency ----------------
+    def check_consistency(self, conn, keys=None, repair: bool = False):
+        """
+        Compare the in-memory books against `bids`.
+        Returns {key: {"expected": [...], "actual": [...]}} for every lot that
+        drifted; with `repair=True` those lots are reloaded from the database.
+        """
+        fresh = self._read_books(conn, keys)
+        with self._lock:
+            check_keys = set(fresh) | (set(self._books) if keys is None else set(keys))
+            mismatches = {}
+            for key in check_keys:
+                expected, actual = fresh.get(key), self._books.get(key)
+                want = (expected.count, expected.top(self.depth)) if expected else (0, [])
+                have = (actual.count, actual.top(self.depth)) if actual else (0, [])
+                if want != have:
+                    mismatches[key] = {"expected": want, "actual": have}
+                    if repair:
+                        if expected:
+                            self._books[key] = expected
+                        else:
+                            self._books.pop(key, None)
+        return mismatches
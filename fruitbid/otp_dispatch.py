@@ -0,0 +1,235 @@
+# =====================================================
+# 📨 otp_dispatch.py — Background OTP Delivery
+# =====================================================
+# Sending an SMS takes a round trip to Twilio, so pages only queue the
+# message and return; a small worker pool delivers it:
+#
+# * one Twilio client (and its HTTP session) per process
+# * failed sends are retried with exponential backoff and jitter
+# * one message per recipient at a time: a repeated request while a
+#   code is queued, in flight or just sent is answered with that job
+# * StubTransport delivers to memory, for load tests and local runs
+#
+#   FRUITBID_OTP_TRANSPORT=stub|twilio  (default: twilio when TWILIO_SID,
+#   TWILIO_AUTH_TOKEN and TWILIO_PHONE are set, else stub)
+
+import itertools
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+MAX_ATTEMPTS = 4
+BACKOFF = 0.5
+DEDUPE_WINDOW = 30
+
+# job states
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+# =====================================================
+# 🚚 TRANSPORTS
+# =====================================================
+class TwilioTransport:
+    """SMS through Twilio, reusing one client for every message."""
+
+    def __init__(self, sid=None, auth_token=None, from_number=None):
+        self.sid = sid or os.getenv("TWILIO_SID")
+        self.auth_token = auth_token or os.getenv("TWILIO_AUTH_TOKEN") or os.getenv("TWILIO_AUTH")
+        self.from_number = from_number or os.getenv("TWILIO_PHONE")
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from twilio.rest import Client  # only needed when SMS is really sent
+
+                    self._client = Client(self.sid, self.auth_token)
+        return self._client
+
+    def send(self, to, body):
+        self.client.messages.create(body=body, from_=self.from_number, to=to)
+
+
+class StubTransport:
+    """Records messages instead of sending them; optional latency and failures."""
+
+    def __init__(self, latency=0.0, fail_rate=0.0, keep=1000):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.sent = deque(maxlen=keep)  # (to, body, sent_at)
+        self.attempts = 0
+        self._lock = threading.Lock()
+
+    def send(self, to, body):
+        with self._lock:
+            self.attempts += 1
+        time.sleep(self.latency)
+        if random.random() < self.fail_rate:
+            raise ConnectionError("stub transport: injected failure")
+        self.sent.append((to, body, time.time()))
+
+    def last_message(self, to):
+        """Most recent body delivered to `to`, or None."""
+        for recipient, body, _ in reversed(self.sent):
+            if recipient == to:
+                return body
+        return None
+
+
+def default_transport():
+    mode = os.getenv("FRUITBID_OTP_TRANSPORT")
+    if mode is None:
+        configured = os.getenv("TWILIO_SID") and os.getenv("TWILIO_PHONE") and (
+            os.getenv("TWILIO_AUTH_TOKEN") or os.getenv("TWILIO_AUTH")
+        )
+        mode = "twilio" if configured else "stub"
+    return TwilioTransport() if mode == "twilio" else StubTransport()
+
+
+# =====================================================
+# 📬 DISPATCHER
+# =====================================================
+class DispatchJob:
+    __slots__ = ("id", "to", "body", "state", "attempts", "error", "queued_at", "finished_at")
+
+    def __init__(self, job_id, to, body):
+        self.id = job_id
+        self.to = to
+        self.body = body
+        self.state = PENDING
+        self.attempts = 0
+        self.error = None
+        self.queued_at = time.time()
+        self.finished_at = None
+
+
+class OTPDispatcher:
+    """Queue of outgoing messages drained by `workers` daemon threads."""
+
+    def __init__(self, transport=None, workers=4, max_attempts=MAX_ATTEMPTS, backoff=BACKOFF,
+                 dedupe_window=DEDUPE_WINDOW):
+        self.transport = transport or default_transport()
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.dedupe_window = dedupe_window
+        self._queue = queue.Queue()
+        self._jobs = {}  # recipient -> latest DispatchJob
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._metrics = {"queued": 0, "deduplicated": 0, "sent": 0, "retries": 0, "failed": 0}
+        for n in range(workers):
+            threading.Thread(target=self._work, name=f"otp-dispatch-{n}", daemon=True).start()
+
+    # ---------------- public API ----------------
+    def submit(self, to, body):
+        """
+        Queue `body` for `to` and return (job, queued). When `to` already
+        has a job pending, in flight or sent within `dedupe_window`
+        seconds, that job is returned with queued=False. `body` may be a
+        callable; it is only called when a new job is queued, so a fresh
+        code is never issued for a message that will not go out.
+        """
+        with self._lock:
+            job = self._jobs.get(to)
+            if job and (
+                job.state in (PENDING, SENDING)
+                or (job.state == SENT and time.time() - job.finished_at < self.dedupe_window)
+            ):
+                self._metrics["deduplicated"] += 1
+                return job, False
+            job = DispatchJob(next(self._ids), to, body() if callable(body) else body)
+            self._jobs[to] = job
+            self._metrics["queued"] += 1
+        self._queue.put(job)
+        return job, True
+
+    def status(self, to):
+        """State of the latest message to `to` (pending/sending/sent/failed), or None."""
+        with self._lock:
+            job = self._jobs.get(to)
+            return job.state if job else None
+
+    def wait(self, timeout=None) -> bool:
+        """Block until nothing is queued, in flight or waiting to retry."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                busy = any(job.state in (PENDING, SENDING) for job in self._jobs.values())
+            if not busy:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def stats(self) -> dict:
+        with self._lock:
+            m = dict(self._metrics)
+            m["pending"] = sum(job.state in (PENDING, SENDING) for job in self._jobs.values())
+        m["queue_depth"] = self._queue.qsize()
+        m["transport"] = type(self.transport).__name__
+        return m
+
+    # ---------------- workers ----------------
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._deliver(job)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, job):
+        with self._lock:
+            job.state = SENDING
+            job.attempts += 1
+        try:
+            self.transport.send(job.to, job.body)
+        except Exception as e:
+            with self._lock:
+                job.error = str(e)
+                if job.attempts >= self.max_attempts:
+                    job.state, job.finished_at = FAILED, time.time()
+                    self._metrics["failed"] += 1
+                    return
+                job.state = PENDING
+                self._metrics["retries"] += 1
+            delay = self.backoff * 2 ** (job.attempts - 1) * random.uniform(0.5, 1.5)
+            timer = threading.Timer(delay, self._queue.put, (job,))
+            timer.daemon = True
+            timer.start()
+            return
+        with self._lock:
+            job.state, job.finished_at, job.error = SENT, time.time(), None
+            self._metrics["sent"] += 1
+            # Keep only recent recipients around for de-duplication
+            if len(self._jobs) > 10000:
+                cutoff = time.time() - self.dedupe_window
+                for to, old in list(self._jobs.items()):
+                    if old.state in (SENT, FAILED) and old.finished_at < cutoff:
+                        del self._jobs[to]
+
+
+# =====================================================
+# 🌐 PROCESS-WIDE DISPATCHER
+# =====================================================
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_otp_dispatcher() -> OTPDispatcher:
+    """The process-wide dispatcher, started on first use."""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = OTPDispatcher()
+    return _dispatcher
@@ -0,0 +1,204 @@
+# =====================================================
+# 🔢 otp_store.py — One-Time Code Storage with TTL Expiry
+# =====================================================
+# One active code per recipient (mobile number or email), keyed on
+# `mobile_email`, with the expiry as an integer epoch:
+#
+# * MemoryOTPStore (default) — a dict plus an expiry heap; lookups are
+#   O(1) and the sweeper pops expired codes off the heap
+# * SQLiteOTPStore — the `otps` table (migration 7), one row per
+#   recipient, so it holds active codes only; use it when codes must
+#   survive a restart or be shared by several app processes
+#
+# A background sweeper deletes expired codes in batches. A code is
+# consumed by its first successful check.
+#
+#   FRUITBID_OTP_STORE=sqlite streamlit run fruitbid/app_web.py
+
+import heapq
+import hmac
+import os
+import threading
+import time
+
+try:
+    from pool import get_pool
+except ModuleNotFoundError:
+    from fruitbid.pool import get_pool
+
+OTP_TTL = 300
+SWEEP_INTERVAL = 30
+SWEEP_BATCH = 500
+
+# check() results
+OTP_OK = "ok"
+OTP_INVALID = "invalid"
+OTP_EXPIRED = "expired"
+OTP_MISSING = "missing"
+
+# SQLite mode statements (query_plans.py checks their plans)
+PUT_SQL = """
+    INSERT INTO otps (mobile_email, otp, expires_at) VALUES (?, ?, ?)
+    ON CONFLICT (mobile_email) DO UPDATE SET otp = excluded.otp, expires_at = excluded.expires_at
+"""
+LOOKUP_SQL = "SELECT otp, expires_at FROM otps WHERE mobile_email = ?"
+CONSUME_SQL = "DELETE FROM otps WHERE mobile_email = ? AND otp = ?"
+SWEEP_SQL = """
+    DELETE FROM otps WHERE mobile_email IN (
+        SELECT mobile_email FROM otps WHERE expires_at <= ? LIMIT ?
+    )
+"""
+
+
+def _now() -> int:
+    return int(time.time())
+
+
+# =====================================================
+# 🧠 IN-MEMORY STORE
+# =====================================================
+class MemoryOTPStore:
+    """Codes in a dict; lost on restart and private to this process."""
+
+    def __init__(self):
+        self._codes = {}  # mobile_email -> (otp, expires_at)
+        self._expiry = []  # heap of (expires_at, mobile_email); may hold replaced entries
+        self._lock = threading.Lock()
+
+    def put(self, mobile_email, otp, ttl=OTP_TTL) -> int:
+        """Store `otp` as the only active code for `mobile_email`; returns its expiry epoch."""
+        expires_at = _now() + ttl
+        with self._lock:
+            self._codes[mobile_email] = (otp, expires_at)
+            heapq.heappush(self._expiry, (expires_at, mobile_email))
+        return expires_at
+
+    def check(self, mobile_email, otp) -> str:
+        with self._lock:
+            entry = self._codes.get(mobile_email)
+            if entry is None:
+                return OTP_MISSING
+            if entry[1] <= _now():
+                del self._codes[mobile_email]
+                return OTP_EXPIRED
+            if not hmac.compare_digest(entry[0], str(otp)):
+                return OTP_INVALID
+            del self._codes[mobile_email]
+            return OTP_OK
+
+    def sweep(self, batch=SWEEP_BATCH) -> int:
+        """Drop up to `batch` expired codes; returns how many were removed."""
+        now, removed = _now(), 0
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now and removed < batch:
+                expires_at, mobile_email = heapq.heappop(self._expiry)
+                entry = self._codes.get(mobile_email)
+                if entry and entry[1] == expires_at:
+                    del self._codes[mobile_email]
+                    removed += 1
+            # Codes replaced or consumed early leave heap entries behind
+            if len(self._expiry) > 2 * len(self._codes) + batch:
+                self._expiry = [(exp, key) for key, (_, exp) in self._codes.items()]
+                heapq.heapify(self._expiry)
+        return removed
+
+    def __len__(self):
+        return len(self._codes)
+
+
+# =====================================================
+# 💾 SQLITE STORE
+# =====================================================
+class SQLiteOTPStore:
+    """Codes in the `otps` table, one row per recipient."""
+
+    def __init__(self, pool=None):
+        self.pool = pool or get_pool()
+
+    def put(self, mobile_email, otp, ttl=OTP_TTL) -> int:
+        expires_at = _now() + ttl
+        with self.pool.transaction() as conn:
+            conn.execute(PUT_SQL, (mobile_email, otp, expires_at))
+        return expires_at
+
+    def check(self, mobile_email, otp) -> str:
+        conn = self.pool.thread_connection()
+        row = conn.execute(LOOKUP_SQL, (mobile_email,)).fetchone()
+        if row is None:
+            return OTP_MISSING
+        if row[1] <= _now():
+            return OTP_EXPIRED  # the sweeper deletes it
+        if not hmac.compare_digest(row[0], str(otp)):
+            return OTP_INVALID
+        with self.pool.transaction() as conn:
+            # Matching on the code makes a concurrent second use fail
+            consumed = conn.execute(CONSUME_SQL, (mobile_email, row[0])).rowcount
+        return OTP_OK if consumed else OTP_MISSING
+
+    def sweep(self, batch=SWEEP_BATCH) -> int:
+        with self.pool.transaction() as conn:
+            return conn.execute(SWEEP_SQL, (_now(), batch)).rowcount
+
+    def __len__(self):
+        return self.pool.thread_connection().execute("SELECT COUNT(*) FROM otps").fetchone()[0]
+
+
+# =====================================================
+# 🧹 SWEEPER
+# =====================================================
+class OTPSweeper:
+    """Daemon thread that clears expired codes every `interval` seconds."""
+
+    def __init__(self, store, interval=SWEEP_INTERVAL, batch=SWEEP_BATCH):
+        self.store = store
+        self.interval = interval
+        self.batch = batch
+        self.removed = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="otp-sweeper", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=self.interval)
+
+    def sweep_all(self) -> int:
+        """Sweep batch after batch until no expired code is left."""
+        total = 0
+        while True:
+            removed = self.store.sweep(self.batch)
+            total += removed
+            if removed < self.batch:
+                break
+        self.removed += total
+        return total
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep_all()
+            except Exception:
+                pass  # e.g. database busy: retry next interval
+
+
+# =====================================================
+# 🌐 PROCESS-WIDE STORE
+# =====================================================
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_otp_store():
+    """The configured OTP store (FRUITBID_OTP_STORE=memory|sqlite), sweeper running."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                mode = os.getenv("FRUITBID_OTP_STORE", "memory")
+                store = SQLiteOTPStore() if mode == "sqlite" else MemoryOTPStore()
+                OTPSweeper(store).start()
+                _store = store
+    return _store
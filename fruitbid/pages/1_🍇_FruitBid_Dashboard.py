@@ -4,6 +4,9 @@
 
 import streamlit as st
 
+from auctions import time_left
+from db import ensure_schema, fetch_all, get_auction_scheduler, user_dashboard_stats
+
 # ⚙️ PAGE CONFIG — must be FIRST Streamlit command
 
 # Try importing sidebar safely
@@ -37,10 +40,17 @@ st.markdown("---")
 # =====================================================
 # 📊 Dashboard Metrics
 # =====================================================
+ensure_schema()
+get_auction_scheduler()  # closes lots as their auction ends
+
+# One row per user in user_stats, kept current by triggers on bids/lots.
+# Bids placed from My Bids carry only the phone, so both labels are summed.
+stats = user_dashboard_stats(st.session_state.user_name, st.session_state.phone)
+
 col1, col2, col3 = st.columns(3)
-col1.metric("Active Bids", "3", "↑ 1")
-col2.metric("Fruits Won", "12 kg", "🍎 +2")
-col3.metric("Wallet Balance", "₹ 2,450", "💰")
+col1.metric("Active Bids", stats["active_lots"], f"{stats['bid_count']} bids placed", delta_color="off")
+col2.metric("Fruits Won", f"{stats['kg_won']:g} kg", f"🍎 {stats['lots_won']} lots", delta_color="off")
+col3.metric("Spent on Wins", f"₹ {stats['spent']:,.0f}", "💰", delta_color="off")
 
 st.markdown("---")
 
@@ -49,13 +59,32 @@ st.markdown("---")
 # =====================================================
 st.subheader("🛍️ Current Fruit Lots")
 
+# Current high and bid count come straight from lot_summary — no bids scan
+rows = fetch_all("""
+    SELECT l.item_name, l.quantity, l.base_price, s.high_bid, s.bid_count, s.last_bid_at, l.status,
+           l.closes_at
+    FROM lots l
+    LEFT JOIN lot_summary s ON s.lot_id = l.id
+    ORDER BY l.id DESC
+    LIMIT 20
+""")
+
 lots = [
-    {"Fruit": "Mango (Alphonso)", "Current Bid": "₹ 120/kg", "Time Left": "10 min"},
-    {"Fruit": "Banana (Robusta)", "Current Bid": "₹ 45/kg", "Time Left": "30 min"},
-    {"Fruit": "Apple (Shimla)", "Current Bid": "₹ 150/kg", "Time Left": "5 min"},
+    {
+        "Fruit": f"{item_name} ({quantity})",
+        "Current Bid": f"₹ {high_bid if high_bid is not None else base_price}/kg",
+        "Bids": bid_count or 0,
+        "Last Bid": last_bid_at or "—",
+        "Time Left": time_left(closes_at) if status == "open" else "—",
+        "Status": "🟢 Open" if status == "open" else "🔒 Closed",
+    }
+    for item_name, quantity, base_price, high_bid, bid_count, last_bid_at, status, closes_at in rows
 ]
 
-st.dataframe(lots, use_container_width=True)
+if lots:
+    st.dataframe(lots, use_container_width=True)
+else:
+    st.info("No fruit lots available yet.")
 
 st.markdown("---")
 st.caption("📈 More analytics, charts, and price insights coming soon!")
@@ -5,6 +5,8 @@
 import streamlit as st
 import sqlite3
 
+from db import ensure_schema, fetch_all
+
 # =====================================================
 # ⚙️ Session State Initialization
 # =====================================================
@@ -29,8 +31,6 @@ except ModuleNotFoundError:
         st.sidebar.write("🏠 Home")
         return None
 
-DB_PATH = "fruitbid.db"
-
 # =====================================================
 # 🖥️ UI — Marketplace Page
 # =====================================================
@@ -86,18 +86,16 @@ st.markdown("---")
 def fetch_lots():
     """Retrieve all available fruit lots from the database."""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            c = conn.cursor()
-            c.execute("""
-                SELECT item_name, quantity, base_price, date_added 
-                FROM lots ORDER BY id DESC
-            """)
-            return c.fetchall()
+        return fetch_all("""
+            SELECT item_name, quantity, base_price, date_added 
+            FROM lots ORDER BY id DESC
+        """)
     except sqlite3.Error as e:
         st.error(f"Database error: {e}")
         return []
 
 
+ensure_schema()
 lots = fetch_lots()
 
 
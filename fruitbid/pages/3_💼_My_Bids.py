@@ -3,8 +3,8 @@
 # =====================================================
 
 import streamlit as st
-import sqlite3
-from datetime import datetime
+
+from db import ensure_schema, fetch_all, session_client, submit_bid, submit_proxy_bid, user_proxies
 
 # =====================================================
 # ✅ PAGE CONFIG (must be the first Streamlit command)
@@ -16,20 +16,16 @@ st.set_page_config(page_title="💼 My Bids", page_icon="💼", layout="wide")
 # =====================================================
 try:
     from components.sidebar import render_sidebar
-    from app_web import init_db  # Database setup function
 except ModuleNotFoundError:
-    st.warning("⚠️ Missing imports — using fallback menu and DB init.")
+    st.warning("⚠️ Missing imports — using fallback menu.")
     def render_sidebar():
         with st.sidebar:
             return st.radio("Navigate:", ["🏠 Home", "🏪 Marketplace", "💼 My Bids", "⚙️ Add Lot (Admin)"])
-    def init_db(): pass
-
-DB_PATH = "fruitbid.db"
 
 # =====================================================
 # ⚙️ INITIAL SETUP
 # =====================================================
-init_db()  # Ensure tables exist before proceeding
+ensure_schema()  # Migrates on the first run in this process only
 
 
 # =====================================================
@@ -80,81 +76,90 @@ st.markdown("---")
 # 🧺 DATABASE HELPERS
 # =====================================================
 def get_available_lots():
-    """Fetch all fruit lots."""
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT item_name, base_price 
-            FROM lots ORDER BY id DESC
-        """)
-        return c.fetchall()
-
-
-def create_bids_table():
-    """Ensure bids table exists."""
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS bids (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_phone TEXT,
-                item_name TEXT,
-                bid_price REAL,
-                bid_time TEXT
-            )
-        """)
-        conn.commit()
-
-
-def insert_bid(phone, item_name, bid_price):
-    """Insert a new bid."""
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute("""
-            INSERT INTO bids (user_phone, item_name, bid_price, bid_time)
-            VALUES (?, ?, ?, ?)
-        """, (
-            phone,
-            item_name,
-            bid_price,
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        ))
-        conn.commit()
+    """Fetch the lots still open for bidding."""
+    return fetch_all("""
+        SELECT id, item_name, base_price
+        FROM lots WHERE status = 'open' ORDER BY id DESC
+    """)
+
+
+def insert_bid(phone, lot_id, item_name, bid_price):
+    """Queue a new bid and wait until its batch is committed."""
+    submit_bid(
+        lot_id,
+        bid_price,
+        user_name=st.session_state.get("user_name", "Guest"),
+        user_phone=phone,
+        item_name=item_name,
+        client=session_client(),
+    ).result(timeout=10)
+
+
+def insert_proxy_bid(phone, lot_id, item_name, max_price):
+    """Queue an auto-bid maximum; returns where it stands once committed."""
+    return submit_proxy_bid(
+        lot_id,
+        max_price,
+        user_name=st.session_state.get("user_name", "Guest"),
+        user_phone=phone,
+        item_name=item_name,
+        client=session_client(),
+    ).result(timeout=10)
 
 
 def get_user_bids(phone):
-    """Fetch all bids by a user."""
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT item_name, bid_price, bid_time
-            FROM bids WHERE user_phone = ? ORDER BY id DESC
-        """, (phone,))
-        return c.fetchall()
+    """Fetch all bids by a user, archived lots included."""
+    return fetch_all("""
+        SELECT item_name, bid_amount, timestamp
+        FROM all_bids WHERE user_phone = ? ORDER BY id DESC
+    """, (phone,))
 
 
 # =====================================================
 # 💰 PLACE A NEW BID
 # =====================================================
-create_bids_table()
 lots = get_available_lots()
 
 if lots:
     st.subheader("💰 Place a New Bid")
 
-    item_options = [lot[0] for lot in lots]
-    selected_item = st.selectbox("Select Fruit Lot", item_options)
-
-    base_price = next(lot[1] for lot in lots if lot[0] == selected_item)
-    bid_price = st.number_input(
-        f"Enter your bid (₹/kg) — Base price ₹{base_price}",
-        min_value=1.0,
-        step=1.0,
+    lot_id, selected_item, base_price = st.selectbox(
+        "Select Fruit Lot", lots, format_func=lambda lot: lot[1]
     )
-
-    if st.button("✅ Submit Bid"):
-        insert_bid(user_phone, selected_item, bid_price)
-        st.success(f"🎉 Bid of ₹{bid_price}/kg placed for **{selected_item}** successfully!")
+    bid_type = st.radio("Bid type", ["💰 Single bid", "🤖 Auto-bid up to a maximum"], horizontal=True)
+
+    if bid_type == "💰 Single bid":
+        bid_price = st.number_input(
+            f"Enter your bid (₹/kg) — Base price ₹{base_price}",
+            min_value=1.0,
+            step=1.0,
+        )
+
+        if st.button("✅ Submit Bid"):
+            try:
+                insert_bid(user_phone, lot_id, selected_item, bid_price)
+            except Exception as e:
+                st.error(f"❌ Could not place bid: {e}")
+            else:
+                st.success(f"🎉 Bid of ₹{bid_price}/kg placed for **{selected_item}** successfully!")
+    else:
+        max_price = st.number_input(
+            "Your maximum (₹/kg) — we bid for you one step over others, up to this",
+            min_value=float(base_price),
+            step=1.0,
+        )
+
+        if st.button("🤖 Set Auto-Bid"):
+            try:
+                proxy = insert_proxy_bid(user_phone, lot_id, selected_item, max_price)
+            except Exception as e:
+                st.error(f"❌ Could not set auto-bid: {e}")
+            else:
+                standing = "you are leading" if proxy["leading"] else "another buyer is ahead"
+                st.success(
+                    f"🤖 Auto-bid up to ₹{proxy['max_amount']}/kg set for **{selected_item}** — "
+                    f"high bid ₹{proxy['high_bid']}/kg, {standing}."
+                )
 else:
     st.info("No fruit lots available yet. Please add some from the ⚙️ Admin Add Lot page.")
 
@@ -176,4 +181,17 @@ if user_bids:
 else:
     st.info("You haven’t placed any bids yet.")
 
+# =====================================================
+# 🤖 DISPLAY USER’S AUTO-BIDS
+# =====================================================
+proxies = user_proxies(user_phone)
+
+if proxies:
+    st.subheader("🤖 Your Auto-Bids")
+    st.dataframe(
+        [{"Fruit": f, "Maximum (₹/kg)": m, "Status": "🏆 Leading" if leading else "⚠️ Out-bid"}
+         for _, f, m, leading in proxies],
+        use_container_width=True
+    )
+
 st.caption("💡 All bids are stored in `fruitbid.db` for persistence across sessions.")
@@ -3,11 +3,11 @@
 # =====================================================
 
 import streamlit as st
-import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
+from auctions import AUCTION_HOURS, AUCTION_HOURS_KEY, TIME_FORMAT
 from components.sidebar import render_sidebar
-
-DB_PATH = "fruitbid.db"
+from db import ensure_schema, execute_query, fetch_all, get_setting
+from lot_import import import_lots, read_lot_file, validate_lots
 
 
 # =====================================================
@@ -30,43 +30,23 @@ render_sidebar()
 # =====================================================
 # 🗃️ DATABASE HELPERS
 # =====================================================
-def init_db():
-    """Create the lots table if it doesn’t exist."""
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS lots (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                item_name TEXT NOT NULL,
-                quantity TEXT NOT NULL,
-                base_price REAL NOT NULL,
-                date_added TEXT
-            )
-        """)
-        conn.commit()
-
-
-def add_lot(item_name: str, quantity: str, base_price: float):
-    """Insert a new fruit lot into the database."""
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute("""
-            INSERT INTO lots (item_name, quantity, base_price, date_added)
-            VALUES (?, ?, ?, ?)
-        """, (item_name, quantity, base_price, datetime.now().strftime("%Y-%m-%d %H:%M")))
-        conn.commit()
+def add_lot(item_name: str, quantity: str, base_price: float, auction_hours: float):
+    """Insert a new fruit lot whose auction opens now and runs `auction_hours`."""
+    now = datetime.now()
+    execute_query("""
+        INSERT INTO lots (item_name, quantity, base_price, date_added, opens_at, closes_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (item_name, quantity, base_price, now.strftime("%Y-%m-%d %H:%M"),
+          now.strftime(TIME_FORMAT), (now + timedelta(hours=auction_hours)).strftime(TIME_FORMAT)))
 
 
 def fetch_lots():
     """Retrieve all lots from the database."""
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute("SELECT item_name, quantity, base_price, date_added FROM lots ORDER BY id DESC")
-        return c.fetchall()
+    return fetch_all("SELECT item_name, quantity, base_price, date_added FROM lots ORDER BY id DESC")
 
 
-# Initialize database
-init_db()
+# Migrates on the first run in this process only
+ensure_schema()
 
 
 # =====================================================
@@ -84,12 +64,16 @@ with st.form("add_lot_form", clear_on_submit=True):
     item_name = st.text_input("🍎 Fruit Name", placeholder="e.g. Mango (Alphonso)")
     quantity = st.text_input("📦 Quantity", placeholder="e.g. 10 kg, 1 crate")
     base_price = st.number_input("💰 Base Price (₹ per kg)", min_value=1.0, step=0.5)
+    auction_hours = st.number_input(
+        "⏳ Auction Length (hours)", min_value=0.25, step=1.0,
+        value=float(get_setting(AUCTION_HOURS_KEY, AUCTION_HOURS)),
+    )
 
     submitted = st.form_submit_button("✅ Add Lot")
 
     if submitted:
         if item_name.strip() and quantity.strip():
-            add_lot(item_name.strip(), quantity.strip(), base_price)
+            add_lot(item_name.strip(), quantity.strip(), base_price, auction_hours)
             st.success(f"✅ New lot added: **{item_name} ({quantity})** at ₹{base_price}/kg")
             st.balloons()
             st.rerun()
@@ -97,6 +81,40 @@ with st.form("add_lot_form", clear_on_submit=True):
             st.warning("⚠️ Please fill in all required fields before adding the lot.")
 
 
+# =====================================================
+# 📥 BULK IMPORT
+# =====================================================
+st.markdown("---")
+st.subheader("📥 Bulk Import from a Sheet")
+st.caption("CSV or Excel with columns **item_name**, **quantity** (e.g. `100 kg`) and **base_price** (₹/kg).")
+
+flash = st.session_state.pop("import_flash", None)
+if flash:
+    st.success(flash)
+
+# A new key after each import empties the uploader, so a rerun (or a second
+# click) cannot import the same sheet again
+upload_round = st.session_state.setdefault("lot_upload_round", 0)
+sheet = st.file_uploader("Upload lots sheet", type=["csv", "xlsx", "xls"], key=f"lot_sheet_{upload_round}")
+if sheet is not None:
+    try:
+        valid_lots, lot_errors = validate_lots(read_lot_file(sheet))
+    except ValueError as e:
+        st.error(f"❌ Could not read the sheet: {e}")
+    else:
+        st.write(f"✅ **{len(valid_lots)}** valid lots • ❌ **{len(lot_errors)}** rows with errors")
+        if len(lot_errors):
+            st.dataframe(lot_errors, use_container_width=True, hide_index=True)
+        if len(valid_lots):
+            with st.expander(f"Preview {len(valid_lots)} lots"):
+                st.dataframe(valid_lots, use_container_width=True, hide_index=True)
+            if st.button(f"📥 Import {len(valid_lots)} Lots"):
+                added = import_lots(valid_lots)
+                st.session_state.lot_upload_round = upload_round + 1
+                st.session_state.import_flash = f"✅ Imported {added} lots in one transaction."
+                st.rerun()
+
+
 # =====================================================
 # 📦 CURRENT LOTS
 # =====================================================
@@ -3,12 +3,23 @@
 # =====================================================
 
 import streamlit as st
+import os
 import sqlite3
+from urllib.parse import urlencode
 from contextlib import closing
 
 # Try importing DB helpers safely
 try:
-    from db import init_db, initialize_items, get_db_connection
+    from db import (
+        ensure_schema, init_db, initialize_items, db_connection, get_bid_ingestor,
+        check_aggregates, rebuild_aggregates, close_lot, fetch_all,
+        get_archiver, archive_now, archive_overview, get_auction_scheduler,
+        run_lucky_dip, lucky_dip_results, settle_now, recent_settlements, cache_overview,
+    )
+    from pool import get_pool
+    from rate_limit import get_rate_limiter
+    from export import EXPORT_FORMATS, EXPORT_TABLES, export_to_tempfile
+    from admin_auth import logout, require_admin
 except ImportError:
     st.error("⚠️ Missing `db.py` module. Please ensure it exists in your project folder.")
     st.stop()
@@ -16,9 +27,15 @@ except ImportError:
 # =====================================================
 # ⚙️ PAGE SETUP
 # =====================================================
+ensure_schema()
 
 st.title("🛠️ FruitBid Admin Dashboard")
+require_admin()
+
 st.markdown("Manage your database and system configuration safely below.")
+if st.button("🔒 Log out"):
+    logout()
+    st.rerun()
 st.markdown("---")
 
 
@@ -50,7 +67,42 @@ with col2:
             except Exception as e:
                 st.error(f"❌ Initialization failed:\n\n{e}")
 
+col3, col4 = st.columns(2)
+
+with col3:
+    if st.button("🔍 Check Aggregates"):
+        with st.spinner("Comparing lot_summary and user_stats with bids..."):
+            drifted = check_aggregates()
+        for table, keys in drifted.items():
+            if keys:
+                st.warning(f"⚠️ {table}: {len(keys)} rows drifted: {keys[:20]}")
+            else:
+                st.success(f"✅ {table} matches bids.")
 
+with col4:
+    if st.button("📋 Rebuild Aggregates"):
+        with st.spinner("Recomputing lot_summary and user_stats..."):
+            try:
+                written = rebuild_aggregates()
+                st.success(
+                    f"✅ Rebuilt {written['lot_summary']} lot summaries and {written['user_stats']} user counters."
+                )
+            except Exception as e:
+                st.error(f"❌ Rebuild failed:\n\n{e}")
+
+open_lots = fetch_all("SELECT id, item_name, quantity FROM lots WHERE status = 'open' ORDER BY id DESC LIMIT 200")
+if open_lots:
+    lot_col, close_col = st.columns([3, 1])
+    lot_to_close = lot_col.selectbox(
+        "Close a lot (settles the winner)",
+        open_lots,
+        format_func=lambda lot: f"#{lot[0]} {lot[1]} ({lot[2]})",
+    )
+    if close_col.button("🔒 Close Lot"):
+        if close_lot(lot_to_close[0]):
+            st.success(f"✅ Lot #{lot_to_close[0]} closed.")
+        else:
+            st.warning("⚠️ Lot was already closed.")
 
 # =====================================================
 # 📊 DATABASE OVERVIEW
@@ -65,14 +117,13 @@ TABLES = [
     "otps",
     "nutrition",
     "lucky_dip",
+    "settlements",
 ]
 
 summary_data = []
 
 try:
-    with closing(get_db_connection()) as conn:
-        if conn is None:
-            raise RuntimeError("Database connection could not be established.")
+    with db_connection() as conn:
         with closing(conn.cursor()) as c:
             for table in TABLES:
                 try:
@@ -90,6 +141,142 @@ try:
 except Exception as e:
     st.error(f"⚠️ Database access error: {e}")
 
+# =====================================================
+# 🔌 CONNECTION POOL
+# =====================================================
+st.subheader("🔌 Connection Pool")
+
+pool_stats = get_pool().stats()
+p1, p2, p3, p4 = st.columns(4)
+p1.metric("In Use", f"{pool_stats['in_use']} / {pool_stats['size']}")
+p2.metric("Checkouts", pool_stats["checkouts"])
+p3.metric("Avg Wait", f"{pool_stats['wait_ms_avg']:.1f} ms", f"max {pool_stats['wait_ms_max']:.1f} ms", delta_color="off")
+p4.metric("Timeouts", pool_stats["timeouts"])
+st.caption(f"🗄️ `{get_pool().config.path}` • journal_mode={get_pool().config.journal_mode}")
+
+# =====================================================
+# 📥 BID INGESTION
+# =====================================================
+st.subheader("📥 Bid Ingestion")
+
+ingest_stats = get_bid_ingestor().stats()
+i1, i2, i3, i4 = st.columns(4)
+i1.metric("Queue Depth", f"{ingest_stats['queue_depth']} / {ingest_stats['max_queue']}")
+i2.metric("Bids Written", ingest_stats["written"], f"{ingest_stats['failed']} failed", delta_color="off")
+i3.metric("Avg Batch", f"{ingest_stats['avg_batch_size']:.1f}", f"max {ingest_stats['max_batch_size']}", delta_color="off")
+i4.metric("Avg Commit", f"{ingest_stats['flush_ms_avg']:.1f} ms", f"max {ingest_stats['flush_ms_max']:.1f} ms", delta_color="off")
+
+# =====================================================
+# 🔖 QUERY CACHE
+# =====================================================
+st.subheader("🔖 Query Cache")
+
+cache_rows = [
+    {"Function": name.rsplit(".", 1)[-1], "Module": name.rsplit(".", 1)[0], "Hits": s["hits"],
+     "Misses": s["misses"], "Hit Rate": f"{s['hit_rate']:.0%}", "Cached Results": s["entries"]}
+    for name, s in cache_overview().items()
+]
+if cache_rows:
+    st.dataframe(cache_rows, use_container_width=True, hide_index=True)
+st.caption("Results stay cached until a table they read changes (per-table counters bumped by triggers).")
+
+# =====================================================
+# 🚦 RATE LIMITS
+# =====================================================
+st.subheader("🚦 Rate Limits")
+
+limiter = get_rate_limiter()
+rate_cols = st.columns(len(limiter.limits))
+for col, (op, counts) in zip(rate_cols, limiter.stats().items()):
+    col.metric(f"{op} rejected", counts["rejected"], f"{counts['allowed']} allowed", delta_color="off")
+st.caption(f"Counters for this process • store: {type(limiter).__name__}")
+
+# =====================================================
+# ⏳ AUCTIONS
+# =====================================================
+st.subheader("⏳ Auctions")
+
+auction_stats = get_auction_scheduler().stats()
+t1, t2, t3 = st.columns(3)
+t1.metric("Open Lots", auction_stats["open_lots"])
+t2.metric("Closed on Time", auction_stats["closed"], f"{auction_stats['close_batches']} batches", delta_color="off")
+t3.metric("Late Bids Refused", auction_stats["rejected"])
+st.caption(f"Next lot closes at {auction_stats['next_close'] or '—'} • counters for this process")
+
+# =====================================================
+# 🧊 ARCHIVE
+# =====================================================
+st.subheader("🧊 Archive")
+
+archiver = get_archiver()
+archive_counts = archive_overview()
+a1, a2, a3 = st.columns(3)
+a1.metric("Hot Lots", archive_counts["hot_lots"], f"{archive_counts['hot_bids']} bids", delta_color="off")
+a2.metric("Archived Lots", archive_counts.get("archived_lots", "—"),
+          f"{archive_counts.get('archived_bids', 0)} bids", delta_color="off")
+a3.metric("Last Run Moved", archiver.last_moved)
+if archiver.last_error:
+    st.error(f"❌ Last archive run failed: {archiver.last_error}")
+if st.button("🧊 Archive Settled Lots Now"):
+    st.success(f"✅ {archive_now()} lots moved to the archive")
+st.caption(f"Lots closed more than {archiver.days} days ago move to the archive "
+           f"every {archiver.interval:g} s (0 = only on demand)")
+
+# =====================================================
+# 🧾 SETTLEMENT
+# =====================================================
+st.subheader("🧾 Settlement")
+
+if st.button("🧾 Settle Closed Lots"):
+    run = settle_now()
+    if run["lots"]:
+        st.success(f"✅ {run['lots']} lots invoiced to {run['buyers']} buyers — ₹{run['total']:,.2f}")
+    else:
+        st.info("Nothing to settle: every closed lot is already invoiced.")
+
+invoices = recent_settlements()
+if invoices:
+    st.dataframe(
+        [
+            {"Run": run_at, "Buyer": bidder, "Lots": lots, "Kg": kg, "Gross": f"₹{gross:,.2f}",
+             "Discount": f"₹{discount:,.2f}", "Fee": f"₹{fee:,.2f}", "Total": f"₹{total:,.2f}"}
+            for run_at, bidder, lots, kg, gross, discount, fee, total in invoices
+        ],
+        use_container_width=True,
+    )
+st.caption("Fees use each item's billing rate (default 5%); the discount comes from the `discount_pct` setting. "
+           "Nightly: `python fruitbid/settlement.py`")
+
+# =====================================================
+# 🎁 LUCKY DIP
+# =====================================================
+st.subheader("🎁 Lucky Dip")
+
+with st.form("lucky_dip_form"):
+    d1, d2 = st.columns(2)
+    dip_seed = d1.text_input("Seed (blank = random, reuse one to replay a draw)")
+    dip_since = d2.text_input("Only bids since (YYYY-MM-DD, blank = all live bids)")
+    if st.form_submit_button("🎁 Draw Winners"):
+        try:
+            draw = run_lucky_dip(int(dip_seed) if dip_seed.strip() else None, dip_since.strip() or None)
+        except ValueError:
+            st.error("❌ The seed must be a whole number.")
+        else:
+            st.success(f"✅ {len(draw['winners'])} winners from {draw['entries']} bids "
+                       f"(seed {draw['seed']}, draw {draw['draw_ms']:.1f} ms)")
+
+dip_rows = lucky_dip_results()
+if dip_rows:
+    st.dataframe(
+        [
+            {"Item": item, "Winner": name or phone, "Bid": f"₹{amount}", "Entries": entries,
+             "Pool": f"₹{pool_amount}", "Seed": str(seed) if seed is not None else "—", "Drawn": drawn_at}
+            for item, name, phone, amount, entries, pool_amount, seed, drawn_at in dip_rows
+        ],
+        use_container_width=True,
+    )
+st.caption("Each item's winner is one of its bids, picked with odds proportional to the bid amount.")
+
 # =====================================================
 # 🧾 RAW DB INSPECTION (Optional)
 # =====================================================
@@ -97,23 +284,80 @@ with st.expander("🧾 Inspect Table Contents"):
     selected_table = st.selectbox("Select a table to view its records:", TABLES)
     if st.button("View Table"):
         try:
-            with closing(get_db_connection()) as conn:
-                if conn:
-                    with closing(conn.cursor()) as c:
-                        c.execute(f"PRAGMA table_info({selected_table})")
-                        columns = [col[1] for col in c.fetchall()]
-                        c.execute(f"SELECT * FROM {selected_table} LIMIT 20")
-                        rows = c.fetchall()
-                        if rows:
-                            st.dataframe(
-                                [dict(zip(columns, row)) for row in rows],
-                                use_container_width=True,
-                            )
-                        else:
-                            st.info("No records found in this table.")
+            with db_connection() as conn:
+                with closing(conn.cursor()) as c:
+                    c.execute(f"PRAGMA table_info({selected_table})")
+                    columns = [col[1] for col in c.fetchall()]
+                    c.execute(f"SELECT * FROM {selected_table} LIMIT 20")
+                    rows = c.fetchall()
+                    if rows:
+                        st.dataframe(
+                            [dict(zip(columns, row)) for row in rows],
+                            use_container_width=True,
+                        )
+                    else:
+                        st.info("No records found in this table.")
         except Exception as e:
             st.error(f"❌ Failed to read table `{selected_table}`:\n\n{e}")
 
+# =====================================================
+# 📤 EXPORT
+# =====================================================
+# Browser downloads go through Streamlit, which holds the file in memory;
+# larger exports stream from the API server instead.
+DOWNLOAD_MAX_BYTES = 200 * 1024 * 1024
+API_URL = os.getenv("FRUITBID_API_URL", f"http://localhost:{os.getenv('FRUITBID_API_PORT', '8600')}")
+
+with st.expander("📤 Export Data"):
+    with st.form("export_form"):
+        export_table = st.selectbox("Table", list(EXPORT_TABLES))
+        export_format = st.radio("Format", list(EXPORT_FORMATS), horizontal=True)
+        use_range = st.checkbox("Only a date range (bids, lots, lot summaries)")
+        range_col1, range_col2 = st.columns(2)
+        export_start = range_col1.date_input("From")
+        export_end = range_col2.date_input("To")
+        prepare = st.form_submit_button("📦 Prepare Export")
+
+    if prepare:
+        previous = st.session_state.pop("admin_export", None)
+        if previous and os.path.exists(previous["path"]):
+            os.remove(previous["path"])
+        start, end = (export_start, export_end) if use_range else (None, None)
+        with st.spinner(f"Exporting {export_table}..."):
+            try:
+                path, rows = export_to_tempfile(export_table, export_format, start, end)
+            except Exception as e:
+                st.error(f"❌ Export failed:\n\n{e}")
+            else:
+                st.session_state.admin_export = {
+                    "path": path, "rows": rows, "table": export_table, "format": export_format,
+                    "query": {"format": export_format, **({"start": start, "end": end} if use_range else {})},
+                }
+
+    export = st.session_state.get("admin_export")
+    if export and os.path.exists(export["path"]):
+        size = os.path.getsize(export["path"])
+        st.write(f"**{export['table']}.{export['format']}** — {export['rows']:,} rows, {size / 1e6:.1f} MB")
+        if size <= DOWNLOAD_MAX_BYTES:
+            with open(export["path"], "rb") as f:
+                st.download_button(
+                    "⬇️ Download",
+                    f,
+                    file_name=f"{export['table']}.{export['format']}",
+                    mime=EXPORT_FORMATS[export["format"]],
+                )
+        else:
+            st.info("This export is too large for a browser download here; use the API command below.")
+        query = urlencode(export["query"])
+        st.caption("Streamed from the API server (needs the same ADMIN_SESSION_SECRET in both processes):")
+        st.code(
+            f'curl -H "Authorization: Bearer $FRUITBID_ADMIN_TOKEN" -o {export["table"]}.{export["format"]} \\\n'
+            f'  "{API_URL}/api/export/{export["table"]}?{query}"',
+            language="bash",
+        )
+        if st.checkbox("🔑 Show my admin token for API calls"):
+            st.code(st.session_state.get("admin_token", ""), language=None)
+
 # =====================================================
 # 🧩 FOOTER
 # =====================================================
@@ -0,0 +1,255 @@
+# =====================================================
+# 🔌 pool.py — Shared SQLite Connection Pool (WAL mode)
+# =====================================================
+# One place that opens SQLite connections for the whole app.
+#
+#   * WAL journal mode, so readers never block the writer (and vice versa)
+#   * busy_timeout / synchronous / mmap_size set from environment variables
+#   * pooled connections for `with connection() as conn:` call sites
+#   * per-thread connections for legacy code that keeps a connection around
+#   * pool-wait metrics via `stats()`
+#
+# This module only depends on the standard library so that both the
+# Streamlit app (`fruitbid/`) and the root-level modules can import it.
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+# =====================================================
+# ⚙️ CONFIGURATION
+# =====================================================
+def _default_db_path():
+    if os.environ.get("STREAMLIT_RUNTIME") == "true":
+        # Streamlit Cloud environment
+        return os.path.join("/app", "fruitbid.db")
+    # Local environment: the database shipped at the repository root
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fruitbid.db")
+
+
+class PoolConfig:
+    """Connection settings, read from FRUITBID_* environment variables."""
+
+    def __init__(
+        self,
+        path=None,
+        size=8,
+        wait_timeout=10.0,
+        busy_timeout_ms=5000,
+        synchronous="NORMAL",
+        mmap_size=256 * 1024 * 1024,
+        journal_mode="WAL",
+    ):
+        self.path = path or _default_db_path()
+        self.size = int(size)
+        self.wait_timeout = float(wait_timeout)
+        self.busy_timeout_ms = int(busy_timeout_ms)
+        self.synchronous = str(synchronous).upper()
+        self.mmap_size = int(mmap_size)
+        self.journal_mode = str(journal_mode).upper()
+
+    @classmethod
+    def from_env(cls, **overrides):
+        env = os.environ.get
+        settings = {
+            "path": env("FRUITBID_DB_PATH"),
+            "size": env("FRUITBID_POOL_SIZE", 8),
+            "wait_timeout": env("FRUITBID_POOL_WAIT_TIMEOUT", 10.0),
+            "busy_timeout_ms": env("FRUITBID_BUSY_TIMEOUT_MS", 5000),
+            "synchronous": env("FRUITBID_SYNCHRONOUS", "NORMAL"),
+            "mmap_size": env("FRUITBID_MMAP_SIZE", 256 * 1024 * 1024),
+            "journal_mode": env("FRUITBID_JOURNAL_MODE", "WAL"),
+        }
+        settings.update(overrides)
+        return cls(**settings)
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection frees up within `wait_timeout`."""
+
+
+# =====================================================
+# 🏊 CONNECTION POOL
+# =====================================================
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections sharing one database file."""
+
+    def __init__(self, config: PoolConfig = None):
+        self.config = config or PoolConfig.from_env()
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._created = 0
+        self._in_use = 0
+        self._connect_hooks = []
+        self._metrics = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "timeouts": 0,
+            "thread_connections": 0,
+        }
+
+    # ---------------- connection setup ----------------
+    def add_connect_hook(self, hook):
+        """Run `hook(conn)` on every connection this pool opens from now on."""
+        self._connect_hooks.append(hook)
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a new, fully configured connection (not tracked by the pool)."""
+        cfg = self.config
+        conn = sqlite3.connect(
+            cfg.path,
+            timeout=cfg.busy_timeout_ms / 1000,
+            check_same_thread=False,
+        )
+        conn.execute(f"PRAGMA journal_mode = {cfg.journal_mode}")
+        conn.execute(f"PRAGMA busy_timeout = {cfg.busy_timeout_ms}")
+        conn.execute(f"PRAGMA synchronous = {cfg.synchronous}")
+        conn.execute(f"PRAGMA mmap_size = {cfg.mmap_size}")
+        conn.execute("PRAGMA foreign_keys = ON")
+        for hook in self._connect_hooks:
+            hook(conn)
+        return conn
+
+    # ---------------- pooled checkout ----------------
+    def _acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+
+        waited = 0.0
+        if conn is None:
+            with self._lock:
+                create = self._created < self.config.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    conn = self.connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                start = time.perf_counter()
+                try:
+                    conn = self._idle.get(timeout=self.config.wait_timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._metrics["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No database connection free after {self.config.wait_timeout}s"
+                    )
+                waited = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self._in_use += 1
+            m = self._metrics
+            m["checkouts"] += 1
+            if waited:
+                m["waits"] += 1
+                m["wait_ms_total"] += waited
+                m["wait_ms_max"] = max(m["wait_ms_max"], waited)
+        return conn
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; uncommitted work is rolled back on return."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a connection and commit on success / roll back on error."""
+        with self.connection() as conn:
+            with conn:
+                yield conn
+
+    # ---------------- per-thread connections ----------------
+    def thread_connection(self) -> sqlite3.Connection:
+        """A connection owned by the calling thread, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self.connect()
+            with self._lock:
+                self._metrics["thread_connections"] += 1
+        return conn
+
+    # ---------------- metrics / shutdown ----------------
+    def stats(self) -> dict:
+        """Snapshot of pool usage and wait metrics."""
+        with self._lock:
+            m = dict(self._metrics)
+            m.update(
+                size=self.config.size,
+                created=self._created,
+                in_use=self._in_use,
+                idle=self._idle.qsize(),
+            )
+        m["wait_ms_avg"] = m["wait_ms_total"] / m["waits"] if m["waits"] else 0.0
+        return m
+
+    def close_all(self):
+        """Close every idle pooled connection."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+# =====================================================
+# 🌐 PROCESS-WIDE POOL
+# =====================================================
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """The process-wide pool, created on first use from the environment."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def configure_pool(**overrides) -> ConnectionPool:
+    """Replace the process-wide pool (e.g. to point at another database file)."""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, ConnectionPool(PoolConfig.from_env(**overrides))
+    if old is not None:
+        old.close_all()
+    return _pool
+
+
+def connection():
+    """Shortcut for `get_pool().connection()`."""
+    return get_pool().connection()
+
+
+def transaction():
+    """Shortcut for `get_pool().transaction()`."""
+    return get_pool().transaction()
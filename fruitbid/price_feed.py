@@ -0,0 +1,323 @@
+# =====================================================
+# 💹 price_feed.py — Market Price Feed (pooled, batched, SWR)
+# =====================================================
+# Market prices come from an HTTP price API:
+#
+#   GET {FRUITBID_PRICE_API_URL}/prices?items=Apple,Banana
+#   -> {"prices": {"Apple": 200.0, "Banana": 40.0}}
+#
+# * one requests.Session with a keep-alive connection pool, shared by all
+#   sessions in the process
+# * many items per request, batches fetched concurrently on a thread pool
+# * stale-while-revalidate: an expired price is served immediately and
+#   refreshed in the background, so a cache expiry never blocks a user
+# * a circuit breaker stops calling a failing API; callers then get the
+#   last known price, and only then the built-in catalogue price
+# * prices are also written to the shared cache (shared_cache.py): other
+#   app processes adopt them instead of calling the API, and only the
+#   process holding the refresh lease revalidates stale prices
+#
+# Without FRUITBID_PRICE_API_URL the catalogue below is the price source.
+# `mock_price_server.py` serves the same protocol for local testing.
+
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from shared_cache import get_shared_cache
+except ModuleNotFoundError:
+    from fruitbid.shared_cache import get_shared_cache
+
+MARKET_PRICES = {
+    "Apple": 200, "Mosambi": 50, "Banana": 40, "Papaya": 50, "Kiwi": 200,
+    "Dragon Fruit": 250, "Pineapple": 60, "Custard Apple": 100, "Sapota": 60,
+    "Mango": 120, "Spinach": 30, "Honey": 300,
+}
+DEFAULT_PRICE = 100.0
+REFRESH_LEASE = "lease:price-refresh"
+
+
+def catalogue_price(item) -> float:
+    """Built-in fallback price for `item`."""
+    return float(MARKET_PRICES.get(item, DEFAULT_PRICE))
+
+
+# =====================================================
+# 🔌 CIRCUIT BREAKER
+# =====================================================
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures; after
+    `reset_timeout` seconds one trial call is let through (half-open).
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+# =====================================================
+# 💹 PRICE FEED
+# =====================================================
+class PriceFeed:
+    """Cached, batched access to the market price API."""
+
+    def __init__(
+        self,
+        base_url=os.getenv("FRUITBID_PRICE_API_URL"),
+        api_key=os.getenv("PRICE_API_KEY"),
+        ttl=float(os.getenv("FRUITBID_PRICE_TTL", 60)),
+        stale_ttl=float(os.getenv("FRUITBID_PRICE_STALE_TTL", 900)),
+        timeout=float(os.getenv("FRUITBID_PRICE_TIMEOUT", 5)),
+        batch_size=50,
+        max_workers=4,
+        breaker=None,
+        shared=None,
+    ):
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.breaker = breaker or CircuitBreaker()
+        self.shared = shared
+        self._next_lease_try = 0.0
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max_workers,
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504), allowed_methods=["GET"]),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if api_key:
+            self.session.headers["API-KEY"] = api_key
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="price-feed")
+        self._cache = {}  # item -> (price, fetched_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._metrics = {
+            "requests": 0, "failures": 0, "hits": 0, "stale_hits": 0, "misses": 0, "fallbacks": 0, "shared_hits": 0,
+        }
+
+    # ---------------- public API ----------------
+    def get_price(self, item) -> float:
+        return self.get_prices([item])[item]
+
+    def get_prices(self, items) -> dict:
+        """Prices for every item in `items`, in one round of API calls at most."""
+        items = list(dict.fromkeys(items))
+        if not self.base_url:
+            return {item: catalogue_price(item) for item in items}
+
+        if self.shared is not None:
+            self._adopt_shared(items)
+
+        now = time.time()
+        prices, stale, missing = {}, [], []
+        with self._lock:
+            for item in items:
+                entry = self._cache.get(item)
+                age = now - entry[1] if entry else None
+                if entry and age < self.ttl:
+                    prices[item] = entry[0] if entry[0] is not None else catalogue_price(item)
+                    self._metrics["hits"] += 1
+                elif entry and age < self.stale_ttl:
+                    prices[item] = entry[0] if entry[0] is not None else catalogue_price(item)
+                    stale.append(item)
+                    self._metrics["stale_hits"] += 1
+                else:
+                    missing.append(item)
+                    self._metrics["misses"] += 1
+
+        if stale and self._may_refresh():
+            self._refresh_in_background(stale)
+        if missing:
+            prices.update(self._fetch_now(missing))
+        return prices
+
+    def stats(self) -> dict:
+        with self._lock:
+            m = dict(self._metrics)
+            m["cached_items"] = len(self._cache)
+            m["refreshing"] = len(self._refreshing)
+        m["circuit"] = self.breaker.state
+        return m
+
+    # ---------------- shared cache ----------------
+    def _adopt_shared(self, items):
+        """Take newer prices fetched by other processes from the shared cache."""
+        now = time.time()
+        with self._lock:
+            wanted = [i for i in items if i not in self._cache or now - self._cache[i][1] >= self.ttl]
+        if not wanted:
+            return
+        try:
+            entries = self.shared.get_many(f"price:{item}" for item in wanted)
+        except sqlite3.Error:
+            return  # the shared cache is an optimisation only
+        with self._lock:
+            for item in wanted:
+                entry = entries.get(f"price:{item}")
+                if entry and entry[1] > 0 and entry[2] > self._cache.get(item, (None, 0))[1]:
+                    self._cache[item] = (entry[0], entry[2])
+                    self._metrics["shared_hits"] += 1
+
+    def _may_refresh(self) -> bool:
+        """Whether this process revalidates stale prices (holds the refresh lease)."""
+        if self.shared is None:
+            return True
+        if time.monotonic() < self._next_lease_try:
+            return False
+        try:
+            if self.shared.try_lease(REFRESH_LEASE, seconds=self.timeout * 3):
+                return True
+        except sqlite3.Error:
+            return True
+        self._next_lease_try = time.monotonic() + 1.0
+        return False
+
+    def _publish(self, entries, fetched_at):
+        if self.shared is None:
+            return
+        try:
+            self.shared.set_many({f"price:{item}": price for item, price in entries.items()}, fetched_at)
+        except sqlite3.Error:
+            pass
+
+    # ---------------- fetching ----------------
+    def _batches(self, items):
+        return [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+
+    def _fetch_now(self, items):
+        """Blocking fetch for items with no usable cached price."""
+        futures = [self._executor.submit(self._fetch_batch, batch) for batch in self._batches(items)]
+        wait(futures, timeout=self.timeout * 2)
+        fetched = {}
+        for future in futures:
+            if future.done() and not future.exception():
+                fetched.update(future.result())
+        return {item: fetched[item] if item in fetched else self._fallback(item) for item in items}
+
+    def _refresh_in_background(self, items):
+        with self._lock:
+            items = [item for item in items if item not in self._refreshing]
+            self._refreshing.update(items)
+        for batch in self._batches(items):
+            self._executor.submit(self._refresh_batch, batch)
+
+    def _refresh_batch(self, items):
+        try:
+            self._fetch_batch(items)
+        except Exception:
+            pass  # the stale price stays until the next attempt
+        finally:
+            with self._lock:
+                self._refreshing.difference_update(items)
+
+    def _fetch_batch(self, items) -> dict:
+        """One API call for up to `batch_size` items; caches the result."""
+        if not self.breaker.allow():
+            return {}
+        with self._lock:
+            self._metrics["requests"] += 1
+        try:
+            response = self.session.get(
+                f"{self.base_url}/prices", params={"items": ",".join(items)}, timeout=self.timeout
+            )
+            response.raise_for_status()
+            prices = {
+                item: float(price)
+                for item, price in response.json().get("prices", {}).items()
+                if item in items and price is not None
+            }
+        except (requests.RequestException, ValueError, AttributeError):
+            self.breaker.record_failure()
+            with self._lock:
+                self._metrics["failures"] += 1
+            raise
+        self.breaker.record_success()
+
+        now = time.time()
+        with self._lock:
+            for item in items:
+                if item in prices:
+                    self._cache[item] = (prices[item], now)
+                else:
+                    # Not quoted by the API: keep any last known price (None
+                    # = catalogue) without asking again until it expires
+                    self._cache[item] = (self._cache.get(item, (None,))[0], now)
+            fetched = {item: self._cache[item][0] for item in items}
+        self._publish(fetched, now)
+        return prices
+
+    def _fallback(self, item) -> float:
+        """Last known price, however old, else the catalogue price."""
+        with self._lock:
+            self._metrics["fallbacks"] += 1
+            entry = self._cache.get(item)
+        return entry[0] if entry and entry[0] is not None else catalogue_price(item)
+
+
+# =====================================================
+# 🌐 PROCESS-WIDE FEED
+# =====================================================
+_feed = None
+_feed_lock = threading.Lock()
+
+
+def get_price_feed() -> PriceFeed:
+    """The process-wide price feed, created on first use."""
+    global _feed
+    if _feed is None:
+        with _feed_lock:
+            if _feed is None:
+                feed = PriceFeed()
+                if feed.base_url:
+                    feed.shared = get_shared_cache()
+                _feed = feed
+    return _feed
@@ -0,0 +1,189 @@
+# =====================================================
+# 🤖 proxy_bids.py — Proxy (Auto-Bid) Resolution
+# =====================================================
+# A buyer can leave a private maximum on a lot instead of a single amount;
+# the app then bids for them, one increment above the best competing
+# offer, up to that maximum.
+#
+# Maxima live in `proxy_bids` (migration 10), indexed by
+# (lot_id, max_amount DESC, placed_at), so the two strongest proxies on a
+# lot are one O(log n) index probe away. The bid writer (bid_ingest.py)
+# calls `resolve_proxies()` inside every batch transaction, after the
+# batch's bids and new maxima are stored, so each process and each bid
+# resolves against the same state. Resolution is one step:
+#
+#   rival = max(second-highest proxy, current high bid if not the leader's)
+#   price = min(leader max, rival + increment)
+#
+# and at most one bid (the leader's, at `price`) is written per lot, instead
+# of replaying ₹1 raises between the proxies.
+#
+# Proxies belong to a buyer, not a display name: `bidder` is the phone,
+# else the user id (migration 15), and the leader is compared on that same
+# key of the lot's high bid — every "Guest" is a different buyer.
+#
+#   FRUITBID_BID_INCREMENT   (₹, default 1)
+
+import os
+import time
+
+try:
+    from auctions import LotClosed
+except ModuleNotFoundError:
+    from fruitbid.auctions import LotClosed
+
+BID_INCREMENT = float(os.getenv("FRUITBID_BID_INCREMENT", 1.0))
+
+# The buyer a bid or proxy row belongs to; see proxy_key()
+PROXY_KEY_SQL = "COALESCE(NULLIF({t}.user_phone, ''), CAST({t}.user_id AS TEXT))"
+
+# A maximum can only be raised; raising it moves the buyer behind earlier
+# proxies with the same maximum
+UPSERT_PROXY_SQL = """
+    INSERT INTO proxy_bids (lot_id, bidder, user_id, user_name, user_phone, max_amount, placed_at)
+    VALUES (:lot_id, :bidder, :user_id, :user_name, :user_phone, :max_amount, :placed_at)
+    ON CONFLICT (lot_id, bidder) DO UPDATE SET
+        max_amount = excluded.max_amount,
+        placed_at = excluded.placed_at
+    WHERE excluded.max_amount > proxy_bids.max_amount
+"""
+
+TOP_PROXIES_SQL = """
+    SELECT bidder, user_id, user_name, user_phone, max_amount
+    FROM proxy_bids
+    WHERE lot_id = ?
+    ORDER BY max_amount DESC, placed_at
+    LIMIT 2
+"""
+
+# The high bid's buyer comes from the bid row: lot_summary.high_bidder is
+# the display label (name first), which many buyers can share
+LOT_STATE_SQL = f"""
+    SELECT l.base_price, l.item_name, s.high_bid, {PROXY_KEY_SQL.format(t="h")}
+    FROM lots l
+    LEFT JOIN lot_summary s ON s.lot_id = l.id
+    LEFT JOIN bids h ON h.id = s.high_bid_id
+    WHERE l.id = ? AND l.status = 'open' AND (l.closes_at IS NULL OR l.closes_at > ?)
+"""
+
+HIGH_BID_SQL = f"""
+    SELECT s.high_bid, {PROXY_KEY_SQL.format(t="h")}
+    FROM lot_summary s
+    LEFT JOIN bids h ON h.id = s.high_bid_id
+    WHERE s.lot_id = ?
+"""
+
+MY_PROXIES_SQL = f"""
+    SELECT p.lot_id, l.item_name, p.max_amount, {PROXY_KEY_SQL.format(t="h")} IS p.bidder
+    FROM proxy_bids p
+    JOIN lots l ON l.id = p.lot_id
+    LEFT JOIN lot_summary s ON s.lot_id = p.lot_id
+    LEFT JOIN bids h ON h.id = s.high_bid_id
+    WHERE p.bidder IN ({{marks}})
+    ORDER BY p.placed_at DESC
+"""
+
+INSERT_AUTO_BID_SQL = """
+    INSERT INTO bids (lot_id, item_name, user_id, user_name, user_phone, bid_amount, timestamp)
+    VALUES (:lot_id, :item_name, :user_id, :user_name, :user_phone, :bid_amount, :timestamp)
+"""
+
+
+def proxy_key(user_phone=None, user_id=None):
+    """Same key as PROXY_KEY_SQL: phone, then user id; None for an anonymous buyer."""
+    return user_phone or (str(user_id) if user_id is not None else None)
+
+
+def proxy_price(leader_max, rival, base_price, increment=BID_INCREMENT):
+    """Visible price the leading proxy bids: one increment over `rival`, capped at its maximum."""
+    if rival is None:
+        return min(leader_max, base_price)
+    return min(leader_max, rival + increment)
+
+
+def store_proxy(conn, proxy):
+    """Save a proxy instruction (see BidIngestor.submit) and fill in its buyer key."""
+    proxy["bidder"] = proxy_key(proxy["user_phone"], proxy["user_id"])
+    if proxy["bidder"] is None:
+        raise ValueError("An auto-bid needs a phone number or user id")
+    if conn.execute(LOT_STATE_SQL, (proxy["lot_id"], proxy["timestamp"])).fetchone() is None:
+        raise LotClosed(proxy["lot_id"])
+    conn.execute(UPSERT_PROXY_SQL, {**proxy, "placed_at": time.time()})
+
+
+def resolve_lot(conn, lot_id, timestamp, increment=BID_INCREMENT):
+    """
+    Bring `lot_id` to the state its proxies imply; returns the bid written
+    (a dict shaped like an ingested bid) or None when nothing changes.
+    """
+    proxies = conn.execute(TOP_PROXIES_SQL, (lot_id,)).fetchall()
+    if not proxies:
+        return None
+    state = conn.execute(LOT_STATE_SQL, (lot_id, timestamp)).fetchone()
+    if state is None:
+        return None  # closed (or past its deadline): no more bids, automatic or not
+    base_price, item_name, high_bid, high_key = state
+    leader, user_id, user_name, user_phone, leader_max = proxies[0]
+
+    rivals = [max_amount for *_, max_amount in proxies[1:]]
+    if high_bid is not None and high_key != leader:
+        rivals.append(high_bid)
+    rival = max(rivals) if rivals else None
+    price = proxy_price(leader_max, rival, base_price, increment)
+
+    if high_key == leader and high_bid is not None and high_bid >= price:
+        return None  # already leading at (or above) the price it would bid
+    if high_bid is not None and high_key != leader and price <= high_bid:
+        return None  # out-bid: a bid that only ties the high does not take the lead
+    bid = {
+        "lot_id": lot_id,
+        "item_name": item_name,
+        "user_id": user_id,
+        "user_name": user_name,
+        "user_phone": user_phone,
+        "bid_amount": price,
+        "timestamp": timestamp,
+        "max_amount": None,
+        "auto": True,
+    }
+    bid["id"] = conn.execute(INSERT_AUTO_BID_SQL, bid).lastrowid
+    return bid
+
+
+def resolve_proxies(conn, bids):
+    """
+    Bid writer hook: store the proxy instructions in `bids`, then resolve
+    every lot the batch touched. Returns the auto-bids written.
+    """
+    lot_ids = []
+    for bid in bids:
+        if bid["lot_id"] is not None and bid["lot_id"] not in lot_ids:
+            lot_ids.append(bid["lot_id"])
+        if bid.get("max_amount") is not None:
+            store_proxy(conn, bid)
+
+    written = []
+    for lot_id in lot_ids:
+        timestamp = max(b["timestamp"] for b in bids if b["lot_id"] == lot_id)
+        auto = resolve_lot(conn, lot_id, timestamp)
+        if auto:
+            written.append(auto)
+
+    # Tell each proxy where it stands after the batch
+    for bid in bids:
+        if bid.get("max_amount") is not None:
+            high_bid, high_key = conn.execute(HIGH_BID_SQL, (bid["lot_id"],)).fetchone() or (None, None)
+            bid["max_amount"] = conn.execute(
+                "SELECT max_amount FROM proxy_bids WHERE lot_id = ? AND bidder = ?", (bid["lot_id"], bid["bidder"])
+            ).fetchone()[0]
+            bid["high_bid"] = high_bid
+            bid["leading"] = high_key == bid["bidder"]
+    return written
+
+
+def get_proxies(conn, *bidders):
+    """A buyer's maxima by key (phone, user id), newest first: (lot_id, item_name, max_amount, leading)."""
+    bidders = [b for b in bidders if b]
+    if not bidders:
+        return []
+    return conn.execute(MY_PROXIES_SQL.format(marks=",".join("?" * len(bidders))), bidders).fetchall()
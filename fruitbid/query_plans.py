@@ -0,0 +1,236 @@
+# =====================================================
+# 🔍 query_plans.py — Query-Plan Regression Check
+# =====================================================
+# Runs EXPLAIN QUERY PLAN over every query the app issues against `bids`,
+# `otps`, `proxy_bids`, `lots` and the trigger-kept tables (`lot_summary`,
+# `user_stats`, `user_lots`) and fails if any of them falls back to a full
+# scan (or to an open-ended range search, which walks the same rows).
+#
+#   python fruitbid/query_plans.py            # fresh in-memory schema
+#   python fruitbid/query_plans.py --db PATH  # a real database (uses its stats)
+#
+# A real database is opened read-only and never migrated: its plans are
+# only meaningful at the current schema version, so an older file fails.
+#
+# When you add or change a query on one of the watched tables, register
+# it in `app_queries()` below.
+
+import argparse
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+from archive import COPY_SQL, DELETE_SQL, attach_archive
+from auctions import CLOSE_DUE_SQL
+from bid_feed import TAIL_SQL
+from bid_ingest import INSERT_BID_SQL
+from lot_summary import AGGREGATE_SQL, ALL_LOTS
+from lucky_dip import AMOUNTS_SQL, GROUPS_SQL, PICK_SQL
+from marketplace import MARKETPLACE_SQL
+from migrations import LATEST_VERSION, migrate, schema_version
+from order_book import OrderBook
+from otp_store import CONSUME_SQL, LOOKUP_SQL, SWEEP_SQL
+from proxy_bids import HIGH_BID_SQL, LOT_STATE_SQL, MY_PROXIES_SQL, TOP_PROXIES_SQL
+
+# Tables that must never be scanned in full.
+WATCHED_TABLES = ("bids", "otps", "proxy_bids", "lots", "lot_summary", "user_stats", "user_lots")
+
+# Jobs that read a whole range by design; an open-ended range search is
+# expected there (a SCAN still fails)
+RANGE_READS = {
+    "order book: load by lot",  # startup load of every lot's book
+    "lucky dip: entries per item",  # the draw weighs every live bid
+    "lucky dip: amounts",
+    "otp: sweep expired",  # the expired rows are the work, LIMIT bounds it
+    "scheduler: close due lots",  # the due lots are the work
+    "marketplace: next page",  # keyset page, LIMIT bounds it
+    "bid feed: tail",  # the new bids are the work, LIMIT bounds it
+}
+
+# Newest-first pages stopped by LIMIT: a SCAN in rowid order reads one page
+# (open-ended ranges are allowed too, as in RANGE_READS)
+PAGED_SCANS = {"marketplace: first page"}
+
+
+# =====================================================
+# 📋 QUERY REGISTRY
+# =====================================================
+def app_queries(conn):
+    """(name, sql, params) for every query the app runs on a watched table."""
+    lot_book = OrderBook("lot_id")
+    return [
+        # marketplace.py
+        ("marketplace: first page", MARKETPLACE_SQL.format(where=""), {"limit": 20, "top_k": 3}),
+        ("marketplace: next page", MARKETPLACE_SQL.format(where="WHERE id < :before_id"),
+         {"limit": 20, "top_k": 3, "before_id": 100}),
+        # order_book.py (api_server.py)
+        ("order book: load by lot", lot_book.top_bids_sql(conn), (10,)),
+        ("order book: check lots", lot_book.top_bids_sql(conn, "AND lot_id IN (?,?)"), (1, 2, 10)),
+        # lot_summary.py — recovery paths, per lot
+        ("lot summary: rebuild lots", AGGREGATE_SQL.format(where="lot_id IN (?, ?) AND " + ALL_LOTS), (1, 2)),
+        # db.py (root) — get_highest_bid
+        ("root db: highest bid by item", """
+            SELECT MAX(s.high_bid)
+            FROM lots l
+            JOIN lot_summary s ON s.lot_id = l.id
+            WHERE l.item_name = ?
+        """, ("Apples",)),
+        # app_web.py — My Bids (hot + archive)
+        ("app_web: my bids", """
+            SELECT lots.item_name, bids.bid_amount, bids.timestamp
+            FROM all_bids bids
+            JOIN all_lots lots ON bids.lot_id = lots.id
+            WHERE bids.user_name = ?
+            ORDER BY bids.timestamp DESC
+        """, ("Guest",)),
+        # api_server.py — GET /api/users/<name>/bids
+        ("api: user bids", """
+            SELECT bids.id, bids.lot_id, lots.item_name, bids.bid_amount, bids.timestamp
+            FROM all_bids bids
+            JOIN all_lots lots ON bids.lot_id = lots.id
+            WHERE bids.user_name = ?
+            ORDER BY bids.timestamp DESC
+            LIMIT ?
+        """, ("Guest", 200)),
+        # pages/3_💼_My_Bids.py
+        ("my bids page: user bids", """
+            SELECT item_name, bid_amount, timestamp
+            FROM all_bids WHERE user_phone = ? ORDER BY id DESC
+        """, ("9999999999",)),
+        # archive.py — moving a batch
+        ("archive: copy bids", COPY_SQL[1], {"ids": "[1, 2]"}),
+        ("archive: delete bids", DELETE_SQL[0], {"ids": "[1, 2]"}),
+        # lucky_dip.py — the draw reads every item's bids off one index
+        ("lucky dip: entries per item", GROUPS_SQL, ("",)),
+        ("lucky dip: amounts", AMOUNTS_SQL, ("",)),
+        ("lucky dip: winning bid", PICK_SQL, ("", "Apples", 10)),
+        # proxy_bids.py — resolution in the bid writer, My Bids page
+        ("proxy: top two maxima", TOP_PROXIES_SQL, (1,)),
+        ("proxy: my maxima", MY_PROXIES_SQL.format(marks="?"), ("9999999999",)),
+        ("proxy: lot state", LOT_STATE_SQL, (1, "2026-01-01 00:00:00")),
+        ("proxy: high bid buyer", HIGH_BID_SQL, (1,)),
+        # bid_ingest.py — every bid checks its lot is still open
+        ("bid writer: insert bid", INSERT_BID_SQL, {
+            "lot_id": 1, "item_name": "Apples", "user_id": None, "user_name": "Guest",
+            "user_phone": None, "bid_amount": 10, "timestamp": "2026-01-01 00:00:00",
+        }),
+        # bid_feed.py — live ticker
+        ("bid feed: tail", TAIL_SQL, (100, 50)),
+        # auctions.py — scheduler
+        ("scheduler: close due lots", CLOSE_DUE_SQL, ("2026-01-01 00:00:00",)),
+        # migrations.py — lookups inside the lot_summary / user_stats triggers,
+        # which EXPLAIN on the triggering statement does not show
+        ("trigger: lot summary by lot", "UPDATE lot_summary SET bid_count = bid_count - 1 WHERE lot_id = ?", (1,)),
+        ("trigger: lot summary high bid", "SELECT high_bidder, high_bid FROM lot_summary WHERE lot_id = ?", (1,)),
+        ("trigger: lot summary first bid", "SELECT MIN(timestamp) FROM bids WHERE lot_id = ?", (1,)),
+        ("trigger: user lots membership",
+         "SELECT 1 FROM user_lots WHERE bidder = ? AND lot_id = ? AND bid_count = 1", ("Guest", 1)),
+        ("trigger: user stats by bidder", "UPDATE user_stats SET bid_count = bid_count + 1 WHERE bidder = ?",
+         ("Guest",)),
+        ("trigger: user stats of lot bidders", """
+            UPDATE user_stats SET active_lots = active_lots - 1
+            WHERE bidder IN (SELECT bidder FROM user_lots WHERE lot_id = ?)
+        """, (1,)),
+        ("trigger: lot is open", "SELECT 1 FROM lots WHERE id = ? AND status = 'open'", (1,)),
+        # otp_store.py — SQLite mode
+        ("otp: lookup code", LOOKUP_SQL, ("+919999999999",)),
+        ("otp: consume code", CONSUME_SQL, ("+919999999999", "123456")),
+        ("otp: sweep expired", SWEEP_SQL, (0, 500)),
+    ]
+
+
+# =====================================================
+# 🧪 PLAN CHECK
+# =====================================================
+def _watched_names(sql):
+    """Names the watched tables go by in `sql`, aliases included."""
+    names = set(WATCHED_TABLES)
+    pattern = r"\b(?:FROM|JOIN)\s+(%s)\s+(?:AS\s+)?(\w+)" % "|".join(WATCHED_TABLES)
+    for table, alias in re.findall(pattern, sql, flags=re.IGNORECASE):
+        if alias.upper() not in {"WHERE", "JOIN", "ON", "ORDER", "GROUP", "LIMIT", "LEFT", "INNER", "USING"}:
+            names.add(alias)
+    return names
+
+
+def explain(conn, sql, params=()):
+    """EXPLAIN QUERY PLAN detail lines for `sql`."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def _open_ended(constraints):
+    """True for index constraints like `(item_name>?)`: one bound, no equality prefix."""
+    terms = constraints.split(" AND ")
+    if any(re.search(r"(?<![<>!])=", term) for term in terms):
+        return False
+    return not (any(">" in term for term in terms) and any("<" in term for term in terms))
+
+
+def table_scans(sql, plan, ranges_ok=False, scans_ok=False):
+    """
+    Plan lines that walk a whole watched table. A SCAN through a covering
+    index still visits every row, so only SEARCH steps pass, and only when
+    bounded: a SEARCH on `(col>?)` alone walks the rest of the index.
+    """
+    names = _watched_names(sql)
+    scans = []
+    for line in plan:
+        match = re.match(r"SCAN (?:\w+\.)?(\w+)", line)
+        if match and match.group(1) in names and not scans_ok:
+            scans.append(line)
+            continue
+        match = re.match(r"SEARCH (?:\w+\.)?(\w+) USING .*\((.*)\)", line)
+        if match and match.group(1) in names and not ranges_ok and _open_ended(match.group(2)):
+            scans.append(line)
+    return scans
+
+
+def check_query_plans(conn):
+    """Return [(name, plan, scans)] for every registered query that scans."""
+    failures = []
+    for name, sql, params in app_queries(conn):
+        plan = explain(conn, sql, params)
+        scans = table_scans(sql, plan, ranges_ok=name in RANGE_READS | PAGED_SCANS,
+                            scans_ok=name in PAGED_SCANS)
+        if scans:
+            failures.append((name, plan, scans))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if an app query scans a hot table.")
+    parser.add_argument("--db", help="database to check (default: fresh in-memory schema)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        try:
+            conn = sqlite3.connect(f"{Path(args.db).resolve().as_uri()}?mode=ro", uri=True)
+            version = schema_version(conn)
+        except sqlite3.Error as e:
+            print(f"❌ cannot open {args.db} read-only: {e}")
+            return 1
+        if version < LATEST_VERSION:
+            print(f"❌ {args.db} is at schema version {version}, expected {LATEST_VERSION}; migrate it first")
+            return 1
+    else:
+        conn = sqlite3.connect(":memory:")
+        migrate(conn)
+    attach_archive(conn, ":memory:")
+
+    if args.verbose:
+        for name, sql, params in app_queries(conn):
+            print(f"• {name}")
+            for line in explain(conn, sql, params):
+                print(f"    {line}")
+
+    failures = check_query_plans(conn)
+    for name, plan, scans in failures:
+        print(f"❌ {name}: {'; '.join(scans)}")
+    if not failures:
+        print(f"✅ {len(app_queries(conn))} queries checked, no table scans on {', '.join(WATCHED_TABLES)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+# =====================================================
+# 🚦 rate_limit.py — Per-Key Token Buckets
+# =====================================================
+# Every operation (sending an OTP, checking one, placing a bid) has its
+# own bucket per key (a phone number, email or user name). A bucket holds
+# up to `burst` tokens and refills at `rate` tokens per second; a call
+# that finds it empty is rejected with the seconds until the next token.
+#
+# * memory (default) — buckets in an LRU dict, private to this process;
+#   least recently used keys are evicted, which simply refills them
+# * shared — buckets in the shared cache file (shared_cache.py), so every
+#   app process on the host enforces one limit
+#
+#   FRUITBID_RATE_LIMIT_STORE=memory|shared
+#   FRUITBID_RATE_LIMITS="bid=2:10,otp_send=0.02:3"   # op=rate:burst
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    from shared_cache import default_cache_path
+except ModuleNotFoundError:
+    from fruitbid.shared_cache import default_cache_path
+
+# op -> (tokens per second, burst)
+DEFAULT_LIMITS = {
+    "otp_send": (1 / 60, 3),  # three codes, then one a minute
+    "otp_verify": (1 / 10, 5),  # five guesses, then one every 10 s
+    "bid": (2.0, 10),
+}
+MAX_KEYS = 100_000
+
+
+class RateLimited(Exception):
+    """Raised when `key` has no tokens left for `op`."""
+
+    def __init__(self, op, key, retry_after):
+        self.op = op
+        self.key = key
+        self.retry_after = retry_after
+        super().__init__(f"Too many requests; try again in {max(1, round(retry_after))} s")
+
+
+def parse_limits(spec):
+    """'bid=2:10,otp_send=0.02:3' -> {op: (rate, burst)}."""
+    limits = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        op, _, value = part.partition("=")
+        rate, _, burst = value.partition(":")
+        limits[op.strip()] = (float(rate), float(burst or 1))
+    return limits
+
+
+class _Limiter:
+    """Shared bookkeeping: limits and allowed/rejected counters per op."""
+
+    def __init__(self, limits=None):
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits if limits is not None else parse_limits(os.getenv("FRUITBID_RATE_LIMITS")))
+        self._counts = {}  # (op, outcome) -> n
+        self._counts_lock = threading.Lock()
+
+    def acquire(self, op, key, cost=1) -> float:
+        """Take `cost` tokens; returns 0 when allowed, else seconds to wait."""
+        if op not in self.limits or key is None:
+            return 0.0
+        rate, burst = self.limits[op]
+        wait = self._take(op, str(key), rate, burst, cost)
+        with self._counts_lock:
+            outcome = (op, "rejected" if wait else "allowed")
+            self._counts[outcome] = self._counts.get(outcome, 0) + 1
+        return wait
+
+    def check(self, op, key, cost=1):
+        """Like acquire(), but raises RateLimited instead of returning a wait."""
+        wait = self.acquire(op, key, cost)
+        if wait:
+            raise RateLimited(op, key, wait)
+
+    def stats(self) -> dict:
+        """{op: {"allowed": n, "rejected": n}} since start."""
+        with self._counts_lock:
+            counts = dict(self._counts)
+        return {
+            op: {"allowed": counts.get((op, "allowed"), 0), "rejected": counts.get((op, "rejected"), 0)}
+            for op in self.limits
+        }
+
+
+# =====================================================
+# 🧠 IN-MEMORY BUCKETS
+# =====================================================
+class MemoryRateLimiter(_Limiter):
+    def __init__(self, limits=None, max_keys=MAX_KEYS):
+        super().__init__(limits)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # (op, key) -> [tokens, updated_at]
+        self._lock = threading.Lock()
+
+    def _take(self, op, key, rate, burst, cost):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get((op, key))
+            if bucket is None:
+                bucket = self._buckets[(op, key)] = [burst, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end((op, key))
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return 0.0
+            return (cost - bucket[0]) / rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# =====================================================
+# 💾 SHARED BUCKETS
+# =====================================================
+BUCKETS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rate_buckets (
+        op TEXT NOT NULL,
+        key TEXT NOT NULL,
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (op, key)
+    ) WITHOUT ROWID
+"""
+
+# Refill and take in one statement; no row comes back when the bucket is short
+TAKE_SQL = """
+    INSERT INTO rate_buckets (op, key, tokens, updated_at) VALUES (:op, :key, :burst - :cost, :now)
+    ON CONFLICT (op, key) DO UPDATE SET
+        tokens = MIN(:burst, tokens + (:now - updated_at) * :rate) - :cost,
+        updated_at = :now
+    WHERE MIN(:burst, tokens + (:now - updated_at) * :rate) >= :cost
+    RETURNING tokens
+"""
+
+
+class SharedRateLimiter(_Limiter):
+    """Buckets in the shared cache file, enforced across processes."""
+
+    def __init__(self, limits=None, path=None):
+        super().__init__(limits)
+        self.path = path or default_cache_path()
+        self._local = threading.local()
+        self._writes = 0
+        with self._conn() as conn:
+            conn.execute(BUCKETS_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")
+            self._local.conn = conn
+        return conn
+
+    def _take(self, op, key, rate, burst, cost):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            row = conn.execute(
+                TAKE_SQL, {"op": op, "key": key, "rate": rate, "burst": burst, "cost": cost, "now": now}
+            ).fetchone()
+            if row is None:
+                tokens, updated_at = conn.execute(
+                    "SELECT tokens, updated_at FROM rate_buckets WHERE op = ? AND key = ?", (op, key)
+                ).fetchone()
+                return (cost - min(burst, tokens + (now - updated_at) * rate)) / rate
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self._evict(now)
+        return 0.0
+
+    def _evict(self, now):
+        """Drop buckets that have refilled completely; they behave like new ones."""
+        conn = self._conn()
+        with conn:
+            for op, (rate, burst) in self.limits.items():
+                conn.execute(
+                    "DELETE FROM rate_buckets WHERE op = ? AND updated_at < ?", (op, now - burst / rate)
+                )
+
+
+# =====================================================
+# 🌐 PROCESS-WIDE LIMITER
+# =====================================================
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """The configured limiter (FRUITBID_RATE_LIMIT_STORE=memory|shared)."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                shared = os.getenv("FRUITBID_RATE_LIMIT_STORE", "memory") == "shared"
+                _limiter = SharedRateLimiter() if shared else MemoryRateLimiter()
+    return _limiter
+
+
+def check_rate(op, key, cost=1):
+    """Raise RateLimited when `key` is over its limit for `op`."""
+    get_rate_limiter().check(op, key, cost)
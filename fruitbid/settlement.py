@@ -0,0 +1,166 @@
+# =====================================================
+# 🧾 settlement.py — End-of-Day Settlement & Invoicing
+# =====================================================
+# Bills every closed lot that has a winner and no invoice yet, in one pass:
+#
+#   gross     = winning bid (₹/kg) × kg            (kg as in user_stats.spent)
+#   discount  = gross × discount_pct setting / 100 (default 20, as monitor_prices)
+#   fee       = (gross − discount) × items.billing_rate (default 0.05)
+#   total     = gross − discount + fee
+#
+# Billing rates and the discount are read once per run, not per item. The
+# lots are streamed in chunks from one query; each chunk is priced with
+# column arithmetic and folded into per-buyer totals. One transaction then
+# writes an invoice per buyer (`settlements`) and a line per lot
+# (`settlement_lots`, keyed by lot_id, so no lot is billed twice — a
+# concurrent run fails and rolls back instead).
+#
+#   python fruitbid/settlement.py --until "2025-06-01 23:59:59" --dry-run
+
+import argparse
+import json
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    from pool import get_pool
+    from user_stats import KG_SQL
+except ModuleNotFoundError:
+    from fruitbid.pool import get_pool
+    from fruitbid.user_stats import KG_SQL
+
+DEFAULT_BILLING_RATE = 0.05
+DEFAULT_DISCOUNT_PCT = 20.0
+DISCOUNT_KEY = "discount_pct"
+SETTLE_CHUNK = 5_000  # lots per chunk
+
+# Closed, won and not yet invoiced; idx_lots_closed_at bounds the range
+UNSETTLED_SQL = f"""
+    SELECT l.id AS lot_id, l.item_name, l.winner_name AS bidder,
+           l.winning_bid AS price, {KG_SQL.format(t="l")} AS kg
+    FROM lots l
+    WHERE l.closed_at <= ? AND l.status = 'closed' AND l.winner_name IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM settlement_lots s WHERE s.lot_id = l.id)
+"""
+
+INSERT_SETTLEMENT_SQL = """
+    INSERT INTO settlements (run_at, bidder, lots, kg, gross, discount, fee, total)
+    VALUES (:run_at, :bidder, :lots, :kg, :gross, :discount, :fee, :total)
+    RETURNING id
+"""
+
+INSERT_LINE_SQL = """
+    INSERT INTO settlement_lots
+        (lot_id, settlement_id, item_name, kg, price, gross, discount, fee_rate, fee, total)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+LINE_COLUMNS = ["lot_id", "item_name", "kg", "price", "gross", "discount", "fee_rate", "fee", "total"]
+MONEY_COLUMNS = ["gross", "discount", "fee", "total"]
+
+
+def load_rates(conn):
+    """(billing rate per item name, discount %), one query each."""
+    rates = dict(conn.execute("SELECT name, billing_rate FROM items WHERE billing_rate IS NOT NULL"))
+    row = conn.execute("SELECT value FROM settings WHERE key = ?", (DISCOUNT_KEY,)).fetchone()
+    try:
+        discount_pct = float(row[0]) if row else DEFAULT_DISCOUNT_PCT
+    except (TypeError, ValueError):
+        discount_pct = DEFAULT_DISCOUNT_PCT
+    return pd.Series(rates, dtype="float64"), discount_pct
+
+
+def price_lines(chunk, rates, discount_pct):
+    """Add fee_rate, gross, discount, fee and total to a chunk of won lots (₹, rounded to paise)."""
+    chunk = chunk.assign(kg=chunk["kg"].fillna(0.0))
+    chunk["fee_rate"] = chunk["item_name"].map(rates).fillna(DEFAULT_BILLING_RATE)
+    chunk["gross"] = (chunk["price"] * chunk["kg"]).round(2)
+    chunk["discount"] = (chunk["gross"] * discount_pct / 100).round(2)
+    chunk["fee"] = ((chunk["gross"] - chunk["discount"]) * chunk["fee_rate"]).round(2)
+    chunk["total"] = chunk["gross"] - chunk["discount"] + chunk["fee"]
+    return chunk
+
+
+def compute_settlement(conn, until, chunksize=SETTLE_CHUNK):
+    """Stream the unsettled lots closed by `until`; returns (lines, per-buyer totals) DataFrames."""
+    rates, discount_pct = load_rates(conn)
+    lines, partials = [], []
+    for chunk in pd.read_sql_query(UNSETTLED_SQL, conn, params=(until,), chunksize=chunksize):
+        if chunk.empty:
+            continue  # nothing to bill (pandas yields one untyped empty chunk)
+        chunk = price_lines(chunk, rates, discount_pct)
+        lines.append(chunk)
+        partials.append(
+            chunk.groupby("bidder").agg(
+                lots=("lot_id", "size"), kg=("kg", "sum"),
+                gross=("gross", "sum"), discount=("discount", "sum"), fee=("fee", "sum"), total=("total", "sum"),
+            )
+        )
+    if not lines:
+        return pd.DataFrame(columns=["bidder", *LINE_COLUMNS]), pd.DataFrame()
+    totals = pd.concat(partials).groupby(level=0).sum()
+    totals[MONEY_COLUMNS] = totals[MONEY_COLUMNS].round(2)
+    return pd.concat(lines, ignore_index=True), totals
+
+
+def write_settlement(conn, lines, totals, run_at):
+    """Insert the invoices and their lines in one transaction; returns {bidder: settlement id}."""
+    ids = {}
+    with conn:
+        for bidder, row in totals.iterrows():
+            ids[bidder] = conn.execute(
+                INSERT_SETTLEMENT_SQL,
+                {"run_at": run_at, "bidder": bidder, "lots": int(row["lots"]), "kg": float(row["kg"]),
+                 **{c: float(row[c]) for c in MONEY_COLUMNS}},
+            ).fetchone()[0]
+        rows = lines.assign(settlement_id=lines["bidder"].map(ids))[
+            ["lot_id", "settlement_id", *LINE_COLUMNS[1:]]
+        ]
+        conn.executemany(INSERT_LINE_SQL, rows.itertuples(index=False, name=None))
+    return ids
+
+
+def settle(until=None, dry_run=False, pool=None, chunksize=SETTLE_CHUNK) -> dict:
+    """
+    Invoice every closed lot won by `until` (default: now) and not billed
+    yet. Returns lot/buyer counts, the grand total and the per-buyer rows.
+    """
+    run_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    until = until or run_at
+    with (pool or get_pool()).connection() as conn:
+        lines, totals = compute_settlement(conn, until, chunksize)
+        if not dry_run and len(lines):
+            write_settlement(conn, lines, totals, run_at)
+    return {
+        "run_at": run_at,
+        "lots": len(lines),
+        "buyers": len(totals),
+        "total": round(float(totals["total"].sum()), 2) if len(totals) else 0.0,
+        "invoices": totals.reset_index().to_dict("records") if len(totals) else [],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Invoice the buyers of every closed, unbilled lot.")
+    parser.add_argument("--until", help="only lots closed at or before this time (default: now)")
+    parser.add_argument("--chunk", type=int, default=SETTLE_CHUNK, help="lots read per chunk")
+    parser.add_argument("--dry-run", action="store_true", help="compute the invoices without saving them")
+    parser.add_argument("--json", action="store_true", help="print the invoices as JSON")
+    args = parser.parse_args(argv)
+
+    result = settle(args.until, args.dry_run, chunksize=args.chunk)
+    if args.json:
+        print(json.dumps(result, indent=2, default=float))
+        return 0
+    for inv in result["invoices"]:
+        print(f"🧾 {inv['bidder']}: {inv['lots']} lots, {inv['kg']:g} kg — gross ₹{inv['gross']:,.2f}, "
+              f"discount ₹{inv['discount']:,.2f}, fee ₹{inv['fee']:,.2f}, total ₹{inv['total']:,.2f}")
+    print(f"✅ {result['lots']} lots invoiced to {result['buyers']} buyers, ₹{result['total']:,.2f}"
+          + (" — dry run, nothing saved" if args.dry_run else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+# =====================================================
+# 🗃️ shared_cache.py — Cross-Process Cache (SQLite side file)
+# =====================================================
+# st.cache_data lives inside one Streamlit process. With several processes
+# behind a load balancer each one would call the price API and reload the
+# catalogue on its own schedule. This cache keeps versioned entries in a
+# small WAL-mode SQLite file next to the app database, memory-mapped by
+# every process:
+#
+# * one process refreshes an entry under a short lease, the others keep
+#   serving the previous version until the new one lands
+# * each process keeps the decoded value of the version it last read;
+#   when `PRAGMA data_version` shows no other process wrote since, a read
+#   does not touch the file at all
+#
+# Entries are JSON, so only plain data (prices, name lists) belongs here.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+try:
+    from pool import get_pool
+except ModuleNotFoundError:
+    from fruitbid.pool import get_pool
+
+CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        fetched_at REAL NOT NULL,
+        lease_owner TEXT,
+        lease_until REAL NOT NULL DEFAULT 0
+    )
+"""
+
+
+def default_cache_path():
+    """FRUITBID_SHARED_CACHE_PATH, else fruitbid_cache.db beside the app database."""
+    db_dir = os.path.dirname(os.path.abspath(get_pool().config.path))
+    return os.getenv("FRUITBID_SHARED_CACHE_PATH", os.path.join(db_dir, "fruitbid_cache.db"))
+
+
+class SharedCache:
+    """Versioned key/value entries shared by every process on the host."""
+
+    def __init__(self, path=None, mmap_size=64 * 1024 * 1024, lease_seconds=15.0):
+        self.path = path or default_cache_path()
+        self.mmap_size = mmap_size
+        self.lease_seconds = lease_seconds
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._memo = {}  # key -> (version, fetched_at, value)
+        self._lock = threading.Lock()
+        self._metrics = {"memo_hits": 0, "reads": 0, "writes": 0, "leases": 0, "lease_denied": 0}
+        with self._conn() as conn:
+            conn.execute(CACHE_SCHEMA)
+
+    # ---------------- connections ----------------
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")  # a lost entry is simply refetched
+            conn.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+            self._local.conn = conn
+        return conn
+
+    def _verified(self, conn):
+        """
+        Keys this thread has read since the last write by another
+        connection; their memoized values are still current.
+        """
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != getattr(self._local, "data_version", None):
+            self._local.data_version = data_version
+            self._local.verified = set()
+        return self._local.verified
+
+    # ---------------- reads ----------------
+    def get_many(self, keys):
+        """{key: (value, version, fetched_at)} for the keys present."""
+        keys = list(keys)
+        conn = self._conn()
+        verified = self._verified(conn)
+        result, unknown = {}, []
+        with self._lock:
+            for key in keys:
+                memo = self._memo.get(key)
+                if memo and key in verified:
+                    result[key] = (memo[2], memo[0], memo[1])
+                else:
+                    unknown.append(key)
+            self._metrics["memo_hits"] += len(result)
+        if not unknown:
+            return result
+
+        marks = ",".join("?" * len(unknown))
+        rows = conn.execute(
+            f"SELECT key, value, version, fetched_at FROM cache_entries WHERE key IN ({marks})", unknown
+        ).fetchall()
+        with self._lock:
+            self._metrics["reads"] += len(unknown)
+            for key, raw, version, fetched_at in rows:
+                memo = self._memo.get(key)
+                if memo and memo[0] == version:
+                    value = memo[2]  # same version: reuse the decoded object
+                else:
+                    value = json.loads(raw)
+                    self._memo[key] = (version, fetched_at, value)
+                verified.add(key)
+                result[key] = (value, version, fetched_at)
+        return result
+
+    def get(self, key):
+        """(value, version, fetched_at) or None."""
+        return self.get_many([key]).get(key)
+
+    # ---------------- writes ----------------
+    def set_many(self, entries, fetched_at=None):
+        """Store {key: value}; every write bumps the entry's version."""
+        fetched_at = fetched_at or time.time()
+        conn = self._conn()
+        versions = {}
+        with conn:
+            for key, value in entries.items():
+                versions[key] = conn.execute(
+                    """
+                    INSERT INTO cache_entries (key, value, version, fetched_at) VALUES (?, ?, 1, ?)
+                    ON CONFLICT (key) DO UPDATE SET
+                        value = excluded.value,
+                        version = version + 1,
+                        fetched_at = excluded.fetched_at
+                    RETURNING version
+                    """,
+                    (key, json.dumps(value), fetched_at),
+                ).fetchone()[0]
+        # Our own commits do not move this connection's data_version
+        verified = self._verified(conn)
+        with self._lock:
+            self._metrics["writes"] += len(entries)
+            for key, version in versions.items():
+                self._memo[key] = (version, fetched_at, entries[key])
+                verified.add(key)
+
+    def set(self, key, value, fetched_at=None):
+        self.set_many({key: value}, fetched_at)
+
+    def delete(self, key):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        with self._lock:
+            self._memo.pop(key, None)
+
+    # ---------------- refresh leases ----------------
+    def try_lease(self, key, seconds=None) -> bool:
+        """Claim the right to refresh `key` for `seconds`; False if another process holds it."""
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO cache_entries (key, value, version, fetched_at) VALUES (?, 'null', 0, 0)",
+                (key,),
+            )
+            cur = conn.execute(
+                """
+                UPDATE cache_entries SET lease_owner = ?, lease_until = ?
+                WHERE key = ? AND (lease_until < ? OR lease_owner = ?)
+                """,
+                (self.owner, now + (seconds or self.lease_seconds), key, now, self.owner),
+            )
+        won = cur.rowcount == 1
+        with self._lock:
+            self._metrics["leases" if won else "lease_denied"] += 1
+        return won
+
+    def release(self, key):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE cache_entries SET lease_until = 0 WHERE key = ? AND lease_owner = ?", (key, self.owner)
+            )
+
+    def get_or_load(self, key, loader, ttl, wait=None):
+        """
+        Fresh value of `key`, loading it with `loader()` when it expired.
+        Only the lease holder loads; other processes return the previous
+        version, or wait up to `wait` seconds for a first one to appear.
+        """
+        entry = self.get(key)
+        if entry and entry[1] > 0 and time.time() - entry[2] < ttl:
+            return entry[0]
+        if self.try_lease(key):
+            try:
+                value = loader()
+                self.set(key, value)
+                return value
+            finally:
+                self.release(key)
+        if entry and entry[1] > 0:
+            return entry[0]
+        deadline = time.monotonic() + (self.lease_seconds if wait is None else wait)
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = self.get(key)
+            if entry and entry[1] > 0:
+                return entry[0]
+        return loader()
+
+    def stats(self) -> dict:
+        with self._lock:
+            m = dict(self._metrics)
+            m["memo_entries"] = len(self._memo)
+        m["path"] = self.path
+        return m
+
+
+# =====================================================
+# 🌐 PROCESS-WIDE CACHE
+# =====================================================
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> SharedCache:
+    """The process-wide shared cache, opened on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SharedCache()
+    return _cache
@@ -0,0 +1,131 @@
+# =====================================================
+# 👤 user_stats.py — Incremental Per-User Bid Counters
+# =====================================================
+# `user_stats` holds one row per bidder: bids placed, open lots bid on,
+# lots won, kilos won and amount spent. `user_lots` records which lots a
+# bidder is in. Triggers on `bids` and on lots closing (migration 6) keep
+# both current, so the dashboard reads a single row per user.
+#
+#   python fruitbid/user_stats.py            # report drifted bidders
+#   python fruitbid/user_stats.py --rebuild  # recompute from bids/lots
+
+import argparse
+import sqlite3
+import sys
+
+try:
+    from archive import archive_path, attach_archive, install_archive
+    from lot_summary import BIDDER_SQL
+except ModuleNotFoundError:
+    from fruitbid.archive import archive_path, attach_archive, install_archive
+    from fruitbid.lot_summary import BIDDER_SQL
+
+STATS_COLUMNS = ("bidder", "bid_count", "active_lots", "lots_won", "kg_won", "spent")
+
+# Lot quantities are free text ("100 kg"); CAST keeps the leading number
+KG_SQL = "CAST({t}.quantity AS REAL)"
+
+# {bids}/{lots} are the hot tables, or the all_bids/all_lots views when
+# the archive is attached (archive.py): counters cover archived lots too.
+_USER_LOTS_SQL = f"""
+    SELECT {BIDDER_SQL.format(t="b")} AS bidder, b.lot_id, COUNT(*) AS bid_count
+    FROM {{bids}} b
+    WHERE b.lot_id IN (SELECT id FROM {{lots}}) AND {BIDDER_SQL.format(t="b")} IS NOT NULL
+    GROUP BY 1, 2
+"""
+
+_USER_STATS_SQL = f"""
+    SELECT bidder, SUM(bid_count) AS bid_count, SUM(active_lots) AS active_lots,
+           SUM(lots_won) AS lots_won, SUM(kg_won) AS kg_won, SUM(spent) AS spent
+    FROM (
+        SELECT ul.bidder, ul.bid_count, (l.status = 'open') AS active_lots,
+               0 AS lots_won, 0 AS kg_won, 0 AS spent
+        FROM ({_USER_LOTS_SQL}) ul
+        JOIN {{lots}} l ON l.id = ul.lot_id
+        UNION ALL
+        SELECT l.winner_name, 0, 0, 1, {KG_SQL.format(t="l")}, l.winning_bid * {KG_SQL.format(t="l")}
+        FROM {{lots}} l
+        WHERE l.status = 'closed' AND l.winner_name IS NOT NULL
+    )
+    GROUP BY bidder
+"""
+
+USER_LOTS_SQL = _USER_LOTS_SQL.format(bids="bids", lots="lots")
+USER_STATS_SQL = _USER_STATS_SQL.format(bids="bids", lots="lots")
+
+
+def user_stats_sql(conn):
+    """USER_STATS_SQL over the hot tables, or over hot + archive when attached."""
+    if conn.execute("SELECT 1 FROM temp.sqlite_master WHERE type = 'view' AND name = 'all_bids'").fetchone():
+        return _USER_STATS_SQL.format(bids="all_bids", lots="all_lots")
+    return USER_STATS_SQL
+
+
+def rebuild_user_stats(conn) -> int:
+    """Recompute `user_lots` (hot lots) and `user_stats` (all lots) from bids/lots; returns bidders written."""
+    conn.execute("DELETE FROM user_lots")
+    conn.execute(f"INSERT INTO user_lots (bidder, lot_id, bid_count) {USER_LOTS_SQL}")
+    conn.execute("DELETE FROM user_stats")
+    cur = conn.execute(f"INSERT INTO user_stats ({', '.join(STATS_COLUMNS)}) {user_stats_sql(conn)}")
+    return cur.rowcount
+
+
+def check_user_stats(conn):
+    """Bidders whose counters differ from a fresh aggregate."""
+    columns = ", ".join(f"ROUND({c}, 4)" if c in ("kg_won", "spent") else c for c in STATS_COLUMNS)
+    stored = f"SELECT {columns} FROM user_stats WHERE bid_count > 0 OR lots_won > 0"
+    fresh = f"SELECT {columns} FROM ({user_stats_sql(conn)})"
+    rows = conn.execute(f"""
+        SELECT bidder FROM ({stored} EXCEPT {fresh})
+        UNION
+        SELECT bidder FROM ({fresh} EXCEPT {stored})
+    """).fetchall()
+    return sorted(row[0] for row in rows)
+
+
+def get_user_stats(conn, *bidders):
+    """Combined counters for the given bidder labels (e.g. name and phone)."""
+    bidders = [b for b in bidders if b]
+    if not bidders:
+        return dict.fromkeys(STATS_COLUMNS[1:], 0)
+    row = conn.execute(
+        f"""
+        SELECT COALESCE(SUM(bid_count), 0), COALESCE(SUM(active_lots), 0), COALESCE(SUM(lots_won), 0),
+               COALESCE(SUM(kg_won), 0), COALESCE(SUM(spent), 0)
+        FROM user_stats WHERE bidder IN ({','.join('?' * len(bidders))})
+        """,
+        bidders,
+    ).fetchone()
+    return dict(zip(STATS_COLUMNS[1:], row))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check or rebuild the user_stats counters.")
+    parser.add_argument("--db", help="database path (default: the app database)")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every bidder from bids/lots")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        # lifetime counters include archived lots: read them through the views
+        conn = sqlite3.connect(args.db)
+        attach_archive(conn, archive_path(args.db))
+    else:
+        conn = install_archive().connect()
+    try:
+        if args.rebuild:
+            with conn:
+                written = rebuild_user_stats(conn)
+            print(f"✅ user_stats rebuilt: {written} bidders")
+            return 0
+        drifted = check_user_stats(conn)
+        if drifted:
+            print(f"❌ {len(drifted)} bidders drifted: {drifted[:20]}{' …' if len(drifted) > 20 else ''}")
+            return 1
+        print("✅ user_stats matches bids and lots")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
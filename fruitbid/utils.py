@@ -2,12 +2,10 @@
 # ⚙️ utils/common.py — Common Utilities for FruitBid
 # =====================================================
 
-import streamlit as st
 import re
-import os
-import bcrypt
-import requests
-from db_utils import get_setting  # ✅ assuming you renamed db.py → db_utils.py
+import admin_auth
+from db import get_setting
+from price_feed import get_price_feed
 
 
 # =====================================================
@@ -29,65 +27,31 @@ def validate_email(val: str) -> bool:
 def check_admin_password(password: str) -> bool:
     """
     ✅ Compare entered admin password with the stored hash.
-    Note: Hash should be stored in environment or DB, not re-generated each time.
+    The hash is loaded (or derived) once per process and checked off the
+    script thread — see admin_auth.py.
     """
-    stored_hash = os.getenv("ADMIN_PASSWORD_HASH")
-
-    # If no pre-stored hash exists, create one temporarily (development fallback)
-    if not stored_hash:
-        temp_hash = bcrypt.hashpw("admin123".encode(), bcrypt.gensalt())
-        os.environ["ADMIN_PASSWORD_HASH"] = temp_hash.decode()
-        stored_hash = temp_hash.decode()
-
-    try:
-        return bcrypt.checkpw(password.encode(), stored_hash.encode())
-    except Exception:
-        return False
+    return admin_auth.check_admin_password(password)
 
 
 # =====================================================
-# 💰 PRICE FETCHING (MOCKED REAL-TIME)
+# 💰 PRICE FETCHING (shared feed — see price_feed.py)
 # =====================================================
 def fetch_real_time_price(item: str) -> float:
     """
     ✅ Fetch real-time market price.
-    Replace with actual API integration later.
+    Served from the process-wide price feed: pooled HTTP, stale-while-
+    revalidate cache, and last-known / catalogue fallback.
     """
-    try:
-        # Example placeholder for API request
-        # response = requests.get(f"https://api.example.com/price?item={item}", timeout=5)
-        # if response.status_code == 200:
-        #     return float(response.json().get("price", 100))
-
-        # Fallback mock data
-        MARKET_PRICES = {
-            "Apple": 200,
-            "Mosambi": 50,
-            "Banana": 40,
-            "Papaya": 50,
-            "Kiwi": 200,
-            "Dragon Fruit": 250,
-            "Pineapple": 60,
-            "Custard Apple": 100,
-            "Sapota": 60,
-            "Mango": 120,
-            "Spinach": 30,
-            "Honey": 300,
-        }
-        return float(MARKET_PRICES.get(item, 100))
-    except Exception as e:
-        st.warning(f"⚠️ Price API error: {e}. Using fallback ₹100.")
-        return 100.0
+    return get_price_feed().get_price(item)
 
 
 # =====================================================
 # 🧮 PRICE MONITOR (WITH DISCOUNT)
 # =====================================================
-@st.cache_data(ttl=60)
 def monitor_prices(item: str) -> float:
     """
     ✅ Calculate item price after applying discount.
-    Cached for 1 minute (60s) for performance.
+    The price feed caches prices, so no per-item st.cache_data is needed.
     """
     market_price = fetch_real_time_price(item)
     try:
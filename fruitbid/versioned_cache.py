@@ -0,0 +1,153 @@
+# =====================================================
+# 🔖 versioned_cache.py — Change-Versioned Query Cache
+# =====================================================
+# Caches query results until the tables they read actually change, instead
+# of for a fixed TTL:
+#
+# * triggers (migration 13) bump a counter in `table_versions` on every
+#   insert, update and delete of a versioned table, in the writer's own
+#   transaction
+# * a result is stored with the counters of the tables it was read from
+#   and served while they are unchanged, so a new lot shows on the next
+#   rerun and an unchanged catalogue is never re-queried
+# * `PRAGMA data_version` on a connection that never writes moves whenever
+#   any connection, in any process, commits; while it stands still the
+#   counters are not even read
+#
+#   @cached("items")
+#   def load_catalogue(): ...
+#
+# Cached values are shared by every session in the process; callers must
+# not modify them.
+
+import functools
+import sqlite3
+import threading
+from collections import OrderedDict
+
+try:
+    from migrations import VERSIONED_TABLES
+    from pool import get_pool
+except ModuleNotFoundError:
+    from fruitbid.migrations import VERSIONED_TABLES
+    from fruitbid.pool import get_pool
+
+CACHE_MAXSIZE = 128  # results kept per function
+
+VERSIONS_SQL = "SELECT name, version FROM table_versions"
+
+
+class VersionedCache:
+    """Per-function result caches validated against the table counters."""
+
+    def __init__(self, pool=None):
+        self.pool = pool  # None: the process-wide pool, looked up on first use
+        self._conn = None  # read-only: its data_version sees every commit
+        self._data_version = None
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._functions = {}  # qualified name -> {"entries": OrderedDict, "hits": n, "misses": n}
+
+    # ---------------- versions ----------------
+    def versions(self) -> dict:
+        """{table: change counter}, re-read only after some connection committed."""
+        with self._lock:
+            try:
+                if self._conn is None:
+                    self._conn = (self.pool or get_pool()).connect()
+                data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+                if data_version != self._data_version:
+                    self._versions = dict(self._conn.execute(VERSIONS_SQL).fetchall())
+                    self._data_version = data_version
+            except sqlite3.Error:
+                # e.g. not migrated yet: nothing can be trusted, so nothing is served
+                self._data_version = None
+                return {}
+            return self._versions
+
+    # ---------------- decorator ----------------
+    def cached(self, *tables, maxsize=CACHE_MAXSIZE):
+        """Cache a function's results per arguments until one of `tables` changes."""
+        unknown = [t for t in tables if t not in VERSIONED_TABLES]
+        if not tables or unknown:
+            raise ValueError(f"Cannot version on {unknown or 'no tables'}; versioned: {', '.join(VERSIONED_TABLES)}")
+
+        def decorate(fn):
+            name = f"{fn.__module__}.{fn.__qualname__}"
+            state = self._functions.setdefault(name, {"entries": OrderedDict(), "hits": 0, "misses": 0})
+            entries = state["entries"]
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                key = (args, tuple(sorted(kwargs.items())))
+                current = self.versions()
+                stamp = tuple(current.get(t) for t in tables) if current else None
+                with self._lock:
+                    entry = entries.get(key)
+                    if stamp is not None and entry is not None and entry[0] == stamp:
+                        entries.move_to_end(key)
+                        state["hits"] += 1
+                        return entry[1]
+                    state["misses"] += 1
+                value = fn(*args, **kwargs)
+                if stamp is not None:
+                    with self._lock:
+                        # stamped before loading: a write during the load leaves
+                        # a stale stamp, so the next call reloads
+                        entries[key] = (stamp, value)
+                        entries.move_to_end(key)
+                        while len(entries) > maxsize:
+                            entries.popitem(last=False)
+                return value
+
+            wrapper.cache_clear = lambda: self.clear(name)
+            return wrapper
+
+        return decorate
+
+    def clear(self, name=None):
+        """Drop the cached results of one function (by qualified name), or of all."""
+        with self._lock:
+            for fn_name, state in self._functions.items():
+                if name is None or fn_name == name:
+                    state["entries"].clear()
+
+    def stats(self) -> dict:
+        """{function: {hits, misses, entries, hit_rate}}."""
+        with self._lock:
+            result = {}
+            for name, state in self._functions.items():
+                calls = state["hits"] + state["misses"]
+                result[name] = {
+                    "hits": state["hits"],
+                    "misses": state["misses"],
+                    "entries": len(state["entries"]),
+                    "hit_rate": state["hits"] / calls if calls else 0.0,
+                }
+            return result
+
+
+# =====================================================
+# 🌐 PROCESS-WIDE CACHE
+# =====================================================
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_versioned_cache() -> VersionedCache:
+    """The process-wide versioned cache, created on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = VersionedCache()
+    return _cache
+
+
+def cached(*tables, maxsize=CACHE_MAXSIZE):
+    """Decorator on the process-wide cache (see VersionedCache.cached)."""
+    return get_versioned_cache().cached(*tables, maxsize=maxsize)
+
+
+def cache_stats() -> dict:
+    return get_versioned_cache().stats()
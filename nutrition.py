@@ -1,14 +1,11 @@
 import streamlit as st
 import pandas as pd
-from db import get_db_connection
+from db import db_connection
+from fruitbid.versioned_cache import cached
 
 
 def initialize_nutrition():
     """Initialize default nutrition data in the database if missing."""
-    conn = get_db_connection()
-    if conn is None:
-        return
-
     nutrition_data = [
         ('Apple', 52, 2.4, 4.6, 107, 'Rich in antioxidants'),
         ('Banana', 89, 2.6, 8.7, 358, 'Good potassium source'),
@@ -21,28 +18,26 @@ def initialize_nutrition():
     ]
 
     try:
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM nutrition")
-        if c.fetchone()[0] == 0:
-            c.executemany(
-                "INSERT INTO nutrition (item_name, calories, fiber, vit_c, potassium, notes) VALUES (?, ?, ?, ?, ?, ?)",
-                nutrition_data
-            )
-            conn.commit()
+        with db_connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT COUNT(*) FROM nutrition")
+            if c.fetchone()[0] == 0:
+                c.executemany(
+                    "INSERT INTO nutrition (item_name, calories, fiber, vit_c, potassium, notes) VALUES (?, ?, ?, ?, ?, ?)",
+                    nutrition_data
+                )
+                conn.commit()
     except Exception as e:
         st.error(f"Error initializing nutrition data: {str(e)}")
 
 
-@st.cache_data(ttl=300)
+@cached("nutrition")
 def get_nutrition_data():
-    """Fetch nutrition data from the database."""
-    conn = get_db_connection()
-    if conn is None:
-        return pd.DataFrame()
-
+    """Fetch nutrition data from the database (cached until `nutrition` changes; do not modify)."""
     try:
         query = "SELECT * FROM nutrition"
-        return pd.read_sql_query(query, conn)
+        with db_connection() as conn:
+            return pd.read_sql_query(query, conn)
     except Exception as e:
         st.error(f"Error fetching nutrition data: {str(e)}")
         return pd.DataFrame()
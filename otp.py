@@ -1,17 +1,14 @@
 import streamlit as st
-from twilio.rest import Client
-from datetime import datetime, timedelta
 import random
-import os
-from db import get_db_connection
+from fruitbid.otp_dispatch import StubTransport, get_otp_dispatcher
+from fruitbid.otp_store import OTP_EXPIRED, OTP_MISSING, OTP_OK, get_otp_store
+from fruitbid.rate_limit import RateLimited, check_rate
 
 
 # ---------------------- TWILIO CONFIG ----------------------
 
-# You can either hardcode or set these via environment variables
-TWILIO_SID = os.getenv("TWILIO_SID", "your_twilio_sid_here")
-TWILIO_AUTH = os.getenv("TWILIO_AUTH", "your_twilio_auth_token_here")
-TWILIO_PHONE = os.getenv("TWILIO_PHONE", "+1234567890")
+# Set TWILIO_SID, TWILIO_AUTH (or TWILIO_AUTH_TOKEN) and TWILIO_PHONE;
+# without them codes go to a local stub (see fruitbid/otp_dispatch.py).
 
 
 # ---------------------- OTP FUNCTIONS ----------------------
@@ -22,77 +19,61 @@ def generate_otp():
 
 
 def send_otp(mobile_email):
-    """Send OTP via Twilio SMS (or display if testing)."""
-    conn = get_db_connection()
-    if conn is None:
-        return False
+    """Queue an OTP SMS (or display it if testing); returns without waiting for delivery."""
+    issued = []
 
-    otp = generate_otp()
-    expiration = datetime.now() + timedelta(minutes=5)
+    def issue_code():
+        otp = generate_otp()
+        get_otp_store().put(mobile_email, otp)
+        issued.append(otp)
+        return f"Your FruitBid OTP is {otp}. It expires in 5 minutes."
 
     try:
-        c = conn.cursor()
-        c.execute(
-            "INSERT INTO otps (mobile_email, otp, expiration) VALUES (?, ?, ?)",
-            (mobile_email, otp, expiration)
-        )
-        conn.commit()
-
-        # Try sending SMS (if number)
-        if mobile_email.replace("+", "").isdigit():
-            try:
-                client = Client(TWILIO_SID, TWILIO_AUTH)
-                client.messages.create(
-                    body=f"Your FruitBid OTP is {otp}. It expires in 5 minutes.",
-                    from_=TWILIO_PHONE,
-                    to=mobile_email
-                )
-                st.success(f"OTP sent successfully to {mobile_email}")
-            except Exception as sms_err:
-                st.warning(f"Could not send SMS: {sms_err}. Showing OTP for testing: {otp}")
-        else:
-            # If it's an email or invalid phone, just show the OTP
-            st.info(f"Your OTP (for testing): {otp}")
+        check_rate("otp_send", mobile_email)
+
+        # If it's an email or invalid phone, just show the OTP
+        if not mobile_email.replace("+", "").isdigit():
+            issue_code()
+            st.info(f"Your OTP (for testing): {issued[0]}")
+            return True
 
+        dispatcher = get_otp_dispatcher()
+        job, queued = dispatcher.submit(mobile_email, issue_code)
+        if not queued:
+            st.info(f"An OTP for {mobile_email} is already {job.state}. Please check your messages.")
+        elif isinstance(dispatcher.transport, StubTransport):
+            st.warning(f"SMS not configured. Showing OTP for testing: {issued[0]}")
+        else:
+            st.success(f"OTP is on its way to {mobile_email}")
         return True
 
+    except RateLimited as e:
+        st.error(f"Too many OTP requests. {e}")
+        return False
     except Exception as e:
         st.error(f"Error sending OTP: {str(e)}")
         return False
 
 
 def verify_otp(mobile_email, user_otp):
-    """Verify user OTP input."""
-    conn = get_db_connection()
-    if conn is None:
-        return False
-
+    """Verify user OTP input (a code works once)."""
     try:
-        c = conn.cursor()
-        c.execute(
-            "SELECT otp, expiration FROM otps WHERE mobile_email=? ORDER BY id DESC LIMIT 1",
-            (mobile_email,)
-        )
-        row = c.fetchone()
-
-        if not row:
-            st.error("No OTP found for this user.")
-            return False
-
-        db_otp, exp_time = row
-        exp_time = datetime.strptime(exp_time, "%Y-%m-%d %H:%M:%S.%f")
-
-        if datetime.now() > exp_time:
-            st.error("OTP expired. Please request a new one.")
-            return False
-
-        if user_otp == db_otp:
-            st.success("OTP verified successfully!")
-            return True
-        else:
-            st.error("Invalid OTP.")
-            return False
-
+        check_rate("otp_verify", mobile_email)
+        result = get_otp_store().check(mobile_email, user_otp)
+    except RateLimited as e:
+        st.error(f"Too many attempts. {e}")
+        return False
     except Exception as e:
         st.error(f"Error verifying OTP: {str(e)}")
         return False
+
+    if result == OTP_OK:
+        st.success("OTP verified successfully!")
+        return True
+    if result == OTP_MISSING:
+        st.error("No OTP found for this user.")
+    elif result == OTP_EXPIRED:
+        st.error("OTP expired. Please request a new one.")
+    else:
+        st.error("Invalid OTP.")
+    return False
@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The fruitbid modules import each other as top-level modules (as Streamlit runs them)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fruitbid"))
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """A fresh database file, with its archive file beside it."""
+    monkeypatch.setenv("FRUITBID_ARCHIVE_PATH", str(tmp_path / "fruitbid_archive.db"))
+    return str(tmp_path / "fruitbid.db")
+
+
+@pytest.fixture
+def pool(db_path):
+    """A migrated database behind its own pool, archive attached."""
+    from archive import install_archive
+    from migrations import migrate
+    from pool import ConnectionPool, PoolConfig
+
+    pool = install_archive(ConnectionPool(PoolConfig.from_env(path=db_path)))
+    with pool.connection() as conn:
+        migrate(conn)
+    yield pool
+    pool.close_all()
+
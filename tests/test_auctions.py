@@ -0,0 +1,39 @@
+import time
+
+from archive import install_archive
+from auctions import AuctionScheduler, format_time
+from pool import ConnectionPool, PoolConfig
+
+
+def test_close_due_is_idempotent_across_processes(pool, db_path):
+    # a second pool on the same file stands in for another app process
+    other = install_archive(ConnectionPool(PoolConfig.from_env(path=db_path)))
+    with pool.transaction() as conn:
+        lot_id = conn.execute(
+            "INSERT INTO lots (item_name, quantity, base_price, date_added, closes_at) "
+            "VALUES ('Mango', '10 kg', 100, '2026-01-01 00:00', ?) RETURNING id",
+            (format_time(time.time() - 60),),
+        ).fetchone()[0]
+        conn.execute(
+            "INSERT INTO bids (lot_id, item_name, user_name, bid_amount, timestamp) "
+            "VALUES (?, 'Mango', 'Ann', 120, ?)",
+            (lot_id, format_time(time.time() - 120)),
+        )
+
+    first, second = AuctionScheduler(pool, grace=0), AuctionScheduler(other, grace=0)
+    first.resync()
+    second.resync()
+    try:
+        assert first.close_due() == [lot_id]
+        assert second.close_due() == []
+        # the lot closed elsewhere is dropped, not retried on every tick
+        assert second.next_deadline() is None
+        assert second.close_due() == []
+
+        with pool.connection() as conn:
+            assert conn.execute(
+                "SELECT status, winner_name, winning_bid FROM lots WHERE id = ?", (lot_id,)
+            ).fetchone() == ("closed", "Ann", 120)
+            assert conn.execute("SELECT lots_won FROM user_stats WHERE bidder = 'Ann'").fetchone() == (1,)
+    finally:
+        other.close_all()
@@ -0,0 +1,27 @@
+import pytest
+
+from auctions import LotClosed
+from bid_ingest import BidIngestor
+
+
+def test_failed_batch_is_replayed_bid_by_bid(pool):
+    with pool.transaction() as conn:
+        open_lot, closed_lot = [row[0] for row in conn.execute("SELECT id FROM lots ORDER BY id LIMIT 2")]
+        conn.execute("UPDATE lots SET status = 'closed' WHERE id = ?", (closed_lot,))
+
+    # a long flush interval puts all three bids in one batch
+    ingestor = BidIngestor(pool, flush_interval=0.5)
+    first = ingestor.submit(open_lot, 120, user_name="Ann")
+    refused = ingestor.submit(closed_lot, 130, user_name="Bob")
+    last = ingestor.submit(open_lot, 140, user_name="Cy")
+
+    assert first.result(5)["bid_amount"] == 120
+    assert last.result(5)["bid_amount"] == 140
+    with pytest.raises(LotClosed):
+        refused.result(5)
+
+    stats = ingestor.stats()
+    assert (stats["batches"], stats["written"], stats["failed"]) == (1, 2, 1)
+    with pool.connection() as conn:
+        rows = conn.execute("SELECT lot_id, user_name FROM bids ORDER BY id").fetchall()
+    assert rows == [(open_lot, "Ann"), (open_lot, "Cy")]
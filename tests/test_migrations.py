@@ -0,0 +1,33 @@
+from archive import archive_settled_lots
+from migrations import LATEST_VERSION, VERSION_KEY, migrate, schema_version
+from settlement import settle
+from user_stats import check_user_stats
+
+
+def test_migrate_keeps_archived_lots_in_user_stats(pool):
+    with pool.transaction() as conn:
+        lot_ids = [row[0] for row in conn.execute("SELECT id FROM lots")]
+        for i, lot_id in enumerate(lot_ids):
+            conn.execute(
+                "INSERT INTO bids (lot_id, item_name, user_name, bid_amount, timestamp) "
+                "VALUES (?, 'Mango', ?, 100, '2000-01-01 00:00:00')",
+                (lot_id, "ABC"[i % 3]),
+            )
+        conn.execute("UPDATE lots SET status = 'closed'")
+        conn.execute("UPDATE lots SET closed_at = '2000-01-01 00:00:00'")
+    # won lots are archived only once invoiced
+    settle(until="2001-01-01", pool=pool)
+
+    with pool.connection() as conn:
+        assert archive_settled_lots(0, conn=conn) == len(lot_ids)
+        before = conn.execute("SELECT * FROM user_stats ORDER BY bidder").fetchall()
+        assert before
+
+        # re-run the latest migrations over the archived data
+        conn.execute("UPDATE meta SET value = '13' WHERE key = ?", (VERSION_KEY,))
+        conn.commit()
+        migrate(conn)
+
+        assert schema_version(conn) == LATEST_VERSION
+        assert conn.execute("SELECT * FROM user_stats ORDER BY bidder").fetchall() == before
+        assert check_user_stats(conn) == []
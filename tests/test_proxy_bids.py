@@ -0,0 +1,62 @@
+import pytest
+
+from bid_ingest import BidIngestor
+from proxy_bids import get_proxies, proxy_price, resolve_proxies
+
+
+@pytest.fixture
+def ingestor(pool):
+    ingestor = BidIngestor(pool, flush_interval=0)
+    ingestor.add_resolver(resolve_proxies)
+    return ingestor
+
+
+@pytest.fixture
+def lot_id(pool):
+    with pool.transaction() as conn:
+        return conn.execute(
+            "INSERT INTO lots (item_name, quantity, base_price, date_added) "
+            "VALUES ('Mango', '10 kg', 100, '2026-01-01 00:00') RETURNING id"
+        ).fetchone()[0]
+
+
+def bids(pool, lot_id):
+    with pool.connection() as conn:
+        return conn.execute(
+            "SELECT user_phone, bid_amount FROM bids WHERE lot_id = ? ORDER BY id", (lot_id,)
+        ).fetchall()
+
+
+def test_proxy_price():
+    assert proxy_price(150, None, 100) == 100
+    assert proxy_price(150, 130, 100) == 131
+    assert proxy_price(150, 150, 100) == 150
+
+
+def test_leader_bids_one_increment_over_the_rival(pool, ingestor, lot_id):
+    first = ingestor.submit(lot_id, 150, user_name="Guest", user_phone="+911", max_amount=150).result(5)
+    assert (first["high_bid"], first["leading"]) == (100, True)
+
+    # same display name, different buyer: a rival, not the leader raising
+    second = ingestor.submit(lot_id, 130, user_name="Guest", user_phone="+912", max_amount=130).result(5)
+    assert (second["high_bid"], second["leading"]) == (131, False)
+
+    # a plain bid under the leader's maximum is answered at once
+    ingestor.submit(lot_id, 145, user_name="Guest", user_phone="+913").result(5)
+    assert bids(pool, lot_id) == [("+911", 100), ("+911", 131), ("+913", 145), ("+911", 146)]
+
+    with pool.connection() as conn:
+        assert get_proxies(conn, "+911") == [(lot_id, "Mango", 150, 1)]
+        assert get_proxies(conn, "+912") == [(lot_id, "Mango", 130, 0)]
+
+
+def test_leader_does_not_outbid_itself(pool, ingestor, lot_id):
+    ingestor.submit(lot_id, 150, user_phone="+911", max_amount=150).result(5)
+    raised = ingestor.submit(lot_id, 200, user_phone="+911", max_amount=200).result(5)
+    assert (raised["max_amount"], raised["high_bid"], raised["leading"]) == (200, 100, True)
+    assert bids(pool, lot_id) == [("+911", 100)]
+
+
+def test_proxy_needs_a_phone_or_user_id(ingestor, lot_id):
+    with pytest.raises(ValueError):
+        ingestor.submit(lot_id, 150, user_name="Guest", max_amount=150).result(5)
@@ -0,0 +1,19 @@
+import sqlite3
+
+from archive import attach_archive
+from migrations import migrate
+from query_plans import check_query_plans, table_scans
+
+
+def test_no_app_query_scans_a_hot_table():
+    conn = sqlite3.connect(":memory:")
+    migrate(conn)
+    attach_archive(conn, ":memory:")
+    assert check_query_plans(conn) == []
+
+
+def test_open_ended_range_counts_as_a_scan():
+    sql = "SELECT id FROM bids WHERE id > ?"
+    plan = ["SEARCH bids USING INTEGER PRIMARY KEY (rowid>?)"]
+    assert table_scans(sql, plan) == plan
+    assert table_scans(sql, plan, ranges_ok=True) == []